@@ -0,0 +1,174 @@
+# Requests/sec and latency of sqlite_rest_api served as WSGI (gunicorn, gthread)
+# vs the async app (hypercorn, asyncio) at high concurrency.
+#
+#   python benchmarks/async_mode.py [--connections 200] [--seconds 10] [--workers 1]
+#                                   [--threads 16] [--scenario quotes|login]
+#
+# Both servers run against the same temporary SQLite database. The load
+# generator keeps --connections keep-alive connections busy for --seconds.
+# "quotes" pages through GET /api/quotes by cursor from random positions,
+# "login" posts the credentials of one of --users accounts, so it exercises
+# bcrypt on the worker pool and the verified-credential cache.
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+PORT = 8765
+
+
+def bench_config():
+    class BenchConfig:
+        SECRET_KEY = 'bench-secret'
+        JWT_SECRET_KEY = 'bench-jwt-secret-with-enough-bytes'
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.environ['BENCH_DB']
+        SQLALCHEMY_TRACK_MODIFICATIONS = False
+        RATELIMIT_ENABLED = False
+        BCRYPT_LOG_ROUNDS = int(os.environ.get('BENCH_ROUNDS', 10))
+        LOG_FILE = os.devnull
+        LOG_SAMPLE_RATES = {'api.get_quotes': 0, 'api.login': 0}
+    return BenchConfig
+
+
+# factories the servers load, e.g. gunicorn 'async_mode:wsgi_app()'
+def wsgi_app():
+    from sqlite_rest_api import create_app
+    return create_app(bench_config())
+
+
+def asgi_app():
+    from sqlite_rest_api.aio import create_async_app
+    return create_async_app(bench_config())
+
+
+def prepare(quotes, users):
+    from sqlite_rest_api.extension import db
+    from sqlite_rest_api.models import Quote, User
+    app = wsgi_app()
+    with app.app_context():
+        db.create_all()
+        for i in range(users):
+            user = User(username=f'bench{i}', email=f'bench{i}@example.com', role='user')
+            user.hash_password(f'password{i}')
+            db.session.add(user)
+        db.session.flush()
+        db.session.execute(db.insert(Quote), [{'quote': f'quote number {i}', 'user_id': 1}
+                                              for i in range(quotes)])
+        db.session.commit()
+    client = app.test_client()
+    return client.post('/api/login', json={'username': 'bench0',
+                                           'password': 'password0'}).json['Token']
+
+
+async def fetch(reader, writer, request):
+    writer.write(request)
+    await writer.drain()
+    head = await reader.readuntil(b'\r\n\r\n')
+    status = int(head.split(b' ', 2)[1])
+    length = 0
+    for line in head.split(b'\r\n'):
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':', 1)[1])
+    await reader.readexactly(length)
+    return status
+
+
+def make_request(scenario, token, quotes, users):
+    if scenario == 'quotes':
+        path = f'/api/quotes?limit=20&after={random.randrange(quotes)}'
+        return (f'GET {path} HTTP/1.1\r\nHost: localhost\r\n'
+                f'Authorization: Bearer {token}\r\n\r\n').encode()
+    i = random.randrange(users)
+    body = json.dumps({'username': f'bench{i}', 'password': f'password{i}'})
+    return (f'POST /api/login HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n\r\n{body}').encode()
+
+
+async def load(args, token):
+    latencies, errors = [], 0
+    stop = time.perf_counter() + args.seconds
+
+    async def connection():
+        nonlocal errors
+        reader, writer = await asyncio.open_connection('127.0.0.1', PORT)
+        try:
+            while time.perf_counter() < stop:
+                request = make_request(args.scenario, token, args.quotes, args.users)
+                started = time.perf_counter()
+                status = await fetch(reader, writer, request)
+                latencies.append(time.perf_counter() - started)
+                errors += status != 200
+        finally:
+            writer.close()
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(connection() for _ in range(args.connections)),
+                                   return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    errors += sum(isinstance(result, Exception) for result in results)
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0
+
+    return len(latencies) / elapsed, percentile(0.5), percentile(0.99), errors
+
+
+def wait_for_port():
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', PORT)).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('server did not start')
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--connections', type=int, default=200)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--scenario', choices=('quotes', 'login'), default='quotes')
+    parser.add_argument('--quotes', type=int, default=10000)
+    parser.add_argument('--users', type=int, default=50)
+    args = parser.parse_args()
+
+    servers = {
+        'wsgi': [sys.executable, '-m', 'gunicorn', '-w', str(args.workers), '-k', 'gthread',
+                 '--threads', str(args.threads), '--backlog', '2048', '-b', f'127.0.0.1:{PORT}',
+                 '--chdir', HERE, 'async_mode:wsgi_app()'],
+        'asgi': [sys.executable, '-m', 'hypercorn', '-w', str(args.workers), '--backlog', '2048',
+                 '-b', f'127.0.0.1:{PORT}', os.path.join(HERE, 'async_mode.py') + ':asgi_app()'],
+    }
+    print(f'{args.scenario}: {args.connections} connections, {args.seconds}s, '
+          f'{args.workers} worker(s), {args.threads} threads for wsgi')
+    for name, command in servers.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ['BENCH_DB'] = os.path.join(tmp, 'bench.db')
+            token = prepare(args.quotes, args.users)
+            server = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                                      env=dict(os.environ, PYTHONPATH=os.path.dirname(HERE)))
+            try:
+                wait_for_port()
+                rps, p50, p99, errors = asyncio.run(load(args, token))
+            finally:
+                server.send_signal(signal.SIGTERM)
+                server.wait()
+        print(f'{name}: {rps:8.1f} req/s  p50 {p50:7.1f} ms  p99 {p99:7.1f} ms  {errors} errors')
+
+
+if __name__ == '__main__':
+    main()
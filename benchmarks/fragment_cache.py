@@ -0,0 +1,98 @@
+# Render time of the notesapp home page (addnote.html, one batch of note
+# cards) and the flask_project home page (home.html, one page of post cards)
+# with the {% cache %} card fragments off (NullCache) and on (SimpleCache).
+#
+#   python benchmarks/fragment_cache.py [--renders 2000] [--notes 20] [--posts 3]
+#
+# Only render_template is timed, inside a request context, with the cards'
+# data already loaded, so the numbers are the template work a cache hit
+# saves. Both apps run on in-memory databases.
+import argparse
+import os
+import sys
+import time
+import warnings
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import render_template
+from sqlalchemy.orm import joinedload
+
+BACKENDS = ('NullCache', 'SimpleCache')
+
+warnings.filterwarnings('ignore', 'Flask-Caching: CACHE_TYPE is set to NullCache')
+
+
+def timed(render, renders):
+    render()    # fills the cache when it is on
+    started = time.perf_counter()
+    for _ in range(renders):
+        render()
+    return (time.perf_counter() - started) / renders * 1e6
+
+
+def notesapp_page(renders, count):
+    from notesapp import create_app
+    from notesapp.config import TestConfig
+    from notesapp.forms import NoteForm
+    from notesapp.models import Note
+
+    notes = [Note(id=i, title=f'Note {i}', content='Some note text that fills a card. ' * 4,
+                  date_posted=datetime(2024, 1, 1), updated_at=datetime(2024, 1, 2))
+             for i in range(1, count + 1)]
+    results = {}
+    for backend in BACKENDS:
+        class BenchConfig(TestConfig):
+            CACHE_TYPE = backend
+        app = create_app(BenchConfig)
+        with app.test_request_context('/'):
+            form = NoteForm()
+            results[backend] = timed(lambda: render_template(
+                'addnote.html', notes=notes, next_cursor='next', form=form, title='Add Note'),
+                renders)
+    return results
+
+
+def blog_page(renders, count):
+    from flask_project import create_app, db
+    from flask_project.models import User, Post
+
+    results = {}
+    for backend in BACKENDS:
+        class BenchConfig:
+            SECRET_KEY = 'bench-secret'
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+            CACHE_TYPE = backend
+        app = create_app(BenchConfig)
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(username='bench', email='bench@example.com', password='x'))
+            db.session.add_all(Post(title=f'Post {i}', content='Some post text. ' * 20, user_id=1)
+                               for i in range(count))
+            db.session.commit()
+            with app.test_request_context('/'):
+                posts = Post.query.options(joinedload(Post.author)) \
+                    .order_by(Post.date_posted.desc()).paginate(page=1, per_page=count)
+                results[backend] = timed(lambda: render_template('home.html', posts=posts),
+                                         renders)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--renders', type=int, default=2000)
+    parser.add_argument('--notes', type=int, default=20)
+    parser.add_argument('--posts', type=int, default=3)
+    args = parser.parse_args()
+
+    pages = ((f'notesapp addnote.html, {args.notes} cards', notesapp_page(args.renders, args.notes)),
+             (f'flask_project home.html, {args.posts} cards', blog_page(args.renders, args.posts)))
+    print(f'{"us per render":36s} {"uncached":>9s} {"cached":>9s} {"saved":>9s}')
+    for name, results in pages:
+        off, on = results['NullCache'], results['SimpleCache']
+        print(f'{name:36s} {off:9.1f} {on:9.1f} {off - on:9.1f} ({1 - on / off:.0%})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+# Per-check cost of the rate limiter storages used by the quotes API.
+#
+#   python benchmarks/limiter_overhead.py [--checks 20000] [--keys 1000]
+#
+# Each check is one sliding-window-counter hit on a key picked from --keys
+# client addresses, the same call flask-limiter makes once per request.
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import SlidingWindowCounterRateLimiter
+
+import sqlite_rest_api.limiter_storage  # noqa: F401  registers sqlite-limits://
+
+
+def measure(storage, checks, keys):
+    limiter = SlidingWindowCounterRateLimiter(storage)
+    item = parse('3 per minute')
+    started = time.perf_counter()
+    for i in range(checks):
+        limiter.hit(item, f'127.0.{i % keys // 256}.{i % 256}')
+    return (time.perf_counter() - started) / checks * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--checks', type=int, default=20000)
+    parser.add_argument('--keys', type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        storages = [('memory://', storage_from_string('memory://')),
+                    ('sqlite-limits://', storage_from_string(f'sqlite-limits:///{tmp}/rl.db'))]
+        for name, storage in storages:
+            print(f'{name:18} {measure(storage, args.checks, args.keys):7.1f} us/check')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# Login throughput of sqlite_rest_api, cold bcrypt vs cached verification.
+#
+#   python benchmarks/login_throughput.py [--rounds 12] [--requests 200] [--threads 8]
+#
+# Cold logins use a fresh password for every request so each one pays the full
+# bcrypt cost, warm logins repeat the same credentials and hit the cache.
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlite_rest_api import create_app
+from sqlite_rest_api.extension import db
+from sqlite_rest_api.models import User
+from sqlite_rest_api.passwords import verified_credentials
+
+
+def make_config(rounds):
+    class BenchConfig:
+        SECRET_KEY = 'bench-secret'
+        JWT_SECRET_KEY = 'bench-jwt-secret-with-enough-bytes'
+        SQLALCHEMY_DATABASE_URI = 'sqlite://'
+        SQLALCHEMY_TRACK_MODIFICATIONS = False
+        RATELIMIT_ENABLED = False
+        BCRYPT_LOG_ROUNDS = rounds
+    return BenchConfig
+
+
+def run(app, requests, threads, credentials):
+    def login(i):
+        with app.test_client() as client:
+            username, password = credentials(i)
+            return client.post('/api/login', json={'username': username,
+                                                   'password': password}).status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        statuses = list(pool.map(login, range(requests)))
+    elapsed = time.perf_counter() - start
+    return requests / elapsed, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rounds', type=int, default=12)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--threads', type=int, default=8)
+    args = parser.parse_args()
+
+    app = create_app(make_config(args.rounds))
+    with app.app_context():
+        db.create_all()
+        users = []
+        for i in range(args.requests):
+            user = User(username=f'bench{i}', email=f'bench{i}@example.com', role='user')
+            user.hash_password(f'password{i}')
+            users.append(user)
+        db.session.add_all(users)
+        db.session.commit()
+
+    verified_credentials.clear()
+    cold, statuses = run(app, args.requests, args.threads,
+                         lambda i: (f'bench{i}', f'password{i}'))
+    assert set(statuses) == {200}, statuses
+    warm, statuses = run(app, args.requests, args.threads,
+                         lambda i: (f'bench{i}', f'password{i}'))
+    assert set(statuses) == {200}, statuses
+
+    print(f'bcrypt rounds {args.rounds}, {args.requests} logins on {args.threads} threads')
+    print(f'cold (bcrypt)  : {cold:10.1f} logins/s')
+    print(f'warm (cached)  : {warm:10.1f} logins/s')
+
+
+if __name__ == '__main__':
+    main()
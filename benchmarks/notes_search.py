@@ -0,0 +1,139 @@
+# Note search latency on a large synthetic notes table, the FTS5 index scoped
+# by owner token vs the same index filtered by a join on note.user_id, and
+# the LIKE scan over one user's notes it replaces.
+#
+#   python benchmarks/notes_search.py [--notes 1000000] [--users 10000] [--queries 30]
+#
+# Builds the note table in a temporary SQLite file with notesapp's
+# ix_note_user_date index and SEARCH_SCHEMA, one heavy user owns 5% of the
+# notes and the rest are spread evenly. Words follow a Zipf distribution over
+# a 5000 word vocabulary. Every query returns the first page of results. The
+# LIKE column is the unranked baseline, the newest notes containing the first
+# word, so it stops early on common words and reads every note on rare ones.
+import argparse
+import itertools
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from notesapp.search import SEARCH_SCHEMA, SEARCH_QUERY, SEARCH_RESULTS, match_expression
+
+HEAVY_USER = 1
+VOCABULARY = 5000
+
+
+def words(rng):
+    syllables = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'ze', 'pa', 'do', 'gu']
+    vocabulary = set()
+    while len(vocabulary) < VOCABULARY:
+        vocabulary.add(''.join(rng.choice(syllables) for _ in range(rng.randint(2, 4))))
+    return sorted(vocabulary, key=lambda word: rng.random())
+
+
+def build(path, notes, users, vocabulary):
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        CREATE TABLE user (id INTEGER PRIMARY KEY, username TEXT);
+        CREATE TABLE note (id INTEGER PRIMARY KEY, title VARCHAR(100) NOT NULL,
+                           date_posted DATETIME NOT NULL, content TEXT NOT NULL,
+                           user_id INTEGER NOT NULL REFERENCES user(id));
+        CREATE INDEX ix_note_user_date ON note (user_id, date_posted DESC, id);
+    """)
+    rng = random.Random(7)
+    cumulative = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+
+    def text(count):
+        return ' '.join(rng.choices(vocabulary, cum_weights=cumulative, k=count))
+
+    def owner():
+        return HEAVY_USER if rng.random() < 0.05 else rng.randint(2, users)
+
+    with connection:
+        connection.executemany('INSERT INTO user VALUES (?, ?)',
+                               ((i, f'user{i}') for i in range(1, users + 1)))
+        connection.executemany(
+            'INSERT INTO note (title, date_posted, content, user_id) VALUES (?, ?, ?, ?)',
+            ((text(rng.randint(2, 6)), f'2024-01-01 00:00:{i % 60:02d}',
+              text(rng.randint(20, 80)), owner()) for i in range(notes)))
+    started = time.perf_counter()
+    with connection:
+        for statement in SEARCH_SCHEMA:
+            connection.execute(statement)
+        connection.execute("INSERT INTO note_fts(note_fts) VALUES ('rebuild')")
+    return connection, time.perf_counter() - started
+
+
+def timed(connection, sql, params, queries):
+    # params(i) gives the bind parameters of the i-th query, ms per query at p50 and p95
+    times = []
+    for i in range(queries):
+        started = time.perf_counter()
+        connection.execute(sql, params(i)).fetchall()
+        times.append((time.perf_counter() - started) * 1000)
+    times.sort()
+    return statistics.median(times), times[int(len(times) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--notes', type=int, default=1000000)
+    parser.add_argument('--users', type=int, default=10000)
+    parser.add_argument('--queries', type=int, default=30)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    vocabulary = words(rng)
+    typical = [rng.randint(2, args.users) for _ in range(args.queries)]
+    terms = {
+        'common word': lambda i: vocabulary[i % 5],
+        'mid word': lambda i: vocabulary[200 + i],
+        'rare word': lambda i: vocabulary[-1 - i],
+        'two words': lambda i: f'{vocabulary[i % 20]} {vocabulary[100 + i]}',
+        'prefix': lambda i: vocabulary[50 + i][:3] + '*',
+    }
+    fts = str(SEARCH_QUERY)
+    joined = fts.replace('WHERE note_fts MATCH :match',
+                         'WHERE note_fts MATCH :match AND n.user_id = :user')
+    like = f"""SELECT id, title, content FROM note WHERE user_id = :user
+               AND (title LIKE :pattern OR content LIKE :pattern)
+               ORDER BY date_posted DESC, id LIMIT {SEARCH_RESULTS + 1}"""
+
+    with tempfile.TemporaryDirectory() as tmp:
+        started = time.perf_counter()
+        connection, indexing = build(os.path.join(tmp, 'notes.db'), args.notes, args.users,
+                                     vocabulary)
+        loading = time.perf_counter() - started - indexing
+        heavy = connection.execute('SELECT COUNT(*) FROM note WHERE user_id = ?',
+                                   (HEAVY_USER,)).fetchone()[0]
+        size = os.path.getsize(os.path.join(tmp, 'notes.db')) / 2**20
+        print(f'{args.notes} notes, {args.users} users, heavy user has {heavy} notes, '
+              f'typical user ~{(args.notes - heavy) // (args.users - 1)}')
+        print(f'loaded in {loading:.1f} s, search index built in {indexing:.1f} s, '
+              f'database {size:.0f} MiB\n')
+        print(f'{"":24s} {"owner token":>17s} {"join filter":>17s} {"LIKE scan":>17s}')
+        print(f'{"ms per query":24s}' + '    p50      p95  ' * 3)
+        for who, user in (('typical', lambda i: typical[i]), ('heavy', lambda i: HEAVY_USER)):
+            for name, term in terms.items():
+                def params(i, scoped=True):
+                    query = term(i)
+                    return {'match': match_expression(user(i), query) if scoped
+                            else match_expression(0, query).split(' AND ', 1)[1],
+                            'after_rank': None, 'after_id': None,
+                            'limit': SEARCH_RESULTS + 1, 'user': user(i),
+                            'pattern': f'%{query.split()[0].rstrip("*")}%'}
+                row = [timed(connection, fts, params, args.queries),
+                       timed(connection, joined, lambda i: params(i, scoped=False), args.queries),
+                       timed(connection, like, params, args.queries)]
+                print(f'{who + ", " + name:24s}'
+                      + ''.join(f' {p50:8.2f} {p95:8.2f}' for p50, p95 in row))
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# notesapp startup cost: importing the package, create_app, and the first
+# request, each run in a fresh interpreter, then what every further app
+# costs a process that already imported it (one test with its own database).
+#
+#   python benchmarks/notes_startup.py [--runs 10] [--apps 50]
+#
+# "file" is a temporary SQLite file with the tables created, "memory" the
+# in-memory database of TestConfig.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STARTUP = '''
+import json, sys, time
+started = time.perf_counter()
+from notesapp import create_app, db
+from notesapp.config import Config, TestConfig
+imported = time.perf_counter()
+
+class FileConfig(Config):
+    SQLALCHEMY_DATABASE_URI = sys.argv[1]
+
+app = create_app(TestConfig if sys.argv[1] == 'memory' else FileConfig)
+created = time.perf_counter()
+with app.app_context():
+    db.create_all()
+tables = time.perf_counter()
+status = app.test_client().get('/login').status_code
+done = time.perf_counter()
+assert status == 200, status
+print(json.dumps({'import': imported - started, 'create_app': created - imported,
+                  'create_all': tables - created, 'first request': done - tables}))
+'''
+
+
+def startup(database, runs):
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', STARTUP, database], cwd=ROOT,
+                                check=True, capture_output=True, text=True).stdout
+        samples.append(json.loads(output))
+    return {step: statistics.median(sample[step] for sample in samples) * 1000
+            for step in samples[0]}
+
+
+def per_app(apps):
+    from notesapp import create_app, db
+    from notesapp.config import TestConfig
+
+    started = time.perf_counter()
+    for _ in range(apps):
+        app = create_app(TestConfig)
+        with app.app_context():
+            db.create_all()
+        app.test_client().get('/login')
+    return (time.perf_counter() - started) / apps * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--apps', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {'file': startup('sqlite:///' + os.path.join(tmp, 'notes.db'), args.runs),
+                   'memory': startup('memory', args.runs)}
+
+    steps = list(results['file'])
+    print(f'fresh interpreter, median of {args.runs} runs, ms')
+    print(f'{"":8s}' + ''.join(f'{step:>14s}' for step in steps) + f'{"total":>10s}')
+    for database, timings in results.items():
+        print(f'{database:8s}' + ''.join(f'{timings[step]:14.1f}' for step in steps)
+              + f'{sum(timings.values()):10.1f}')
+    print(f'\nfurther app in the same process (create_app, create_all, first request), '
+          f'memory: {per_app(args.apps):.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
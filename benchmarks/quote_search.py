@@ -0,0 +1,82 @@
+# Full-text search over quotes, FTS5 MATCH vs the LIKE '%word%' baseline.
+#
+#   python benchmarks/quote_search.py [--quotes 200000] [--queries 50]
+#
+# Builds a synthetic quote table in a temporary SQLite file with the same
+# schema and triggers as the c3a91f5e27d4 migration, then times both lookups.
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlite_rest_api.search import SEARCH_SCHEMA
+
+WORDS = ('life love time world wisdom heart truth dream light hope fear change '
+         'people mind power peace friend future happy success failure courage '
+         'silence journey freedom nature river mountain story kindness').split()
+
+
+def build(path, count):
+    connection = sqlite3.connect(path)
+    connection.executescript("""
+        CREATE TABLE user (id INTEGER PRIMARY KEY, username TEXT);
+        CREATE TABLE quote (quote_id INTEGER PRIMARY KEY, quote TEXT UNIQUE NOT NULL,
+                            user_id INTEGER REFERENCES user(id));
+        INSERT INTO user VALUES (1, 'bench');
+    """)
+    for statement in SEARCH_SCHEMA:
+        connection.execute(statement)
+    rng = random.Random(7)
+    rows = ((' '.join(rng.choice(WORDS) for _ in range(rng.randint(6, 18))) + f' #{i}', 1)
+            for i in range(count))
+    with connection:
+        connection.executemany('INSERT INTO quote (quote, user_id) VALUES (?, ?)', rows)
+    return connection
+
+
+def timed(connection, sql, params, queries):
+    rng = random.Random(11)
+    start = time.perf_counter()
+    for _ in range(queries):
+        connection.execute(sql, params(rng.choice(WORDS))).fetchall()
+    return (time.perf_counter() - start) / queries * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--quotes', type=int, default=200000)
+    parser.add_argument('--queries', type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        connection = build(os.path.join(tmp, 'quotes.db'), args.quotes)
+        like = timed(connection,
+                     'SELECT quote_id, quote FROM quote WHERE quote LIKE ? '
+                     'ORDER BY quote_id LIMIT 10',
+                     lambda word: (f'%{word}%',), args.queries)
+        fts = timed(connection,
+                    'SELECT rowid, snippet(quote_fts, 0, "<b>", "</b>", "...", 12) '
+                    'FROM quote_fts WHERE quote_fts MATCH ? ORDER BY bm25(quote_fts) LIMIT 10',
+                    lambda word: (f'"{word}"',), args.queries)
+        rare = timed(connection,
+                     'SELECT quote_id FROM quote WHERE quote LIKE ? LIMIT 10',
+                     lambda word: (f'%{word} #{args.quotes - 1}%',), args.queries)
+        rare_fts = timed(connection,
+                         'SELECT rowid FROM quote_fts WHERE quote_fts MATCH ? LIMIT 10',
+                         lambda word: (f'"{args.quotes - 1}"',), args.queries)
+        connection.close()
+
+    print(f'{args.quotes} quotes, {args.queries} queries each, ms per query')
+    print(f'common word, LIKE (first 10 by id)  : {like:9.3f}')
+    print(f'common word, FTS5 (top 10 by bm25)  : {fts:9.3f}')
+    print(f'rare term,   LIKE (full scan)       : {rare:9.3f}')
+    print(f'rare term,   FTS5                   : {rare_fts:9.3f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+# Wire bytes and compression CPU for a quotes page, and what a response cache
+# hit costs when the compressed variant is stored vs compressed again.
+#
+#   python benchmarks/response_compression.py [--quotes 2000] [--per-page 100] [--requests 300]
+#
+# The first table compresses one rendered /api/quotes page with every
+# encoding and level. The second times GET requests served from the response
+# cache: "stored" reuses the variant kept in the cache entry, "recompressed"
+# is the same app with the variants dropped, so every hit compresses again.
+import argparse
+import os
+import sys
+import tempfile
+import time
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import brotli
+from flask_jwt_extended import create_access_token
+
+from sqlite_rest_api import create_app
+from sqlite_rest_api.extension import db
+from sqlite_rest_api.models import Quote, User
+
+ENCODINGS = [('gzip', 1), ('gzip', 6), ('gzip', 9), ('br', 1), ('br', 4), ('br', 11)]
+
+
+def bench_config(path):
+    class BenchConfig:
+        SECRET_KEY = 'bench-secret'
+        JWT_SECRET_KEY = 'bench-jwt-secret-with-enough-bytes'
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+        SQLALCHEMY_TRACK_MODIFICATIONS = False
+        RATELIMIT_ENABLED = False
+        LOG_FILE = os.devnull
+        LOG_SAMPLE_RATES = {'api.get_quotes': 0}
+    return BenchConfig
+
+
+def compress(data, encoding, level):
+    if encoding == 'br':
+        return brotli.compress(data, quality=level)
+    return zlib.compress(data, level, wbits=31)
+
+
+def time_hits(client, path, headers, requests):
+    client.get(path, headers=headers)   # fills the cache entry
+    started = time.process_time()
+    for _ in range(requests):
+        client.get(path, headers=headers)
+    return (time.process_time() - started) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--quotes', type=int, default=2000)
+    parser.add_argument('--per-page', type=int, default=100)
+    parser.add_argument('--requests', type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(bench_config(os.path.join(tmp, 'bench.db')))
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(username='bench', email='bench@example.com', password='x'))
+            db.session.flush()
+            db.session.execute(db.insert(Quote), [
+                {'quote': f'Quote number {i}, long enough to look like a real quotation.',
+                 'user_id': 1} for i in range(args.quotes)])
+            db.session.commit()
+            token = create_access_token(identity='bench@example.com')
+
+        client = app.test_client()
+        path = f'/api/quotes?per_page={args.per_page}'
+        auth = {'Authorization': f'Bearer {token}'}
+        body = client.get(path, headers=auth).get_data()
+
+        print(f'page of {args.per_page} quotes, {len(body)} bytes uncompressed')
+        for encoding, level in ENCODINGS:
+            started = time.process_time()
+            for _ in range(args.requests):
+                compressed = compress(body, encoding, level)
+            elapsed = (time.process_time() - started) / args.requests * 1e6
+            print(f'{encoding:4s} level {level:2d}  {len(compressed):7d} bytes  '
+                  f'{len(compressed) / len(body):6.1%}  {elapsed:7.0f} us')
+
+        print(f'\ncached GET {path}, CPU per request')
+        print(f'identity                 {time_hits(client, path, auth, args.requests):7.0f} us')
+        compressor = app.extensions['compress']
+        for encoding in ('gzip', 'br'):
+            headers = dict(auth, **{'Accept-Encoding': encoding})
+            stored = time_hits(client, path + f'&v={encoding}', headers, args.requests)
+            compressor.variants = lambda response: {}
+            recompressed = time_hits(client, path + f'&v={encoding}-again', headers, args.requests)
+            del compressor.variants
+            print(f'{encoding:4s} stored variant      {stored:7.0f} us')
+            print(f'{encoding:4s} recompressed        {recompressed:7.0f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+# Payload bytes and serialization CPU per quotes page for each response shape.
+#
+#   python benchmarks/response_encoding.py [--quotes 5000] [--limit 100] [--pages 500]
+#
+# Every variant fetches --pages keyset pages of --limit quotes with the same
+# statement get_quotes runs and renders them the way listing_response does.
+# "query" is the time spent in SQL and row building, "encode" the time spent
+# turning the page into bytes, both CPU time per page.
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import msgpack
+from flask.json.provider import DefaultJSONProvider
+
+from compact_responses import FastJSONProvider, _default
+from sqlite_rest_api import create_app
+from sqlite_rest_api.extension import db
+from sqlite_rest_api.models import Quote, User
+from sqlite_rest_api.pagination import keyset_paginate
+from sqlite_rest_api.serializers import quote_listing, quote_serializer
+
+VARIANTS = [
+    # name, fields, encoder
+    ('json, all fields', None, 'json'),
+    ('json, fields=quote', ['quote'], 'json'),
+    ('orjson, all fields', None, 'orjson'),
+    ('orjson, fields=quote', ['quote'], 'orjson'),
+    ('msgpack, all fields', None, 'msgpack'),
+    ('msgpack, fields=quote', ['quote'], 'msgpack'),
+]
+
+
+def bench_config(path):
+    class BenchConfig:
+        SECRET_KEY = 'bench-secret'
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+        SQLALCHEMY_TRACK_MODIFICATIONS = False
+        RATELIMIT_ENABLED = False
+        LOG_FILE = os.devnull
+    return BenchConfig
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--quotes', type=int, default=5000)
+    parser.add_argument('--limit', type=int, default=100)
+    parser.add_argument('--pages', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app(bench_config(os.path.join(tmp, 'bench.db')))
+        # jsonify writes compact separators outside of debug mode
+        default_provider = DefaultJSONProvider(app)
+        encoders = {
+            'json': lambda payload: default_provider.dumps(payload, separators=(',', ':')),
+            'orjson': FastJSONProvider(app).dumps,
+            'msgpack': lambda payload: msgpack.packb(payload, default=_default),
+        }
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(username='bench', email='bench@example.com', password='x'))
+            db.session.flush()
+            db.session.execute(db.insert(Quote), [
+                {'quote': f'Quote number {i}, long enough to look like a real quotation.',
+                 'user_id': 1} for i in range(args.quotes)])
+            db.session.commit()
+
+            print(f'{args.pages} pages of {args.limit} quotes')
+            for name, fields, encoder in VARIANTS:
+                encode, serialize = encoders[encoder], quote_serializer(fields)
+                query_cpu = encode_cpu = size = 0
+                for i in range(args.pages):
+                    started = time.process_time()
+                    key = i * args.limit % args.quotes
+                    page = keyset_paginate(quote_listing(fields), Quote.quote_id,
+                                           key=key, limit=args.limit)
+                    fetched = time.process_time()
+                    body = encode({'next cursor': page['next'], 'previous cursor': page['prev'],
+                                   'data': [serialize(row) for row in page['items']]})
+                    query_cpu += fetched - started
+                    encode_cpu += time.process_time() - fetched
+                    size += len(body if isinstance(body, bytes) else body.encode('utf-8'))
+                print(f'{name:24s} {size / args.pages:8.0f} bytes/page  '
+                      f'query {query_cpu / args.pages * 1e6:6.0f} us  '
+                      f'encode {encode_cpu / args.pages * 1e6:6.0f} us')
+
+
+if __name__ == '__main__':
+    main()
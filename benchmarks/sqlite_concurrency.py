@@ -0,0 +1,101 @@
+# Read/write throughput of concurrent SQLite connections, stock settings vs
+# the shared profile in sqlite_profile.py.
+#
+#   python benchmarks/sqlite_concurrency.py [--writers 4] [--readers 8] [--seconds 5]
+#
+# Writers insert one row per transaction, readers run the kind of indexed
+# range read the quote listing does. Every thread owns its connection.
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlite_profile import SQLITE_DEFAULTS, pragma_statements
+
+
+def connect(path, profile):
+    if not profile:
+        # what the apps got before: rollback journal, synchronous=FULL
+        return sqlite3.connect(path, timeout=SQLITE_DEFAULTS['SQLITE_BUSY_TIMEOUT'] / 1000)
+    connection = sqlite3.connect(path, timeout=SQLITE_DEFAULTS['SQLITE_BUSY_TIMEOUT'] / 1000)
+    for statement in pragma_statements({}):
+        connection.execute(statement)
+    return connection
+
+
+def run(path, profile, writers, readers, seconds):
+    setup = connect(path, profile)
+    setup.executescript("""
+        CREATE TABLE quote (quote_id INTEGER PRIMARY KEY, quote TEXT UNIQUE NOT NULL, user_id INTEGER);
+    """)
+    with setup:
+        setup.executemany('INSERT INTO quote (quote, user_id) VALUES (?, 1)',
+                          ((f'seed {i}',) for i in range(10000)))
+    setup.close()
+
+    counts = {'writes': 0, 'reads': 0, 'errors': 0}
+    lock = threading.Lock()
+    stop = time.perf_counter() + seconds
+
+    def writer(n):
+        connection = connect(path, profile)
+        done = errors = i = 0
+        while time.perf_counter() < stop:
+            try:
+                with connection:
+                    connection.execute('INSERT INTO quote (quote, user_id) VALUES (?, 1)',
+                                       (f'writer {n} row {i}',))
+                done += 1
+            except sqlite3.OperationalError:
+                errors += 1
+            i += 1
+        with lock:
+            counts['writes'] += done
+            counts['errors'] += errors
+
+    def reader(n):
+        connection = connect(path, profile)
+        done = errors = 0
+        while time.perf_counter() < stop:
+            try:
+                connection.execute('SELECT quote_id, quote FROM quote WHERE quote_id > ? '
+                                   'ORDER BY quote_id LIMIT 20', (done * 37 % 10000,)).fetchall()
+                done += 1
+            except sqlite3.OperationalError:
+                errors += 1
+        with lock:
+            counts['reads'] += done
+            counts['errors'] += errors
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(writers)]
+    threads += [threading.Thread(target=reader, args=(n,)) for n in range(readers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {key: value / seconds if key != 'errors' else value for key, value in counts.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    print(f'{args.writers} writers, {args.readers} readers, {args.seconds}s per run')
+    for name, profile in (('stock', False), ('profile', True)):
+        with tempfile.TemporaryDirectory() as tmp:
+            result = run(os.path.join(tmp, 'bench.db'), profile,
+                         args.writers, args.readers, args.seconds)
+        print(f"{name:8}: {result['writes']:9.1f} writes/s {result['reads']:10.1f} reads/s "
+              f"{result['errors']:6d} locked errors")
+
+
+if __name__ == '__main__':
+    main()
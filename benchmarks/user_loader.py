@@ -0,0 +1,75 @@
+# SQL statements and time per authenticated request in flask_project with the
+# Flask-Login user loader cache off (USER_CACHE_TTL = 0) and on.
+#
+#   python benchmarks/user_loader.py [--requests 500] [--posts 30]
+#
+# One logged-in client requests /about (no queries of its own), / (a page
+# of posts with their authors) and /account (reads current_user).
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+
+from flask_project import create_app, db, bcrypt
+from flask_project.models import User, Post
+
+PATHS = ('/about', '/', '/account')
+
+
+def bench_config(path, ttl):
+    class BenchConfig:
+        SECRET_KEY = 'bench-secret'
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+        WTF_CSRF_ENABLED = False
+        USER_CACHE_TTL = ttl
+    return BenchConfig
+
+
+def run(tmp, ttl, requests, posts):
+    app = create_app(bench_config(os.path.join(tmp, f'bench-{ttl}.db'), ttl))
+    with app.app_context():
+        db.create_all()
+        user = User(username='bench', email='bench@example.com',
+                    password=bcrypt.generate_password_hash('password').decode('utf-8'))
+        db.session.add(user)
+        db.session.flush()
+        db.session.add_all(Post(title=f'Post {i}', content='text', user_id=user.id)
+                           for i in range(posts))
+        db.session.commit()
+        statements = []
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda *args: statements.append(1))
+
+    client = app.test_client()
+    client.post('/login', data={'email': 'bench@example.com', 'password': 'password'})
+    results = {}
+    for path in PATHS:
+        client.get(path)    # warms the cache when it is on
+        statements.clear()
+        started = time.perf_counter()
+        for _ in range(requests):
+            client.get(path)
+        elapsed = time.perf_counter() - started
+        results[path] = (len(statements) / requests, elapsed / requests * 1000)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--posts', type=int, default=30)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, ttl in (('no cache', 0), ('cached', 30)):
+            for path, (queries, ms) in run(tmp, ttl, args.requests, args.posts).items():
+                print(f'{name:8s} {path:9s} {queries:5.2f} queries/request  {ms:6.2f} ms/request')
+
+
+if __name__ == '__main__':
+    main()
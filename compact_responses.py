@@ -0,0 +1,95 @@
+from flask import current_app, request
+from flask.json.provider import DefaultJSONProvider
+from werkzeug.http import http_date
+
+# both encoders are optional, without them responses fall back to the stdlib json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MSGPACK_MIMETYPES = ('application/msgpack', 'application/x-msgpack')
+
+
+def _default(value):
+    # the same representations Flask's json provider uses for these types
+    if hasattr(value, 'timetuple'):
+        return http_date(value)
+    if hasattr(value, '__html__'):
+        return str(value.__html__())
+    return str(value)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider that encodes with orjson when it is installed.
+
+    Output matches the default provider (sorted keys, RFC 822 dates) apart
+    from non-ASCII text being written as UTF-8 instead of \\u escapes.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or set(kwargs) - {'indent', 'separators'}:
+            return super().dumps(obj, **kwargs)
+        option = orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+        if kwargs.get('indent'):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=_default, option=option).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+
+def init_compact_responses(app):
+    app.json = FastJSONProvider(app)
+
+
+def requested_fields(allowed, args=None):
+    """Fields named in ``?fields=a,b``, in the order of ``allowed``.
+
+    Returns None when the parameter is absent. Raises ValueError naming the
+    fields that are not in ``allowed``. ``args`` defaults to the current
+    Flask request's query string.
+    """
+    raw = (request.args if args is None else args).get('fields')
+    if raw is None:
+        return None
+    fields = {field.strip() for field in raw.split(',') if field.strip()}
+    unknown = fields - set(allowed)
+    if unknown or not fields:
+        raise ValueError(f"Unknown fields {sorted(unknown)}, choose from {list(allowed)}")
+    return [field for field in allowed if field in fields]
+
+
+def wants_msgpack(accept_mimetypes=None):
+    # opt-in only, */* and missing Accept headers keep getting JSON
+    if msgpack is None:
+        return False
+    if accept_mimetypes is None:
+        accept_mimetypes = request.accept_mimetypes
+    best = accept_mimetypes.best_match(('application/json',) + MSGPACK_MIMETYPES)
+    return best in MSGPACK_MIMETYPES
+
+
+def pack(payload):
+    return msgpack.packb(payload, default=_default)
+
+
+def encoded_response(payload, app=None, accept_mimetypes=None):
+    """``payload`` as MessagePack when the client asked for it, else as JSON.
+
+    ``app`` and ``accept_mimetypes`` default to the current Flask app and
+    request, a Quart app passes its own.
+    """
+    app = app or current_app
+    if wants_msgpack(accept_mimetypes):
+        response = app.response_class(pack(payload), mimetype='application/msgpack')
+    else:
+        response = app.json.response(payload)
+    response.vary.add('Accept')
+    return response
@@ -0,0 +1,148 @@
+import zlib
+from flask import current_app, request
+
+# brotli is optional, without it only gzip is offered
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESS_DEFAULTS = {
+    'COMPRESS_ALGORITHMS': ('br', 'gzip'),  # preference order when a client accepts several
+    'COMPRESS_LEVEL': 6,                    # zlib level for gzip, 1-9
+    'COMPRESS_BR_LEVEL': 4,                 # brotli quality, 0-11
+    'COMPRESS_MIN_SIZE': 500,               # smaller bodies are sent as they are
+    'COMPRESS_MIMETYPES': ('text/html', 'text/css', 'text/plain', 'text/csv', 'text/xml',
+                           'text/javascript', 'application/javascript', 'application/json',
+                           'application/x-ndjson', 'application/xml', 'application/msgpack',
+                           'image/svg+xml'),
+}
+
+
+def encoded_etag(etag, encoding):
+    # every encoding of a body is its own representation with its own validator
+    return f'{etag}-{encoding}'
+
+
+def negotiated_encoding():
+    # the encoding the current request would get, None without Compress or a match
+    compress = current_app.extensions.get('compress')
+    return compress.negotiate() if compress is not None else None
+
+
+class Compress:
+    """Compress response bodies with brotli or gzip, whichever the client prefers.
+
+    Bodies of COMPRESS_MIMETYPES are compressed from COMPRESS_MIN_SIZE bytes
+    on, streamed bodies chunk by chunk whatever their size. Responses that
+    already have a Content-Encoding, are file passthroughs or say
+    ``Cache-Control: no-transform`` are left alone. A compressed response's
+    ETag gets the encoding appended, see ``encoded_etag``.
+
+    ``variants`` and ``use_variant`` let a response cache keep compressed
+    copies next to the plain body, so cache hits are not compressed again.
+    """
+
+    def __init__(self, app=None):
+        self.algorithms = ()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        for key, value in COMPRESS_DEFAULTS.items():
+            app.config.setdefault(key, value)
+        self.algorithms = tuple(algorithm for algorithm in app.config['COMPRESS_ALGORITHMS']
+                                if algorithm == 'gzip' or (algorithm == 'br' and brotli))
+        self.level = app.config['COMPRESS_LEVEL']
+        self.br_level = app.config['COMPRESS_BR_LEVEL']
+        self.min_size = app.config['COMPRESS_MIN_SIZE']
+        self.mimetypes = frozenset(app.config['COMPRESS_MIMETYPES'])
+        app.extensions['compress'] = self
+        app.after_request(self._after_request)
+
+    def negotiate(self, accept_encodings=None):
+        # highest q-value wins, ties go to the earlier entry of COMPRESS_ALGORITHMS
+        if accept_encodings is None:
+            accept_encodings = request.accept_encodings
+        best, best_quality = None, 0
+        for algorithm in self.algorithms:
+            quality = accept_encodings[algorithm]
+            if quality > best_quality:
+                best, best_quality = algorithm, quality
+        return best
+
+    def compress(self, data, encoding):
+        if encoding == 'br':
+            return brotli.compress(data, quality=self.br_level)
+        return zlib.compress(data, self.level, wbits=31)
+
+    def _compressor(self, encoding):
+        if encoding == 'br':
+            compressor = brotli.Compressor(quality=self.br_level)
+            return compressor.process, compressor.finish
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 31)
+        return compressor.compress, compressor.flush
+
+    def _compress_stream(self, chunks, encoding):
+        process, finish = self._compressor(encoding)
+        for chunk in chunks:
+            data = process(chunk)
+            if data:
+                yield data
+        yield finish()
+
+    def compressible(self, response):
+        return (bool(self.algorithms) and response.mimetype in self.mimetypes
+                and 'Content-Encoding' not in response.headers
+                and not response.direct_passthrough
+                and not response.cache_control.no_transform)
+
+    def variants(self, response):
+        """Compressed copies of a buffered response's body, keyed by encoding."""
+        if not self.compressible(response) or response.is_streamed:
+            return {}
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return {}
+        return {encoding: self.compress(data, encoding) for encoding in self.algorithms}
+
+    def use_variant(self, response, variants):
+        # swap in a stored copy for the negotiated encoding, if there is one
+        encoding = self.negotiate()
+        if encoding in variants and self.compressible(response):
+            response.set_data(variants[encoding])
+            response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+        return response
+
+    def _after_request(self, response):
+        if not self.compressible(response):
+            self._tag_etag(response)
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = self.negotiate()
+        if encoding is None or not 200 <= response.status_code < 300 \
+                or response.status_code in (204, 206):
+            return response
+
+        if response.is_streamed:
+            original = response.response
+            if hasattr(original, 'close'):
+                response.call_on_close(original.close)
+            response.response = self._compress_stream(response.iter_encoded(), encoding)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if len(data) < self.min_size:
+                return response
+            response.set_data(self.compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        self._tag_etag(response)
+        return response
+
+    def _tag_etag(self, response):
+        # covers bodies compressed here and stored variants put in by use_variant
+        encoding = response.headers.get('Content-Encoding')
+        etag, weak = response.get_etag()
+        if encoding in self.algorithms and etag and not etag.endswith(f'-{encoding}'):
+            response.set_etag(encoded_etag(etag, encoding), weak=weak)
@@ -0,0 +1,36 @@
+from sqlalchemy import inspect, text
+
+
+def sync_schema(db):
+    """Bring an existing database up to the models, for apps without migrations.
+
+    Creates missing tables and indexes and adds missing columns with
+    ``ALTER TABLE ... ADD COLUMN``. Existing rows get NULL in an added
+    column, so columns added to a model later have to be nullable. Nothing
+    is dropped or altered. Returns a line per change made.
+    """
+    changes = []
+    existing = set(inspect(db.engine).get_table_names())
+    db.create_all()
+    changes += [f'created table {table.name}' for table in db.metadata.sorted_tables
+                if table.name not in existing]
+
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if table.name not in existing:
+                continue
+            present = {column['name'] for column in inspect(connection).get_columns(table.name)}
+            for column in table.columns:
+                if column.name in present:
+                    continue
+                column_type = column.type.compile(dialect=connection.dialect)
+                connection.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+                changes.append(f'added column {table.name}.{column.name}')
+
+    for table in db.metadata.sorted_tables:
+        present = {index['name'] for index in inspect(db.engine).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in present:
+                index.create(db.engine)
+                changes.append(f'created index {index.name}')
+    return changes
@@ -3,16 +3,22 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager
 from .config import Config
 from flask_migrate import Migrate
+from .sqlite_profile import configure_sqlite, apply_sqlite_profile
+from .request_metrics import RequestMetrics
 
 db = SQLAlchemy()
 jwt = JWTManager()
 migrate = Migrate()
+metrics = RequestMetrics()
 
 def create_app(config=Config):
     app = Flask(__name__)
     app.config.from_object(Config)
 
+    configure_sqlite(app)
     db.init_app(app)
+    apply_sqlite_profile(app, db)
+    metrics.init_app(app, db)
     jwt.init_app(app)
     migrate.init_app(app, db)
 
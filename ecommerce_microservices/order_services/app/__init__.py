@@ -1,16 +1,27 @@
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
+from .sqlite_profile import configure_sqlite, apply_sqlite_profile
+from .request_metrics import RequestMetrics
+from .compact_responses import init_compact_responses
+from .compression import Compress
 from .config import Config
 
 db = SQLAlchemy()
 migrate = Migrate()
+metrics = RequestMetrics()
+compress = Compress()
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    init_compact_responses(app)
+    compress.init_app(app)
+    configure_sqlite(app)
     db.init_app(app)
+    apply_sqlite_profile(app, db)
+    metrics.init_app(app, db)
     migrate.init_app(app, db)
 
     from .routes.orders import orders_bp
@@ -12,6 +12,9 @@ class Order(db.Model):
     status = db.Column(db.String(50), default='pending')  # e.g., pending, completed, cancelled
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # columns to_dict exposes, in order, also what ?fields= can pick from
+    FIELDS = ('id', 'user_id', 'product_id', 'quantity', 'total_price', 'status', 'created_at')
+
     def to_dict(self):
         return {
             'id': self.id,
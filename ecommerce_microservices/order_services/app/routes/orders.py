@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from ..models import Order, db
 from ..utils.jwt_utils import token_required
 from ..utils.decorators import admin_required
+from ..compact_responses import requested_fields, encoded_response
 import requests
 
 PRODUCT_SERVICE_URL = 'http://localhost:5001/api/products'
@@ -11,8 +12,17 @@ orders_bp = Blueprint('orders', __name__)
 @orders_bp.route('/', methods=['GET'])
 @token_required
 def get_user_orders(current_user_id):
-    orders = Order.query.filter_by(user_id=current_user_id).all()
-    return jsonify([order.to_dict() for order in orders]), 200
+    try:
+        fields = requested_fields(Order.FIELDS)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    if fields is None:
+        orders = Order.query.filter_by(user_id=current_user_id).all()
+        return encoded_response([order.to_dict() for order in orders]), 200
+    # only the requested columns are selected, no Order objects are built
+    rows = db.session.execute(db.select(*[getattr(Order, field) for field in fields])
+                              .filter_by(user_id=current_user_id))
+    return encoded_response([dict(zip(fields, row)) for row in rows]), 200
 
 
 @orders_bp.route('/<int:order_id>', methods=['GET'])
@@ -2,17 +2,28 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from .config import Config
 from flask_migrate import Migrate 
+from .sqlite_profile import configure_sqlite, apply_sqlite_profile
+from .request_metrics import RequestMetrics
+from .compact_responses import init_compact_responses
+from .compression import Compress
 from flask_jwt_extended import JWTManager
 
 db = SQLAlchemy()
 migrate = Migrate()
 jwt = JWTManager()
+metrics = RequestMetrics()
+compress = Compress()
 
 def create_app(config=Config):
     app = Flask(__name__)
     app.config.from_object(config)
 
+    init_compact_responses(app)
+    compress.init_app(app)
+    configure_sqlite(app)
     db.init_app(app)
+    apply_sqlite_profile(app, db)
+    metrics.init_app(app, db)
     migrate.init_app(app, db)
     jwt.init_app(app)
 
@@ -4,4 +4,5 @@ class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "your-secret-key")
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URL", "sqlite:///products.db")
     SQLALCHEMY_TRACK_MODIFICATIONS = False
-    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-jwt-secret')
\ No newline at end of file
+    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'your-jwt-secret')
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')    # bearer token for /metrics from outside localhost
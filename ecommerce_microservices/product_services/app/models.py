@@ -13,6 +13,9 @@ class Product(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    # columns to_dict exposes, in order, also what ?fields= can pick from
+    FIELDS = ('id', 'name', 'description', 'price', 'quantity', 'created_at', 'updated_at')
+
     def __repr__(self):
         return f'<Product {self.name}>'
 
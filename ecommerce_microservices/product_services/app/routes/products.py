@@ -2,13 +2,22 @@ from flask import Blueprint, request, jsonify
 from ..jwt_utils import token_required
 from ..decorators import role_required
 from ..models import Product, db
+from ..compact_responses import requested_fields, encoded_response
 
 product_bp = Blueprint('products', __name__)
 
 @product_bp.route('/', methods=['GET'])
 def get_all_products():
-    products = Product.query.all()
-    return jsonify([product.to_dict() for product in products]), 200
+    try:
+        fields = requested_fields(Product.FIELDS)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    if fields is None:
+        products = Product.query.all()
+        return encoded_response([product.to_dict() for product in products]), 200
+    # only the requested columns are selected, no Product objects are built
+    rows = db.session.execute(db.select(*[getattr(Product, field) for field in fields]))
+    return encoded_response([dict(zip(fields, row)) for row in rows]), 200
 
 @product_bp.route('/<int:product_id>', methods=['GET'])
 def get_product(product_id):
@@ -4,6 +4,12 @@ from flask_bcrypt import Bcrypt
 from flask_login import LoginManager
 from flask_mail import Mail
 from flask_project.config import Config
+from sqlite_profile import configure_sqlite, apply_sqlite_profile
+from request_metrics import RequestMetrics
+from query_debug import QueryDebugger
+from compression import Compress
+from user_cache import UserCache
+from fragment_cache import FragmentCache
 
 
 db = SQLAlchemy()
@@ -12,15 +18,27 @@ login_manager = LoginManager()
 login_manager.login_view = 'users.login'
 login_manager.login_message_category = 'info'
 mail = Mail()
+metrics = RequestMetrics()
+query_debugger = QueryDebugger()
+compress = Compress()
+user_cache = UserCache()
+cache = FragmentCache()
 
 
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
 
+    compress.init_app(app)
+    configure_sqlite(app)
     db.init_app(app)
+    apply_sqlite_profile(app, db)
+    metrics.init_app(app, db)
+    query_debugger.init_app(app, db)
     bcrypt.init_app(app)
     login_manager.init_app(app)
+    user_cache.init_app(app, db)   # behind the user_loader, see models.load_user
+    cache.init_app(app)            # rendered post cards, see home.html
     mail.init_app(app)
 
     from flask_project.users.routes import users
@@ -10,4 +10,7 @@ class Config:
     MAIL_PORT = int(os.getenv('MAIL_PORT', 587))  # Convert to int
     MAIL_USE_TLS = os.getenv('MAIL_USE_TLS', 'True') == 'True'  # Convert to boolean
     MAIL_USERNAME = os.getenv('MAIL_USERNAME')
-    MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
\ No newline at end of file
+    MAIL_PASSWORD = os.getenv('MAIL_PASSWORD')
+    CACHE_TYPE = os.getenv('CACHE_TYPE', 'SimpleCache')   # flask_caching backend for template fragments
+    CACHE_REDIS_URL = os.getenv('CACHE_REDIS_URL')
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')    # bearer token for /metrics from outside localhost
@@ -1,5 +1,8 @@
 from flask import render_template, request, Blueprint
+from sqlalchemy.orm import joinedload
+from flask_project import db
 from flask_project.models import Post
+from db_schema import sync_schema
 
 main = Blueprint('main',__name__)
 
@@ -14,12 +17,22 @@ main = Blueprint('main',__name__)
 @main.route("/")
 @main.route("/home")
 def home():
-    # paginated home page
+    # paginated home page, the authors come in the same query because the
+    # cached post cards are keyed by their username and image
     page = request.args.get('page', 1, type=int)
-    posts = Post.query.order_by(Post.date_posted.desc()).paginate(page=page, per_page=3)
+    posts = Post.query.options(joinedload(Post.author))\
+        .order_by(Post.date_posted.desc()).paginate(page=page, per_page=3)
     return render_template("home.html", posts=posts)
 
 
 @main.route("/about")
 def about():
-    return render_template("about.html", title='About')
\ No newline at end of file
+    return render_template("about.html", title='About')
+
+
+# flask --app flask_project main init-db, creates missing tables, columns and indexes
+@main.cli.command('init-db')
+def init_db_command():
+    for change in sync_schema(db):
+        print(change)
+    print('Blog database initialized')
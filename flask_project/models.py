@@ -1,12 +1,12 @@
 from datetime import datetime
 from itsdangerous import TimestampSigner, URLSafeSerializer, BadSignature, SignatureExpired
-from flask_project import db, login_manager
+from flask_project import db, login_manager, user_cache
 from flask import current_app
 from flask_login import UserMixin
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(user_id)
+    return user_cache.load(User, user_id)
 
 class User(db.Model, UserMixin ):
     id = db.Column(db.Integer, primary_key=True)
@@ -51,6 +51,8 @@ class Post(db.Model):
     title = db.Column(db.String(100), nullable=False)
     date_posted = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     content = db.Column(db.Text, nullable=False)
+    # part of the cached card's key, NULL for posts not changed since the column was added
+    updated_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
     def __repr__(self):
@@ -1,6 +1,6 @@
 from flask import render_template, url_for, flash, redirect, request, abort, Blueprint
 from flask_login import current_user, login_required
-from flask_project import db
+from flask_project import db, cache
 from flask_project.models import Post
 from flask_project.posts.forms import PostForm
 
@@ -36,6 +36,7 @@ def update_post(post_id):
         abort(403)
     form = PostForm()
     if form.validate_on_submit():
+        forget_post_card(post)
         post.title = form.title.data
         post.content = form.content.data
         db.session.commit()
@@ -54,7 +55,14 @@ def delete_post(post_id):
     post = Post.query.get_or_404(post_id)
     if post.author != current_user:
         abort(403)
+    forget_post_card(post)
     db.session.delete(post)
     db.session.commit()
     flash('Your post has been deleted', 'success')
     return redirect(url_for('main.home'))
+
+
+def forget_post_card(post):
+    # drops the card cached for the post as it is now, same keys as home.html.
+    # A changed post gets a new updated_at and so a new key, a new post a new id
+    cache.forget('post-card', post.id, post.updated_at, post.author.username, post.author.image_file)
@@ -1,6 +1,6 @@
 from flask import redirect, render_template, url_for, request, flash, Blueprint
 from flask_login import login_user, current_user, logout_user, login_required
-from flask_project import db, bcrypt
+from flask_project import db, bcrypt, user_cache
 from flask_project.models import User, Post
 from flask_project.users.forms import (RegistrationForm, LoginForm,
                                        UpdateAccountForm, RequestResetForm,
@@ -20,6 +20,7 @@ def register():
         user = User(username=form.username.data, email=form.email.data, password = hashed_pass)
         db.session.add(user)
         db.session.commit()
+        user_cache.invalidate(user.id)
         flash(f"Your account has been created! You can now login","success")
         return redirect(url_for('main.home'))
     return render_template("register.html", title='Register', form=form)
@@ -60,6 +61,7 @@ def account():
         current_user.username = form.username.data
         current_user.email = form.email.data
         db.session.commit()
+        user_cache.invalidate(current_user.id)
         flash("Account Updated!!","Success")
         return redirect(url_for("users.account"))
     elif request.method == 'GET':
@@ -105,6 +107,7 @@ def reset_token(token):
         hashed_pass = bcrypt.generate_password_hash(form.password.data).decode('utf-8')
         user.password = hashed_pass
         db.session.commit()
+        user_cache.invalidate(user.id)
         flash(f"Your password has been updated! You can now login","success")
         return redirect(url_for('main.home'))
     return render_template('reset_token.html',title='Reset Password', form=form)
@@ -0,0 +1,32 @@
+from flask_caching import Cache, make_template_fragment_key
+
+# flask_caching settings for template fragments, every key can be overridden
+# from the app config. Fragment keys carry the version of what they render,
+# so entries of old versions are only dropped by the timeout or the threshold.
+FRAGMENT_CACHE_DEFAULTS = {
+    'CACHE_TYPE': 'SimpleCache',
+    'CACHE_DEFAULT_TIMEOUT': 3600,
+    'CACHE_THRESHOLD': 2000,    # entries kept by SimpleCache and FileSystemCache
+}
+
+
+class FragmentCache(Cache):
+    """flask_caching ``Cache`` for rendered template fragments.
+
+    Templates cache a fragment with
+    ``{% cache None, 'name', key1, key2 %}...{% endcache %}``, a timeout of
+    None uses CACHE_DEFAULT_TIMEOUT and the keys must be strings. ``forget``
+    drops the entry with the same name and keys.
+    """
+
+    def __init__(self, app=None):
+        super().__init__(app, with_jinja2_ext=True)
+
+    def init_app(self, app, config=None):
+        for key, value in FRAGMENT_CACHE_DEFAULTS.items():
+            app.config.setdefault(key, value)
+        super().init_app(app, config)
+
+    def forget(self, name, *vary_on):
+        # same key as the {% cache %} tag builds, which joins the keys as strings
+        self.delete(make_template_fragment_key(name, vary_on=[str(value) for value in vary_on]))
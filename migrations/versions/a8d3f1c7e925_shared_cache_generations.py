@@ -0,0 +1,39 @@
+"""Response cache generations shared by every worker
+
+Revision ID: a8d3f1c7e925
+Revises: e41f9a6c3b20
+Create Date: 2026-10-18 16:12:44.203817
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a8d3f1c7e925'
+down_revision = 'e41f9a6c3b20'
+branch_labels = None
+depends_on = None
+
+# one generation per tag, moved on by the write triggers, see sqlite_rest_api/caching.py
+BUMP = """INSERT INTO cache_generation(tag, generation)
+        VALUES ('quotes', CAST((julianday('now') - 2440587.5) * 86400000000 AS INTEGER))
+        ON CONFLICT(tag) DO UPDATE SET generation = MAX(generation + 1, excluded.generation)"""
+
+
+def upgrade():
+    op.execute("""CREATE TABLE cache_generation (
+        tag VARCHAR(40) PRIMARY KEY,
+        generation INTEGER NOT NULL)""")
+    for suffix, event in (('ai', 'INSERT'), ('au', 'UPDATE'), ('ad', 'DELETE')):
+        op.execute(f"""CREATE TRIGGER quote_generation_{suffix} AFTER {event} ON quote BEGIN
+        {BUMP};
+    END""")
+    # seed the row, the first write then moves on from the current time
+    op.execute(BUMP)
+
+
+def downgrade():
+    for suffix in ('ad', 'au', 'ai'):
+        op.execute(f"DROP TRIGGER IF EXISTS quote_generation_{suffix}")
+    op.execute("DROP TABLE IF EXISTS cache_generation")
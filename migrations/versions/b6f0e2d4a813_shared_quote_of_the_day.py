@@ -0,0 +1,31 @@
+"""Quote of the day stored for every worker
+
+Revision ID: b6f0e2d4a813
+Revises: a8d3f1c7e925
+Create Date: 2026-10-18 16:48:05.731290
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6f0e2d4a813'
+down_revision = 'a8d3f1c7e925'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # the quote id drawn for each day, deleting that quote clears the day
+    op.execute("""CREATE TABLE daily_quote (
+        day VARCHAR(10) PRIMARY KEY,
+        quote_id INTEGER NOT NULL)""")
+    op.execute("""CREATE TRIGGER daily_quote_ad AFTER DELETE ON quote BEGIN
+        DELETE FROM daily_quote WHERE quote_id = old.quote_id;
+    END""")
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS daily_quote_ad")
+    op.execute("DROP TABLE IF EXISTS daily_quote")
@@ -0,0 +1,42 @@
+"""Quote full-text search index
+
+Revision ID: c3a91f5e27d4
+Revises: b5eae7c5711c
+Create Date: 2026-10-18 13:05:12.408215
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3a91f5e27d4'
+down_revision = 'b5eae7c5711c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # external content FTS5 table, rows live in quote and the index stores tokens only
+    op.execute("""CREATE VIRTUAL TABLE quote_fts USING fts5(
+        quote, content='quote', content_rowid='quote_id',
+        tokenize='unicode61 remove_diacritics 2')""")
+    op.execute("""CREATE TRIGGER quote_fts_ai AFTER INSERT ON quote BEGIN
+        INSERT INTO quote_fts(rowid, quote) VALUES (new.quote_id, new.quote);
+    END""")
+    op.execute("""CREATE TRIGGER quote_fts_ad AFTER DELETE ON quote BEGIN
+        INSERT INTO quote_fts(quote_fts, rowid, quote) VALUES ('delete', old.quote_id, old.quote);
+    END""")
+    op.execute("""CREATE TRIGGER quote_fts_au AFTER UPDATE OF quote ON quote BEGIN
+        INSERT INTO quote_fts(quote_fts, rowid, quote) VALUES ('delete', old.quote_id, old.quote);
+        INSERT INTO quote_fts(rowid, quote) VALUES (new.quote_id, new.quote);
+    END""")
+    # index the quotes that already exist
+    op.execute("INSERT INTO quote_fts(quote_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS quote_fts_au")
+    op.execute("DROP TRIGGER IF EXISTS quote_fts_ad")
+    op.execute("DROP TRIGGER IF EXISTS quote_fts_ai")
+    op.execute("DROP TABLE IF EXISTS quote_fts")
@@ -0,0 +1,44 @@
+"""Dense slot index for random quotes
+
+Revision ID: d7e2b4a9c1f3
+Revises: c3a91f5e27d4
+Create Date: 2026-10-18 14:02:37.118604
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7e2b4a9c1f3'
+down_revision = 'c3a91f5e27d4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # every quote id in slots 1..N without gaps, a random slot is a uniform pick
+    op.execute("""CREATE TABLE quote_slot (
+        slot INTEGER PRIMARY KEY,
+        quote_id INTEGER NOT NULL)""")
+    op.execute("CREATE INDEX ix_quote_slot_quote_id ON quote_slot (quote_id)")
+    op.execute("""CREATE TRIGGER quote_slot_ai AFTER INSERT ON quote BEGIN
+        INSERT INTO quote_slot(slot, quote_id)
+        VALUES ((SELECT IFNULL(MAX(slot), 0) + 1 FROM quote_slot), new.quote_id);
+    END""")
+    op.execute("""CREATE TRIGGER quote_slot_ad AFTER DELETE ON quote BEGIN
+        UPDATE quote_slot SET quote_id = (SELECT quote_id FROM quote_slot ORDER BY slot DESC LIMIT 1)
+        WHERE quote_id = old.quote_id;
+        DELETE FROM quote_slot WHERE slot = (SELECT MAX(slot) FROM quote_slot)
+        AND (quote_id = old.quote_id OR quote_id IN (
+            SELECT s.quote_id FROM quote_slot s WHERE s.slot < quote_slot.slot));
+    END""")
+    # number the quotes that already exist
+    op.execute("""INSERT INTO quote_slot(slot, quote_id)
+        SELECT ROW_NUMBER() OVER (ORDER BY quote_id), quote_id FROM quote""")
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS quote_slot_ad")
+    op.execute("DROP TRIGGER IF EXISTS quote_slot_ai")
+    op.execute("DROP TABLE IF EXISTS quote_slot")
@@ -0,0 +1,34 @@
+"""Denormalized quote count per user
+
+Revision ID: e41f9a6c3b20
+Revises: d7e2b4a9c1f3
+Create Date: 2026-10-18 14:31:09.552170
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e41f9a6c3b20'
+down_revision = 'd7e2b4a9c1f3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('quote_count', sa.Integer(), nullable=False,
+                                      server_default='0'))
+        batch_op.create_index('ix_user_quote_count', [sa.text('quote_count DESC'), 'id'],
+                              unique=False)
+
+    # count the quotes that already exist
+    op.execute("""UPDATE user SET quote_count =
+        (SELECT COUNT(*) FROM quote WHERE quote.user_id = user.id)""")
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index('ix_user_quote_count')
+        batch_op.drop_column('quote_count')
@@ -2,17 +2,38 @@ from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_login import LoginManager
-import os
+from notesapp.config import Config
+from sqlite_profile import configure_sqlite, apply_sqlite_profile
+from query_debug import QueryDebugger
+from compression import Compress
+from user_cache import UserCache
+from fragment_cache import FragmentCache
 
-app = Flask(__name__)
+db = SQLAlchemy()
+bcrypt = Bcrypt()
+login_manager = LoginManager()
+login_manager.login_view = 'notes.login'
+query_debugger = QueryDebugger()
+compress = Compress()
+user_cache = UserCache()
+cache = FragmentCache()     # rendered note cards, see _note_cards.html
 
-app.config['SECRET_KEY'] = 'SECRET_KEY'
-basedir = os.path.abspath(os.path.dirname(__file__))  # Get project directory
-SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(basedir, 'notesapp.db')
-app.config['SQLALCHEMY_DATABASE_URI'] = SQLALCHEMY_DATABASE_URI
-db = SQLAlchemy(app)
-bcrypt = Bcrypt(app)
-login_manager = LoginManager(app)
-login_manager.login_view = 'login'
 
-from notesapp import routes
\ No newline at end of file
+def create_app(config_class=Config):
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+
+    compress.init_app(app)
+    configure_sqlite(app)
+    db.init_app(app)
+    apply_sqlite_profile(app, db)
+    query_debugger.init_app(app, db)
+    bcrypt.init_app(app)
+    login_manager.init_app(app)
+    user_cache.init_app(app, db)   # behind the user_loader, see models.load_user
+    cache.init_app(app)
+
+    from notesapp.routes import notes
+    app.register_blueprint(notes)
+
+    return app
@@ -0,0 +1,17 @@
+import os
+
+basedir = os.path.abspath(os.path.dirname(__file__))
+
+
+class Config:
+    SECRET_KEY = os.getenv('NOTESAPP_SECRET_KEY', 'SECRET_KEY')
+    SQLALCHEMY_DATABASE_URI = os.getenv('NOTESAPP_DATABASE_URI',
+                                        'sqlite:///' + os.path.join(basedir, 'notesapp.db'))
+
+
+class TestConfig(Config):
+    # a fresh in-memory database per app, create the tables with db.create_all()
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    WTF_CSRF_ENABLED = False
+    USER_CACHE_TTL = 0
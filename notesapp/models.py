@@ -1,10 +1,10 @@
-from notesapp import db, login_manager
+from notesapp import db, login_manager, user_cache
 from flask_login import UserMixin
 from datetime import datetime
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(user_id)
+    return user_cache.load(User, user_id)
 
 
 class User(db.Model, UserMixin ):
@@ -23,7 +23,12 @@ class Note(db.Model):
     title = db.Column(db.String(100), nullable=False)
     date_posted = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     content = db.Column(db.Text, nullable=False)
+    # part of the cached card's key, NULL for notes not changed since the column was added
+    updated_at = db.Column(db.DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
 
+    # the home page reads a user's notes newest first from this index
+    __table_args__ = (db.Index('ix_note_user_date', user_id, date_posted.desc(), id),)
+
     def __repr__(self):
         return f"Note('{self.title}','{self.date_posted}')"
\ No newline at end of file
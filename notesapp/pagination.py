@@ -0,0 +1,48 @@
+import base64
+import json
+from datetime import datetime
+from sqlalchemy import and_, or_
+from notesapp.models import Note
+
+# note cards rendered per batch, on the home page and per infinite scroll fetch
+NOTES_PER_PAGE = 20
+
+
+# cursors are short JSON lists, base64 encoded so they are opaque to the browser
+def encode_token(values):
+    raw = json.dumps(values, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_token(token):
+    padded = token + '=' * (-len(token) % 4)
+    return json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+
+
+# the home page cursor is the (date_posted, id) of the last card shown
+def encode_cursor(note):
+    return encode_token([note.date_posted.isoformat(), note.id])
+
+
+def decode_cursor(cursor):
+    try:
+        date_posted, note_id = decode_token(cursor)
+        return datetime.fromisoformat(date_posted), int(note_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+
+def notes_page(user_id, cursor=None, limit=NOTES_PER_PAGE):
+    """One batch of a user's notes, newest first, and the cursor of the next batch.
+
+    Seeks on ix_note_user_date (user_id, date_posted DESC, id), so every batch
+    reads ``limit + 1`` index entries however many notes the user has.
+    """
+    query = Note.query.filter(Note.user_id == user_id)
+    if cursor:
+        date_posted, note_id = decode_cursor(cursor)
+        query = query.filter(or_(Note.date_posted < date_posted,
+                                 and_(Note.date_posted == date_posted, Note.id > note_id)))
+    notes = query.order_by(Note.date_posted.desc(), Note.id).limit(limit + 1).all()
+    next_cursor = encode_cursor(notes[limit - 1]) if len(notes) > limit else None
+    return notes[:limit], next_cursor
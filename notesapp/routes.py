@@ -1,22 +1,67 @@
-from flask import redirect, render_template, url_for, request, flash, abort
-from notesapp import app, bcrypt, db
+import click
+import logging
+from flask import redirect, render_template, url_for, request, flash, abort, Blueprint
+from notesapp import bcrypt, db, user_cache, cache
 from notesapp.forms import NoteForm, LoginForm, RegisterForm
 from notesapp.models import User, Note
+from notesapp.pagination import notes_page
+from notesapp.search import (search_notes, highlighted, index_missing_notes, rebuild_search_index,
+                             INDEX_BATCH_SIZE)
+from sqlalchemy.exc import OperationalError
+from db_schema import sync_schema
 from flask_login import login_user, logout_user, login_required, current_user
 
-notes = []
+# cli_group=None keeps the commands at the top level, flask --app notesapp init-db
+notes = Blueprint('notes', __name__, cli_group=None)
 
-@app.route('/', methods=['GET'])
-@app.route('/home', methods=['GET'])
+@notes.route('/', methods=['GET'])
+@notes.route('/home', methods=['GET'])
 def home():
     form = NoteForm()
     if current_user.is_authenticated:
-        notes = Note.query.filter_by(author=current_user).all()
-        return render_template('addnote.html', notes=notes, form=form, title='Add Note')
+        batch, next_cursor = user_notes_page()
+        return render_template('addnote.html', notes=batch, next_cursor=next_cursor,
+                               form=form, title='Add Note')
     return render_template('addnote.html', form=form)
 
 
-@app.route('/add', methods=['POST'])
+# next batch of note cards as an HTML fragment, fetched by the home page on scroll
+@notes.route('/notes/cards', methods=['GET'])
+@login_required
+def note_cards():
+    batch, next_cursor = user_notes_page()
+    return render_template('_note_cards.html', notes=batch, next_cursor=next_cursor)
+
+
+def user_notes_page():
+    try:
+        return notes_page(current_user.id, request.args.get('cursor'))
+    except ValueError:
+        abort(400)
+
+
+# full-text search over the current user's notes, best matches first
+@notes.route('/search', methods=['GET'])
+@login_required
+def search():
+    query = request.args.get('q', '').strip()
+    try:
+        results, next_cursor = search_notes(current_user.id, query, request.args.get('cursor'))
+    except ValueError:
+        abort(400)
+    except OperationalError as e:
+        db.session.rollback()
+        logging.error(f'Note search failed, is the search index built? {e}')
+        flash('Search is unavailable right now', 'danger')
+        return render_template('search.html', query=query, results=[], title='Search'), 503
+    return render_template('search.html', query=query, results=results, next_cursor=next_cursor,
+                           title='Search')
+
+
+notes.add_app_template_filter(highlighted)
+
+
+@notes.route('/add', methods=['POST'])
 @login_required
 def add_note():
     form = NoteForm()
@@ -25,33 +70,35 @@ def add_note():
         db.session.add(note)
         db.session.commit()
         flash('Note Added!','success')
-        return redirect(url_for('home'))
+        return redirect(url_for('notes.home'))
     
 
-@app.route('/delete/note/<int:note_id>', methods=['POST'])
+@notes.route('/delete/note/<int:note_id>', methods=['POST'])
 @login_required
 def delete_note(note_id):
     note = Note.query.get_or_404(note_id)
     if note.author != current_user:
         abort(403)
+    forget_note_card(note)
     db.session.delete(note)
     db.session.commit()
     flash('Note deleted!','info')
-    return redirect(url_for('home'))
+    return redirect(url_for('notes.home'))
 
 
-@app.route('/edit/note/<int:note_id>', methods=['GET','POST'])
+@notes.route('/edit/note/<int:note_id>', methods=['GET','POST'])
 def edit_note(note_id):
     note = Note.query.get_or_404(note_id)
     if note.author != current_user:
         abort(403)
     form = NoteForm()
     if form.validate_on_submit():
+        forget_note_card(note)
         note.title = form.title.data
         note.content = form.content.data
         db.session.commit()
         flash("Note Updated!!","success")
-        return redirect(url_for('home'))
+        return redirect(url_for('notes.home'))
     
     # pre-fill form fields only for GET requests
     form.title.data = note.title
@@ -59,10 +106,16 @@ def edit_note(note_id):
     return render_template('editnote.html', title='Edit Note', note=note, note_id=note.id, form=form)
 
 
-@app.route('/register', methods=['GET','POST'])
+def forget_note_card(note):
+    # drops the card cached for the note as it is now, same keys as _note_cards.html.
+    # A changed note gets a new updated_at and so a new key, a new note a new id
+    cache.forget('note-card', note.id, note.updated_at)
+
+
+@notes.route('/register', methods=['GET','POST'])
 def register():
     if current_user.is_authenticated:
-        return redirect(url_for("home"))
+        return redirect(url_for('notes.home'))
     
     form = RegisterForm()
     if form.validate_on_submit():
@@ -70,15 +123,16 @@ def register():
         user = User(username=form.username.data, email=form.email.data, password=hashed_pass)
         db.session.add(user)
         db.session.commit()
+        user_cache.invalidate(user.id)
         flash(f'{form.username.data}, your registration was successful!','success')
-        return redirect(url_for('home'))
+        return redirect(url_for('notes.home'))
     return render_template('register.html', form=form, title='Register')
 
 
-@app.route('/login', methods=['GET','POST'])
+@notes.route('/login', methods=['GET','POST'])
 def login():
     if current_user.is_authenticated:
-        return redirect(url_for('home'))
+        return redirect(url_for('notes.home'))
     
     form = LoginForm()
     if form.validate_on_submit():
@@ -86,13 +140,37 @@ def login():
         if user and bcrypt.check_password_hash(user.password, form.password.data):
             login_user(user,remember=False  )
             flash(f'{user.username}, you logged in successfully!','success')
-            return redirect(url_for('home'))
+            return redirect(url_for('notes.home'))
         else:
             flash('Login Unsuccessful!. Please check email and password', 'danger')
     return render_template('login.html', form=form, title='Login')
 
 
-@app.route('/logout')
+@notes.route('/logout')
 def logout():
     logout_user()
-    return redirect(url_for('home'))
\ No newline at end of file
+    return redirect(url_for('notes.home'))
+
+
+# flask --app notesapp init-db, creates missing tables, columns and indexes on an existing database
+@notes.cli.command('init-db')
+def init_db_command():
+    for change in sync_schema(db):
+        print(change)
+    indexed = index_missing_notes()
+    print(f'Notes database initialized, {indexed} notes added to the search index')
+
+
+# flask --app notesapp rebuild-search-index, reads notes missing from the search
+# index into it in small transactions, --full re-reads every note in one
+@notes.cli.command('rebuild-search-index')
+@click.option('--full', is_flag=True, help='Rebuild the whole index in one transaction.')
+@click.option('--batch-size', default=INDEX_BATCH_SIZE, show_default=True, help='Notes per transaction.')
+def rebuild_search_index_command(full, batch_size):
+    if full:
+        rebuild_search_index()
+        print('Note search index rebuilt')
+        return
+    indexed = index_missing_notes(batch_size, progress=lambda indexed, last_id:
+                                  print(f'{indexed} notes indexed, up to id {last_id}'))
+    print(f'Note search index up to date, {indexed} notes added')
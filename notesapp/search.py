@@ -0,0 +1,142 @@
+import re
+from markupsafe import Markup, escape
+from sqlalchemy import text
+from notesapp import db
+from notesapp.pagination import encode_token, decode_token
+
+# results shown per search page
+SEARCH_RESULTS = 20
+# notes read into the index per transaction by index_missing_notes
+INDEX_BATCH_SIZE = 5000
+
+# external content FTS5 index over note.title and note.content. The owner
+# column holds one token per user ('u' + user_id) read through the
+# note_search_source view, so a search ANDs the user's token with the terms
+# and FTS5 only walks that user's postings. The triggers keep the index in
+# step with the note table, a delete or update only removes what was
+# indexed, so notes not read in yet by index_missing_notes are safe to change.
+SEARCH_SCHEMA = [
+    """CREATE VIEW IF NOT EXISTS note_search_source AS
+        SELECT id, title, content, 'u' || user_id AS owner FROM note""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS note_fts USING fts5(
+        title, content, owner, content='note_search_source', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS note_fts_ai AFTER INSERT ON note BEGIN
+        INSERT INTO note_fts(rowid, title, content, owner)
+        VALUES (new.id, new.title, new.content, 'u' || new.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS note_fts_ad AFTER DELETE ON note
+    WHEN EXISTS (SELECT 1 FROM note_fts_docsize WHERE id = old.id) BEGIN
+        INSERT INTO note_fts(note_fts, rowid, title, content, owner)
+        VALUES ('delete', old.id, old.title, old.content, 'u' || old.user_id);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS note_fts_au AFTER UPDATE OF title, content, user_id ON note BEGIN
+        INSERT INTO note_fts(note_fts, rowid, title, content, owner)
+        SELECT 'delete', old.id, old.title, old.content, 'u' || old.user_id
+        WHERE EXISTS (SELECT 1 FROM note_fts_docsize WHERE id = old.id);
+        INSERT INTO note_fts(rowid, title, content, owner)
+        VALUES (new.id, new.title, new.content, 'u' || new.user_id);
+    END""",
+]
+
+# snippet markers, private use characters so the note text can be escaped
+# before they become <mark> tags
+MARK_OPEN, MARK_CLOSE = '\ue000', '\ue001'
+
+# title matches weigh ten times content matches, the owner column not at all.
+# rank and id of the last result shown are the cursor, ties on rank break on id
+SEARCH_QUERY = text(f"""
+    SELECT id, date_posted, rank, title, snippet FROM (
+        SELECT n.id AS id, n.date_posted AS date_posted,
+               bm25(note_fts, 10.0, 1.0, 0.0) AS rank,
+               highlight(note_fts, 0, '{MARK_OPEN}', '{MARK_CLOSE}') AS title,
+               snippet(note_fts, 1, '{MARK_OPEN}', '{MARK_CLOSE}', '...', 24) AS snippet
+        FROM note_fts
+        JOIN note n ON n.id = note_fts.rowid
+        WHERE note_fts MATCH :match
+    )
+    WHERE :after_rank IS NULL OR rank > :after_rank
+          OR (rank = :after_rank AND id > :after_id)
+    ORDER BY rank, id
+    LIMIT :limit
+""").columns(date_posted=db.DateTime)
+
+
+def match_expression(user_id, query):
+    """Turn user input into an FTS5 query over one user's notes.
+
+    Every word becomes a quoted phrase so FTS5 operators in the input are
+    treated as text, words are ANDed and a trailing ``*`` keeps prefix
+    search. Returns None when the input has no words.
+    """
+    terms = [f'"{word}"' + ('*' if star else '')
+             for word, star in re.findall(r'(\w+)(\*?)', query)]
+    if not terms:
+        return None
+    return f'owner:"u{int(user_id)}" AND {{title content}}:({" ".join(terms)})'
+
+
+def decode_search_cursor(cursor):
+    try:
+        rank, note_id = decode_token(cursor)
+        return float(rank), int(note_id)
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+
+
+def search_notes(user_id, query, cursor=None, limit=SEARCH_RESULTS):
+    """One page of a user's notes matching ``query``, best match first, and the next cursor."""
+    match = match_expression(user_id, query)
+    if match is None:
+        return [], None
+    after_rank, after_id = decode_search_cursor(cursor) if cursor else (None, None)
+    rows = db.session.execute(SEARCH_QUERY, {'match': match, 'after_rank': after_rank,
+                                             'after_id': after_id, 'limit': limit + 1}).all()
+    next_cursor = encode_token([rows[limit - 1].rank, rows[limit - 1].id]) \
+        if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def highlighted(fragment):
+    # escapes the note text, then turns the snippet markers into <mark> tags
+    return Markup(str(escape(fragment)).replace(MARK_OPEN, '<mark>').replace(MARK_CLOSE, '</mark>'))
+
+
+def create_search_index(connection):
+    for statement in SEARCH_SCHEMA:
+        connection.execute(text(statement))
+
+
+def rebuild_search_index():
+    # creates the index if it is missing, then re-reads every note into it
+    with db.engine.begin() as connection:
+        create_search_index(connection)
+        connection.execute(text("INSERT INTO note_fts(note_fts) VALUES ('rebuild')"))
+
+
+def index_missing_notes(batch_size=INDEX_BATCH_SIZE, progress=None):
+    """Read notes that are not in the search index yet into it, in id order.
+
+    Each batch of ``batch_size`` ids is its own short transaction, so the app
+    keeps writing while a large table is indexed, and a run that stops part
+    way picks up where it left off. Returns the number of notes indexed.
+    """
+    with db.engine.begin() as connection:
+        create_search_index(connection)
+    indexed, after = 0, 0
+    while True:
+        with db.engine.begin() as connection:
+            last = connection.execute(text("""
+                SELECT MAX(id) FROM (SELECT id FROM note WHERE id > :after ORDER BY id LIMIT :batch)
+            """), {'after': after, 'batch': batch_size}).scalar()
+            if last is None:
+                return indexed
+            indexed += connection.execute(text("""
+                INSERT INTO note_fts(rowid, title, content, owner)
+                SELECT id, title, content, owner FROM note_search_source
+                WHERE id > :after AND id <= :last
+                AND id NOT IN (SELECT id FROM note_fts_docsize WHERE id > :after AND id <= :last)
+            """), {'after': after, 'last': last}).rowcount
+        after = last
+        if progress is not None:
+            progress(indexed, after)
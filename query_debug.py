@@ -0,0 +1,131 @@
+import logging
+import os
+import re
+import time
+import traceback
+from collections import Counter
+from flask import g, has_request_context
+from sqlalchemy import event
+
+logger = logging.getLogger('query_debug')
+
+QUERY_DEBUG_DEFAULTS = {
+    'QUERY_REPEAT_THRESHOLD': 5,    # runs of one statement shape per request before it is reported
+    'QUERY_DEBUG_RAISE': None,      # raise NPlusOneError after the request, None means when TESTING
+    'SLOW_QUERY_MS': 100,           # statements slower than this are logged with their plan
+}
+
+# frames from these places are skipped when looking for the code that issued a query
+_LIBRARY_PATHS = tuple({os.path.dirname(os.__file__),
+                        os.sep + 'site-packages' + os.sep, os.sep + 'dist-packages' + os.sep,
+                        os.path.abspath(__file__)})
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACES = re.compile(r'\s+')
+
+
+class NPlusOneError(AssertionError):
+    pass
+
+
+def fingerprint(statement):
+    """The shape of a statement: literals become ``?`` and IN lists collapse."""
+    statement = _LITERALS.sub('?', statement)
+    statement = _IN_LISTS.sub('(?)', statement)
+    return _SPACES.sub(' ', statement).strip()
+
+
+def query_origin():
+    # innermost frame outside the libraries, i.e. the route or template that asked
+    for frame in reversed(traceback.extract_stack()[:-1]):
+        if not frame.filename.startswith('<') and not any(
+                path in frame.filename for path in _LIBRARY_PATHS):
+            return f'{frame.filename}:{frame.lineno} in {frame.name}'
+    return 'unknown'
+
+
+class QueryDebugger:
+    """Development aid that reports repeated statement shapes and slow queries.
+
+    Statements are fingerprinted per request. A shape that runs more than
+    QUERY_REPEAT_THRESHOLD times (the N+1 pattern of touching a lazy
+    relationship in a loop) is logged as a warning with the line that issued
+    it, and with QUERY_DEBUG_RAISE the request fails with ``NPlusOneError``
+    once it is done. Statements over SLOW_QUERY_MS are logged with their origin
+    and, on SQLite, their EXPLAIN QUERY PLAN.
+
+    Only hooked in when QUERY_DEBUG is set, or by default when the app is in
+    debug or testing mode at ``init_app`` time, so production pays nothing.
+    """
+
+    def __init__(self, app=None, db=None):
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        for key, value in QUERY_DEBUG_DEFAULTS.items():
+            app.config.setdefault(key, value)
+        enabled = app.config.get('QUERY_DEBUG')
+        if not (enabled if enabled is not None else app.debug or app.testing):
+            return
+        self.threshold = app.config['QUERY_REPEAT_THRESHOLD']
+        self.slow_seconds = app.config['SLOW_QUERY_MS'] / 1000
+        raise_errors = app.config['QUERY_DEBUG_RAISE']
+        self.raise_errors = app.testing if raise_errors is None else raise_errors
+
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._before_cursor)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor)
+
+    def _start(self):
+        g.query_shapes = Counter()
+        g.query_repeats = []
+
+    def _finish(self, response):
+        repeats = g.pop('query_repeats', None)
+        shapes = g.pop('query_shapes', None)
+        if repeats and self.raise_errors:
+            raise NPlusOneError('Repeated queries in one request:\n' + '\n'.join(
+                f'  {shapes[shape]}x {shape} (from {origin})' for shape, origin in repeats))
+        return response
+
+    def _before_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_debug_started', []).append(time.perf_counter())
+
+    def _after_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_debug_started'].pop()
+        if elapsed > self.slow_seconds:
+            plan = self._query_plan(conn, statement, parameters, executemany)
+            logger.warning('Slow query (%.1f ms) from %s\n%s%s', elapsed * 1000,
+                           query_origin(), statement, plan)
+
+        shapes = g.get('query_shapes') if has_request_context() else None
+        if shapes is None:
+            return
+        shape = fingerprint(statement)
+        shapes[shape] += 1
+        # reported once, when the shape first crosses the threshold
+        if shapes[shape] == self.threshold + 1:
+            origin = query_origin()
+            g.query_repeats.append((shape, origin))
+            logger.warning('Statement ran %d times in one request, N+1? from %s\n%s',
+                           shapes[shape], origin, shape)
+
+    def _query_plan(self, conn, statement, parameters, executemany):
+        if conn.dialect.name != 'sqlite' or executemany \
+                or not statement.lstrip().upper().startswith(('SELECT', 'WITH')):
+            return ''
+        # a separate DBAPI cursor, so no events fire and the pending results are untouched
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            rows = cursor.execute('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+            return '\nQUERY PLAN\n' + '\n'.join(f'  {row[-1]}' for row in rows)
+        except Exception as e:
+            return f'\nQUERY PLAN unavailable: {e}'
+        finally:
+            cursor.close()
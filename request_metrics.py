@@ -0,0 +1,175 @@
+import hmac
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, abort, current_app, g, has_request_context, request
+from sqlalchemy import event
+
+# upper bounds of the histogram buckets, +Inf is added when rendering
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# label for requests that matched no route, so 404 probes cannot create new series
+UNMATCHED = '<unmatched>'
+
+# who may read the metrics, every key can be overridden from the app config
+METRICS_DEFAULTS = {
+    'METRICS_PATH': '/metrics',
+    'METRICS_ENABLED': True,                        # False leaves the route out
+    'METRICS_TOKEN': None,                          # Authorization: Bearer <token>
+    'METRICS_ALLOWED_IPS': ('127.0.0.1', '::1'),    # remote addresses let in without it
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        # cumulative (le, count) pairs as Prometheus expects them
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            yield bound, cumulative
+
+
+def _labels(**labels):
+    escaped = (str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+class RequestMetrics:
+    """Per-endpoint request latency, SQL statement count and SQL time.
+
+    ``init_app(app, db)`` hooks the Flask request cycle and the cursor events
+    of every engine of ``db``, and serves everything in the Prometheus text
+    format at METRICS_PATH (default ``/metrics``). Scrapes are answered for
+    addresses in METRICS_ALLOWED_IPS (loopback by default) and for requests
+    carrying ``Authorization: Bearer <METRICS_TOKEN>``, anyone else gets a
+    404. Behind a proxy the address is the proxy's, so use the token there.
+    Recording a request costs
+    a few dictionary updates under one lock. Counters live in the worker
+    process, so with several workers each scrape sees the worker it reached.
+    Streamed bodies are timed up to the point their headers are sent.
+    """
+
+    def __init__(self, app=None, db=None):
+        self._lock = threading.Lock()
+        self.requests = {}        # (endpoint, method, status) -> count
+        self.latency = {}         # (endpoint, method) -> Histogram of seconds
+        self.statements = {}      # (endpoint, method) -> Histogram of statements per request
+        self.sql_seconds = {}     # (endpoint, method) -> total seconds spent in SQL
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        for key, value in METRICS_DEFAULTS.items():
+            app.config.setdefault(key, value)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._teardown)
+        if app.config['METRICS_ENABLED']:
+            app.add_url_rule(app.config['METRICS_PATH'], 'metrics', self.render_view)
+
+        with app.app_context():
+            engines = list(db.engines.values())
+        for engine in engines:
+            event.listen(engine, 'before_cursor_execute', self._before_cursor)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor)
+
+    def _start(self):
+        if request.endpoint != 'metrics':
+            # [started, statements, seconds in SQL]
+            g.request_metrics = [time.perf_counter(), 0, 0.0]
+
+    def _before_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and 'request_metrics' in g:
+            conn.info['metrics_query_started'] = time.perf_counter()
+
+    def _after_cursor(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.pop('metrics_query_started', None)
+        if started is not None and has_request_context():
+            timing = g.get('request_metrics')
+            if timing is not None:
+                timing[1] += 1
+                timing[2] += time.perf_counter() - started
+
+    def _record(self, status):
+        timing = g.pop('request_metrics', None)
+        if timing is None:
+            return
+        started, statements, sql_seconds = timing
+        elapsed = time.perf_counter() - started
+        req = request._get_current_object()   # one proxy lookup instead of three
+        endpoint = req.endpoint if req.url_rule is not None else UNMATCHED
+        key = (endpoint, req.method)
+        with self._lock:
+            self.requests[key + (status,)] = self.requests.get(key + (status,), 0) + 1
+            if key not in self.latency:
+                self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.statements[key] = Histogram(STATEMENT_BUCKETS)
+                self.sql_seconds[key] = 0.0
+            self.latency[key].observe(elapsed)
+            self.statements[key].observe(statements)
+            self.sql_seconds[key] += sql_seconds
+
+    def _finish(self, response):
+        self._record(response.status_code)
+        return response
+
+    # requests that raised never reach after_request
+    def _teardown(self, exc):
+        if exc is not None:
+            self._record(500)
+
+    def render(self):
+        lines = ['# HELP http_requests_total Requests handled, by endpoint, method and status.',
+                 '# TYPE http_requests_total counter']
+        histograms = (
+            ('http_request_duration_seconds', 'Time to produce the response in seconds.', self.latency),
+            ('http_request_sql_statements', 'SQL statements executed per request.', self.statements))
+        with self._lock:
+            for (endpoint, method, status), count in sorted(self.requests.items()):
+                labels = _labels(endpoint=endpoint, method=method, status=status)
+                lines.append(f'http_requests_total{labels} {count}')
+
+            for name, help_text, series in histograms:
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for (endpoint, method), histogram in sorted(series.items()):
+                    for bound, count in histogram.samples():
+                        labels = _labels(endpoint=endpoint, method=method, le=bound)
+                        lines.append(f'{name}_bucket{labels} {count}')
+                    labels = _labels(endpoint=endpoint, method=method)
+                    lines.append(f'{name}_sum{labels} {histogram.sum}')
+                    lines.append(f'{name}_count{labels} {histogram.count}')
+
+            lines += ['# HELP http_request_sql_seconds_total Time spent in SQL statements in seconds.',
+                      '# TYPE http_request_sql_seconds_total counter']
+            for (endpoint, method), seconds in sorted(self.sql_seconds.items()):
+                labels = _labels(endpoint=endpoint, method=method)
+                lines.append(f'http_request_sql_seconds_total{labels} {seconds}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _allowed():
+        config = current_app.config
+        token = config['METRICS_TOKEN']
+        if token:
+            scheme, _, given = request.headers.get('Authorization', '').partition(' ')
+            if scheme.lower() == 'bearer' and hmac.compare_digest(given.encode(), token.encode()):
+                return True
+        return request.remote_addr in (config['METRICS_ALLOWED_IPS'] or ())
+
+    def render_view(self):
+        if not self._allowed():
+            abort(404)
+        return Response(self.render(), mimetype='text/plain; version=0.0.4')
@@ -0,0 +1,86 @@
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+# connection settings for file-backed SQLite databases, every key can be
+# overridden from the app config
+SQLITE_DEFAULTS = {
+    'SQLITE_JOURNAL_MODE': 'WAL',       # readers no longer block the writer
+    'SQLITE_SYNCHRONOUS': 'NORMAL',     # fsync at checkpoints instead of every commit
+    'SQLITE_BUSY_TIMEOUT': 5000,        # ms a writer waits for the lock before "database is locked"
+    'SQLITE_MMAP_SIZE': 256 * 1024 * 1024,
+    'SQLITE_CACHE_SIZE': -64000,        # negative means KiB, so about 64 MB of page cache
+    'SQLITE_TEMP_STORE': 'MEMORY',
+    'SQLITE_POOL_SIZE': 5,
+    'SQLITE_MAX_OVERFLOW': 10,
+}
+
+JOURNAL_MODES = {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'}
+SYNCHRONOUS_MODES = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
+TEMP_STORES = {'DEFAULT', 'FILE', 'MEMORY'}
+
+
+def is_file_sqlite(uri):
+    if not uri or not uri.startswith('sqlite'):
+        return False
+    return uri.rstrip('/') not in ('sqlite:', 'sqlite://') and ':memory:' not in uri \
+        and 'mode=memory' not in uri
+
+
+def _choice(value, allowed, name):
+    value = str(value).upper()
+    if value not in allowed:
+        raise ValueError(f'{name} must be one of {sorted(allowed)}, got {value}')
+    return value
+
+
+def pragma_statements(settings):
+    """PRAGMAs for one connection, ``settings`` uses the SQLITE_* keys."""
+    settings = dict(SQLITE_DEFAULTS, **settings)
+    return [
+        f"PRAGMA journal_mode={_choice(settings['SQLITE_JOURNAL_MODE'], JOURNAL_MODES, 'SQLITE_JOURNAL_MODE')}",
+        f"PRAGMA synchronous={_choice(settings['SQLITE_SYNCHRONOUS'], SYNCHRONOUS_MODES, 'SQLITE_SYNCHRONOUS')}",
+        f"PRAGMA busy_timeout={int(settings['SQLITE_BUSY_TIMEOUT'])}",
+        f"PRAGMA mmap_size={int(settings['SQLITE_MMAP_SIZE'])}",
+        f"PRAGMA cache_size={int(settings['SQLITE_CACHE_SIZE'])}",
+        f"PRAGMA temp_store={_choice(settings['SQLITE_TEMP_STORE'], TEMP_STORES, 'SQLITE_TEMP_STORE')}",
+    ]
+
+
+def configure_sqlite(app):
+    """Fill in engine options for a file SQLite database, call before db.init_app.
+
+    Uses a QueuePool so connections (and their page cache and mmap) are kept
+    between requests. Options already present in SQLALCHEMY_ENGINE_OPTIONS win.
+    """
+    for key, value in SQLITE_DEFAULTS.items():
+        app.config.setdefault(key, value)
+    if not is_file_sqlite(app.config.get('SQLALCHEMY_DATABASE_URI')):
+        return
+
+    options = dict(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    options.setdefault('poolclass', QueuePool)
+    options.setdefault('pool_size', app.config['SQLITE_POOL_SIZE'])
+    options.setdefault('max_overflow', app.config['SQLITE_MAX_OVERFLOW'])
+    connect_args = dict(options.get('connect_args') or {})
+    # pooled connections move between threads, each is used by one at a time
+    connect_args.setdefault('check_same_thread', False)
+    connect_args.setdefault('timeout', app.config['SQLITE_BUSY_TIMEOUT'] / 1000)
+    options['connect_args'] = connect_args
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+
+def apply_sqlite_profile(app, db):
+    """Run the profile's PRAGMAs on every new connection, call after db.init_app."""
+    statements = pragma_statements({key: app.config[key] for key in SQLITE_DEFAULTS})
+
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for statement in statements:
+            cursor.execute(statement)
+        cursor.close()
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        if engine.dialect.name == 'sqlite' and is_file_sqlite(str(engine.url)):
+            event.listen(engine, 'connect', set_pragmas)
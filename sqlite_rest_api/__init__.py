@@ -1,8 +1,15 @@
 from flask import Flask
-from .extension import db, limiter, migrate, jwtmanager, cache
+from .extension import (db, limiter, migrate, jwtmanager, cache, metrics, query_debugger,
+                        compress)
 from .config import Config
 from flask_cors import CORS
+from sqlite_profile import configure_sqlite, apply_sqlite_profile
+from compact_responses import init_compact_responses
 from .routes import api
+from .identity import identity_cache
+from .models import bcrypt
+from .passwords import init_password_checks
+from .request_logging import init_request_logging, register_request_hooks
 
 def create_app(config = Config):
     # creating application instance
@@ -10,12 +17,24 @@ def create_app(config = Config):
 
     # setting configuration
     app.config.from_object(config)
+    init_compact_responses(app)     # orjson behind jsonify when it is installed
+    compress.init_app(app)  # registered first so its after_request hook runs last
+    init_request_logging(app)
+    register_request_hooks(app)     # ahead of the limiter, so 429s are logged too
+    configure_sqlite(app)   # engine options for the SQLite profile, before the engine exists
     db.init_app(app)    # initializing the database instance with app
+    apply_sqlite_profile(app, db)
+    metrics.init_app(app, db)   # request latency and SQL counts at /metrics
+    query_debugger.init_app(app, db)    # N+1 and slow query reports, debug/testing only
     limiter.init_app(app)
     jwtmanager.init_app(app)
+    bcrypt.init_app(app)    # picks up BCRYPT_LOG_ROUNDS
     cache.init_app(app)
     CORS(app)
     migrate.init_app(app, db)
+    identity_cache.configure(maxsize=app.config.get('IDENTITY_CACHE_SIZE'),
+                             ttl=app.config.get('IDENTITY_CACHE_TTL'))
+    init_password_checks(app)
 
     app.register_blueprint(api, url_prefix='/api')
 
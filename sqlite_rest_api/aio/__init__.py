@@ -0,0 +1,35 @@
+from quart import Quart
+from compact_responses import init_compact_responses
+from ..config import Config
+from ..identity import identity_cache
+from ..request_logging import init_request_logging
+from .auth import init_jwt, init_password_checks
+from .extension import adb, rate_limiter, response_cache, compress
+from .request_logging import register_request_hooks
+from .routes import api
+
+
+def create_async_app(config=Config):
+    """ASGI twin of create_app: same /api contract, async handlers throughout.
+
+    SQL runs on SQLAlchemy's async engine over aiosqlite and bcrypt on a
+    thread pool, so a worker keeps serving other requests while either is
+    busy. Serve it with an ASGI server, e.g. ``hypercorn sqlite_rest_api_asgi:app``.
+    """
+    app = Quart(__name__)
+    app.config.from_object(config)
+    init_compact_responses(app)     # Quart uses Flask's JSON providers
+    compress.init_app(app)  # registered first so its after_request hook runs last
+    init_request_logging(app)
+    register_request_hooks(app)
+    adb.init_app(app)
+    rate_limiter.init_app(app)
+    response_cache.init_app(app)
+    identity_cache.configure(maxsize=app.config.get('IDENTITY_CACHE_SIZE'),
+                             ttl=app.config.get('IDENTITY_CACHE_TTL'))
+    init_jwt(app)
+    init_password_checks(app)
+
+    app.register_blueprint(api, url_prefix='/api')
+
+    return app
@@ -0,0 +1,167 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+import bcrypt
+import flask_jwt_extended
+from flask import Flask
+from flask_jwt_extended import JWTManager, decode_token
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt import ExpiredSignatureError, InvalidTokenError
+from quart import current_app, g, jsonify, request
+from sqlalchemy import select
+from ..identity import ApiUser, identity_cache
+from ..models import User
+from ..passwords import (PasswordCheckBusy, configure_credential_cache, credential_key,
+                         verified_credentials)
+from .extension import adb
+
+_executor = None
+_slots = None
+
+
+def init_password_checks(app):
+    global _executor
+    configure_credential_cache(app)
+    _executor = ThreadPoolExecutor(max_workers=app.config.get('BCRYPT_MAX_WORKERS', 4),
+                                   thread_name_prefix='bcrypt')
+
+
+# created on first use, an asyncio primitive belongs to the loop that serves requests
+def _queue_slots():
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(_executor._max_workers * 4)
+    return _slots
+
+
+async def _run_bcrypt(func, *args):
+    """Run a bcrypt call on the executor, the event loop keeps serving meanwhile.
+
+    Same limits as the WSGI app: at most workers * 4 checks running or queued
+    and BCRYPT_TIMEOUT seconds each, waiting for a slot included,
+    ``PasswordCheckBusy`` otherwise.
+    """
+    timeout = current_app.config.get('BCRYPT_TIMEOUT', 5)
+    loop = asyncio.get_running_loop()
+    # one deadline for the slot and the call together
+    deadline = loop.time() + timeout
+    slots = _queue_slots()
+    try:
+        await asyncio.wait_for(slots.acquire(), timeout)
+    except asyncio.TimeoutError:
+        raise PasswordCheckBusy('Too many password checks in progress')
+    future = loop.run_in_executor(_executor, func, *args)
+    # the slot is held until bcrypt really finishes, even if we stop waiting
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        return await asyncio.wait_for(asyncio.shield(future), max(deadline - loop.time(), 0))
+    except asyncio.TimeoutError:
+        raise PasswordCheckBusy('Password check timed out')
+
+
+async def hash_password(password):
+    rounds = current_app.config.get('BCRYPT_LOG_ROUNDS', 12)
+    hashed = await _run_bcrypt(bcrypt.hashpw, password.encode('utf-8'), bcrypt.gensalt(rounds))
+    return hashed.decode('utf-8')
+
+
+async def check_password(user, password):
+    key = credential_key(user.username, password, user.password,
+                         secret=current_app.config['CREDENTIAL_CACHE_SECRET'])
+    if verified_credentials.get(key):
+        return True
+    valid = await _run_bcrypt(bcrypt.checkpw, password.encode('utf-8'),
+                              user.password.encode('utf-8'))
+    if valid:
+        verified_credentials.set(key, True)
+    return valid
+
+
+def init_jwt(app):
+    """Tokens are made and checked by flask_jwt_extended, as in the WSGI app.
+
+    It needs a Flask app context, so a bare Flask app holding the SECRET_KEY
+    and JWT_* settings and a JWTManager does that work. Tokens therefore work
+    against either serving mode and follow the same configuration.
+    """
+    tokens = Flask(__name__)
+    tokens.config.update({key: value for key, value in app.config.items()
+                          if key == 'SECRET_KEY' or key.startswith('JWT_')})
+    JWTManager(tokens)
+    app.extensions['jwt_tokens'] = tokens
+
+
+def create_access_token(identity, expires_delta, additional_claims=None):
+    with current_app.extensions['jwt_tokens'].app_context():
+        return flask_jwt_extended.create_access_token(identity=identity,
+                                                      expires_delta=expires_delta,
+                                                      additional_claims=additional_claims)
+
+
+def jwt_required(f):
+    # error bodies and statuses follow flask_jwt_extended's defaults
+    @wraps(f)
+    async def decorated_function(*args, **kwargs):
+        tokens = current_app.extensions['jwt_tokens']
+        name, header_type = tokens.config['JWT_HEADER_NAME'], tokens.config['JWT_HEADER_TYPE']
+        header = request.headers.get(name, '')
+        if not header:
+            return jsonify({'msg': f'Missing {name} Header'}), 401
+        scheme, _, token = header.partition(' ') if header_type else (header_type, '', header)
+        if scheme != header_type or not token:
+            expected = f'{header_type} <JWT>' if header_type else '<JWT>'
+            return jsonify({'msg': f"Bad {name} header. Expected '{name}: {expected}'"}), 422
+        try:
+            with tokens.app_context():
+                claims = decode_token(token)
+        except ExpiredSignatureError:
+            return jsonify({'msg': 'Token has expired'}), 401
+        except (InvalidTokenError, JWTExtendedException) as e:
+            return jsonify({'msg': str(e)}), 422
+        if claims.get('type') != 'access':
+            return jsonify({'msg': 'Only non-refresh tokens are allowed'}), 422
+        g.jwt_claims = claims
+        # decode_token has checked the identity claim is there
+        g.jwt_identity = claims[tokens.config['JWT_IDENTITY_CLAIM']]
+        return await f(*args, **kwargs)
+    return decorated_function
+
+
+def get_jwt_identity():
+    return g.get('jwt_identity')
+
+
+async def current_api_user():
+    """Async twin of identity.current_api_user, shares its identity cache."""
+    if 'api_user' in g:
+        return g.api_user
+
+    email = get_jwt_identity()
+    claims = g.jwt_claims
+    if all(claim in claims for claim in ('uid', 'username', 'role')):
+        user = ApiUser(claims['uid'], claims['username'], email, claims['role'])
+    else:
+        user = identity_cache.get(email)
+        if user is None:
+            row = await adb.session.scalar(select(User).filter_by(email=email))
+            if row is not None:
+                user = ApiUser(row.id, row.username, row.email, row.role)
+                identity_cache.set(email, user)
+
+    g.api_user = user
+    return user
+
+
+def role_required(role):
+    def decorator(f):
+        @wraps(f)
+        async def decorated_function(*args, **kwargs):
+            user = await current_api_user()
+            if not user:
+                return jsonify({'message': 'User not found', 'code': 401}), 401
+            if user.role != role:
+                return jsonify({'message': 'Access Denied', 'code': 403}), 403
+            return await f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
@@ -0,0 +1,264 @@
+import asyncio
+from functools import wraps
+from cachelib import SimpleCache
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import STRATEGIES
+from quart import current_app, g, jsonify, make_response, request
+from quart.wrappers.response import DataBody, IterableBody
+from sqlalchemy import event, select, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlite_profile import SQLITE_DEFAULTS, is_file_sqlite, pragma_statements
+from compression import Compress
+from ..caching import (BUMP_GENERATION, cache_generation, view_key, view_etag, matched_etag,
+                       revalidated)
+from ..extension import rate_limit_payload
+from .. import limiter_storage   # noqa: F401  registers the sqlite-limits:// storage scheme
+
+
+def async_database_uri(uri):
+    # sqlite:///quotes.db -> sqlite+aiosqlite:///quotes.db
+    scheme, rest = uri.split('://', 1)
+    return f"{scheme.split('+')[0]}+aiosqlite://{rest}" if scheme.startswith('sqlite') else uri
+
+
+class AsyncDatabase:
+    """Async engine over aiosqlite with one AsyncSession per request.
+
+    The SQLite profile from sqlite_profile.py is applied to every new
+    connection, the same as in the WSGI app.
+    """
+
+    def __init__(self):
+        self.engine = None
+        self.sessionmaker = None
+
+    def init_app(self, app):
+        uri = app.config['SQLALCHEMY_DATABASE_URI']
+        self.engine = create_async_engine(async_database_uri(uri))
+        self.sessionmaker = async_sessionmaker(self.engine, class_=AsyncSession,
+                                               expire_on_commit=False)
+        if is_file_sqlite(uri):
+            settings = {key: app.config.get(key, value) for key, value in SQLITE_DEFAULTS.items()}
+            statements = pragma_statements(settings)
+
+            def set_pragmas(dbapi_connection, connection_record):
+                cursor = dbapi_connection.cursor()
+                for statement in statements:
+                    cursor.execute(statement)
+                cursor.close()
+
+            event.listen(self.engine.sync_engine, 'connect', set_pragmas)
+        app.teardown_appcontext(self._close_session)
+
+    @property
+    def session(self):
+        if 'async_session' not in g:
+            g.async_session = self.sessionmaker()
+        return g.async_session
+
+    async def _close_session(self, exc):
+        session = g.pop('async_session', None)
+        if session is not None:
+            await session.close()
+
+
+class AsyncRateLimiter:
+    """Flask-Limiter's decisions for the async app, on the same storage.
+
+    Keys are built the way Flask-Limiter builds them, so with a shared
+    RATELIMIT_STORAGE_URI both serving modes count against one limit.
+    """
+
+    def __init__(self):
+        self.strategy = None
+        self.enabled = True
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RATELIMIT_ENABLED', True)
+        storage = storage_from_string(app.config.get('RATELIMIT_STORAGE_URI', 'memory://'),
+                                      **app.config.get('RATELIMIT_STORAGE_OPTIONS', {}))
+        self.strategy = STRATEGIES[app.config.get('RATELIMIT_STRATEGY', 'fixed-window')](storage)
+
+    async def hit(self, limit, endpoint):
+        # the limits storages are synchronous, sqlite-limits:// takes a file
+        # lock, so the hit runs on a worker thread and the loop keeps serving
+        if not self.enabled:
+            return True
+        return await asyncio.to_thread(self.strategy.hit, limit, request.remote_addr, endpoint)
+
+    def limit(self, limit_string):
+        """Route decorator, answers 429 with the WSGI app's body once ``limit_string`` is used up."""
+        limit = parse(limit_string)
+
+        def decorator(f):
+            @wraps(f)
+            async def decorated_function(*args, **kwargs):
+                if not await self.hit(limit, request.endpoint):
+                    return jsonify(rate_limit_payload(limit)), 429
+                return await f(*args, **kwargs)
+            return decorated_function
+        return decorator
+
+
+class AsyncCompress(Compress):
+    """Compress for Quart, the same settings, negotiation and ETag tagging.
+
+    Buffered bodies are compressed whole, streamed ones chunk by chunk as the
+    server sends them. File bodies are left alone.
+    """
+
+    def negotiate(self):
+        return super().negotiate(request.accept_encodings)
+
+    def compressible(self, response):
+        return (bool(self.algorithms) and response.mimetype in self.mimetypes
+                and 'Content-Encoding' not in response.headers
+                and isinstance(response.response, (DataBody, IterableBody))
+                and not response.cache_control.no_transform)
+
+    async def variants(self, response):
+        if not self.compressible(response) or not isinstance(response.response, DataBody):
+            return {}
+        data = await response.get_data()
+        if len(data) < self.min_size:
+            return {}
+        return {encoding: self.compress(data, encoding) for encoding in self.algorithms}
+
+    async def _compress_stream(self, chunks, encoding):
+        process, finish = self._compressor(encoding)
+        async for chunk in chunks:
+            data = process(chunk)
+            if data:
+                yield data
+        yield finish()
+
+    async def _after_request(self, response):
+        if not self.compressible(response):
+            self._tag_etag(response)
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = self.negotiate()
+        if encoding is None or not 200 <= response.status_code < 300 \
+                or response.status_code in (204, 206):
+            return response
+
+        if isinstance(response.response, IterableBody):
+            response.response = IterableBody(self._compress_stream(response.iter_encode(), encoding))
+            response.headers.pop('Content-Length', None)
+        else:
+            data = await response.get_data()
+            if len(data) < self.min_size:
+                return response
+            response.set_data(self.compress(data, encoding))
+        response.headers['Content-Encoding'] = encoding
+        self._tag_etag(response)
+        return response
+
+
+class AsyncResponseCache:
+    """The tag generations and cached bodies of VersionedCache for the async app.
+
+    Entries are ``(body, status, headers, variants)`` under the keys and
+    ETags of caching.view_key and caching.view_etag, ``variants`` are the
+    compressed copies from AsyncCompress. Generations are read from the same
+    cache_generation table the WSGI app uses, so a write in either mode moves
+    both to a new generation. Entries stay in the process.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.cache = SimpleCache()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def init_app(self, app):
+        self.cache = SimpleCache(threshold=app.config.get('CACHE_THRESHOLD', 500))
+
+    async def generations(self, tags):
+        # read once per request, a tag that was never written has generation 0
+        known = g.setdefault('cache_generations', {})
+        missing = [tag for tag in tags if tag not in known]
+        if missing:
+            rows = await self.db.session.execute(
+                select(cache_generation.c.tag, cache_generation.c.generation)
+                .where(cache_generation.c.tag.in_(missing)))
+            found = dict(rows.all())
+            known.update((tag, found.get(tag, 0)) for tag in missing)
+        return [known[tag] for tag in tags]
+
+    async def invalidate(self, *tags):
+        # for changes the triggers do not see, commits on its own connection
+        async with self.db.engine.begin() as connection:
+            for tag in tags:
+                await connection.execute(text(BUMP_GENERATION.format(tag=':tag')), {'tag': tag})
+        self.invalidations += 1
+
+    def conditional(self, *tags):
+        """VersionedCache.conditional for async views."""
+        def decorator(f):
+            @wraps(f)
+            async def decorated_function(*args, **kwargs):
+                etag = view_etag(request, await self.generations(tags))
+                compress = current_app.extensions.get('compress')
+                matched = matched_etag(request, etag, compress.negotiate() if compress else None)
+                if matched is not None:
+                    return revalidated(await make_response('', 304), matched)
+                response = await make_response(await f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                return revalidated(response, etag)
+            return decorated_function
+        return decorator
+
+    def cached(self, *tags, timeout=None):
+        """VersionedCache.cached for async views, per identity. Streamed bodies are not stored."""
+        def decorator(f):
+            @wraps(f)
+            async def decorated_function(*args, **kwargs):
+                key = view_key(request, await self.generations(tags), g.get('jwt_identity'))
+                compress = current_app.extensions.get('compress')
+                entry = self.get(key)
+                if entry is not None:
+                    body, status, headers, variants = entry
+                    response = await make_response(body, status, headers)
+                    return compress.use_variant(response, variants) if compress else response
+
+                response = await make_response(await f(*args, **kwargs))
+                if response.status_code == 200 and isinstance(response.response, DataBody):
+                    variants = await compress.variants(response) if compress else {}
+                    self.set(key, (await response.get_data(), response.status_code,
+                                   list(response.headers.items()), variants), timeout)
+                return response
+            return decorated_function
+        return decorator
+
+    def get(self, key):
+        entry = self.cache.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def set(self, key, entry, timeout):
+        self.cache.set(key, entry, timeout=timeout)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit ratio': round(self.hits / lookups, 4) if lookups else None,
+            'invalidations': self.invalidations,
+            'evictions': None,
+            'size': len(self.cache._cache),
+            'threshold': self.cache._threshold,
+        }
+
+
+adb = AsyncDatabase()
+rate_limiter = AsyncRateLimiter()
+compress = AsyncCompress()
+response_cache = AsyncResponseCache(adb)
@@ -0,0 +1,34 @@
+import time
+from quart import current_app, g, request
+from ..request_logging import (request_logger, payload_summary, redacted_payload, is_sampled,
+                               is_logged, request_entry)
+
+
+def register_request_hooks(app):
+    # the WSGI app's request log for Quart, app-wide so the requests the rate
+    # limit turns away with 429 are timed and logged as well
+    app.before_request(start_request)
+    app.after_request(finish_request)
+
+
+async def start_request():
+    try:
+        config = current_app.config
+        g.log_started = time.perf_counter()
+        g.log_sampled = is_sampled(config, request)
+        if g.log_sampled and request.method in ('POST', 'PUT', 'PATCH'):
+            summary = payload_summary(config, request)
+            # the body is kept by the request, the view reads it again
+            g.log_payload = summary if summary is not None \
+                else redacted_payload(config, await request.get_json(silent=True))
+    except Exception:
+        pass
+
+
+async def finish_request(response):
+    try:
+        if is_logged(g, response):
+            request_logger.info('request', extra={'request': request_entry(request, response, g)})
+    except Exception:
+        pass
+    return response
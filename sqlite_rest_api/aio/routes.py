@@ -0,0 +1,429 @@
+import logging
+from datetime import timedelta
+from quart import Blueprint, request, jsonify, url_for, current_app, abort
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError, OperationalError
+from compact_responses import requested_fields
+from ..models import User, Quote
+from ..identity import identity_claims
+from ..authors import quote_count_update, top_authors_query, author_to_dict
+from ..passwords import PasswordCheckBusy
+from ..bulk import (BULK_DECODERS, BulkUpload, BulkFormatError, insert_quotes, edit_quotes,
+                    delete_quotes, batch_list, batch_result)
+from ..sampling import random_quote, daily_quote
+from ..search import (match_expression, search_params, search_page, search_cursor_key,
+                      search_result_to_dict, SEARCH_QUERY)
+from ..pagination import (cursor_from_args, keyset_query, keyset_page, decode_cursor, page_args,
+                          key_arg, wants_total, CURSOR_ARGS)
+from ..serializers import (quote_listing, quote_to_dict, quote_serializer, page_envelope,
+                           cursor_envelope, quotes_link, quote_page_query, quote_count_query,
+                           STREAM_THRESHOLD, QUOTE_FIELDS, EXPORT_FORMATS, ExportEncoder,
+                           export_query, export_headers)
+from ..serializers import listing_response as _listing_response
+from .auth import (jwt_required, role_required, current_api_user, get_jwt_identity,
+                   create_access_token, check_password, hash_password)
+from .extension import adb, rate_limiter, response_cache
+
+# The views read the request and await the database, everything else comes
+# from the modules the WSGI routes use.
+
+# same blueprint name as the WSGI app, so endpoints and url_for targets match
+api = Blueprint('api', __name__)
+
+
+def listing_response(envelope, rows, serialize=quote_to_dict, stream=False):
+    return _listing_response(envelope, rows, serialize, stream, app=current_app,
+                             accept_mimetypes=request.accept_mimetypes)
+
+
+@api.route('/register', methods=['POST'])
+async def register():
+    try:
+        data = await request.get_json(silent=True)
+        if not data:
+            logging.error('Request body is empty or invalid.')
+            return jsonify({'message': 'Invalid or missing data', 'code': 400}), 400
+
+        username = data.get('username')
+        email = data.get('email')
+        password = data.get('password')
+        role = data.get('role', 'user')
+
+        if not username or not email or not password:
+            logging.warning('User creation failed: Missing required fields.')
+            return jsonify({'message': 'Missing required fields', 'code': 400}), 400
+
+        user = User(username=username, email=email, role=role,
+                    password=await hash_password(password))
+        adb.session.add(user)
+        await adb.session.commit()
+
+        logging.info(f'User - {username} created successfully')
+        return jsonify({'message': 'User created successfully', 'code': 201}), 201
+
+    except IntegrityError:
+        await adb.session.rollback()
+        logging.error(f'Duplicate entry or integrity constraint violation for user: {username}')
+        return jsonify({'error': 'Integrity Error', 'message': 'Username or Email already exists'}), 409
+    except SQLAlchemyError as e:
+        await adb.session.rollback()
+        logging.error(f'Database error while adding user: {str(e)}')
+        return jsonify({'error': 'Database Error', 'message': str(e)}), 500
+    except PasswordCheckBusy as e:
+        logging.error(f'Registration rejected, {e}')
+        return jsonify({'message': 'Server busy, try again', 'code': 503}), 503
+
+
+@api.route('/login', methods=['POST'])
+async def login():
+    try:
+        data = await request.get_json(silent=True)
+        if not data:
+            return jsonify({'message': 'Unauthorized access', 'code': 401}), 401
+        username = data.get('username')
+        password = data.get('password')
+        if not username or not password:
+            return jsonify({'message': 'Credentials Required', 'code': 400}), 400
+        user = await adb.session.scalar(select(User).filter_by(username=username))
+        if not user or not await check_password(user, password):
+            logging.warning(f'Login failed for user - {username}')
+            return jsonify({'message': 'Invalid credentials', 'code': 401}), 401
+        access_token = create_access_token(identity=user.email, expires_delta=timedelta(minutes=60),
+                                           additional_claims=identity_claims(user))
+        return jsonify({'message': 'Login successful and Token generted',
+                        'Token': access_token,
+                        'code': 200}), 200
+    except PasswordCheckBusy as e:
+        logging.error(f'Login rejected, {e}')
+        return jsonify({'message': 'Server busy, try again', 'code': 503}), 503
+
+
+@api.route('/add', methods=['POST'])
+@jwt_required
+@role_required('user')
+async def add_quote():
+    data = await request.get_json(silent=True)
+    if not data or 'quote' not in data:
+        logging.error('Bad request - No quote to add!')
+        return jsonify({'message': 'No quote to add', 'code': 400}), 400
+    try:
+        user = await current_api_user()
+        adb.session.add(Quote(quote=data['quote'], user_id=user.id))
+        await adb.session.execute(quote_count_update(user.id, 1))
+        await adb.session.commit()
+        logging.info(f'Quote added by {user.username}')
+        return jsonify({'message': 'Quote added successfully', 'code': 201}), 201
+    except Exception as e:
+        await adb.session.rollback()
+        logging.error(f'An error occured while adding quote. {e}')
+        return jsonify({'error': f'Error occurred {e}', 'code': 500}), 500
+
+
+async def body_chunks():
+    # the request body chunk by chunk as the server receives it, then the
+    # empty chunk that ends the upload
+    async for chunk in request.body:
+        if chunk:
+            yield chunk
+    yield b''
+
+
+@api.route('/quotes/bulk', methods=['POST'])
+@jwt_required
+@role_required('user')
+async def add_quotes_bulk():
+    if request.mimetype not in BULK_DECODERS:
+        logging.error(f'Bad request - unsupported bulk content type {request.mimetype}')
+        return jsonify({'message': 'Send application/x-ndjson or a JSON array', 'code': 415}), 415
+
+    try:
+        user = await current_api_user()
+        upload = BulkUpload(BULK_DECODERS[request.mimetype](),
+                            current_app.config.get('BULK_BATCH_SIZE', 1000))
+        async for chunk in body_chunks():
+            for texts, rejected in upload.feed(chunk):
+                # one executemany transaction per batch, the same code as the WSGI app
+                inserted = await adb.session.run_sync(
+                    lambda session: insert_quotes(texts, user.id, session)) if texts else 0
+                upload.record(texts, rejected, inserted)
+            if upload.done:
+                break
+        logging.info(f'Bulk upload by {user.username} - {upload.totals()}')
+        if upload.error:
+            logging.error(f'Bulk upload stopped early - {upload.error}')
+        payload, status = upload.result()
+        return jsonify(payload), status
+    except Exception as e:
+        await adb.session.rollback()
+        logging.error(f'An error occured during bulk upload. {e}')
+        return jsonify({'error': f'Error occurred {e}', 'code': 500}), 500
+
+
+@api.route('/quotes', methods=['GET'])
+@jwt_required
+@rate_limiter.limit('3 per minute')
+@response_cache.conditional('quotes')
+@response_cache.cached('quotes', timeout=30)
+async def get_quotes():
+    try:
+        fields = requested_fields(QUOTE_FIELDS, request.args)
+    except ValueError as e:
+        logging.error(f'Bad request - {e}')
+        return jsonify({'message': str(e), 'code': 400}), 400
+    try:
+        user = await current_api_user()
+        if any(arg in request.args for arg in CURSOR_ARGS):
+            return await get_quotes_by_cursor(user, fields)
+
+        page, per_page = page_args(request.args)
+        total = await adb.session.scalar(quote_count_query())
+        rows = (await adb.session.execute(quote_page_query(fields, page, per_page))).all()
+        logging.info(f'Quotes Fetched for user - {user.username}')
+        envelope = page_envelope(quotes_link(url_for, request.args), page, per_page, total)
+        return listing_response(envelope, rows, quote_serializer(fields),
+                                stream=per_page > STREAM_THRESHOLD), 200
+
+    except Exception as e:
+        logging.error(f'Error occured while fetching quotes.{e}')
+        return jsonify({'message': f'Error occured while fetching quotes - {e}', 'code': 500}), 500
+
+
+async def get_quotes_by_cursor(user, fields=None):
+    try:
+        direction, key = cursor_from_args(request.args)
+    except ValueError:
+        logging.error('Bad request - invalid quotes cursor')
+        return jsonify({'message': 'Invalid cursor', 'code': 400}), 400
+
+    statement, limit = keyset_query(quote_listing(fields), Quote.quote_id, direction=direction,
+                                    key=key, limit=request.args.get('limit', 10, type=int))
+    rows = (await adb.session.execute(statement)).all()
+    page = keyset_page(rows, Quote.quote_id, direction, key, limit)
+    logging.info(f'Quotes Fetched by cursor for user - {user.username}')
+
+    envelope = cursor_envelope(quotes_link(url_for, request.args), page)
+    if wants_total(request.args):
+        envelope['total quotes'] = await adb.session.scalar(quote_count_query())
+    return listing_response(envelope, page['items'], quote_serializer(fields),
+                            stream=page['limit'] > STREAM_THRESHOLD), 200
+
+
+@api.route('/quotes/search', methods=['GET'])
+@jwt_required
+async def search_quotes_by_text():
+    query = request.args.get('q', '').strip()
+    if not match_expression(query):
+        logging.error('Bad request - empty search query')
+        return jsonify({'message': 'Search query q is required', 'code': 400}), 400
+    try:
+        after = None
+        if request.args.get('cursor'):
+            _, after = decode_cursor(request.args['cursor'], key_type=search_cursor_key)
+    except ValueError:
+        logging.error('Bad request - invalid search cursor')
+        return jsonify({'message': 'Invalid cursor', 'code': 400}), 400
+
+    limit = request.args.get('limit', 10, type=int)
+    params, limit = search_params(query, after, limit)
+    try:
+        rows, next_cursor = search_page((await adb.session.execute(SEARCH_QUERY, params)).all(), limit)
+    except OperationalError as e:
+        await adb.session.rollback()
+        logging.error(f'Quote search failed, is the search index built? {e}')
+        return jsonify({'message': 'Search is unavailable', 'code': 503}), 503
+
+    logging.info(f'Quotes searched by {get_jwt_identity()} - {query}')
+    return listing_response({
+        'query': query,
+        'next cursor': next_cursor,
+        'next page': url_for('api.search_quotes_by_text', q=query, cursor=next_cursor, limit=limit)
+        if next_cursor else None}, rows, serialize=search_result_to_dict), 200
+
+
+@api.route('/quotes/random', methods=['GET'])
+@jwt_required
+async def get_random_quote():
+    try:
+        row = await adb.session.run_sync(lambda session: random_quote(session))
+    except OperationalError as e:
+        await adb.session.rollback()
+        logging.error(f'Random quote failed, is the sample index built? {e}')
+        return jsonify({'message': 'Random quotes are unavailable', 'code': 503}), 503
+    if row is None:
+        return jsonify({'message': 'No quotes yet', 'code': 404}), 404
+    response = jsonify({'data': quote_to_dict(row)})
+    response.cache_control.no_store = True
+    return response, 200
+
+
+@api.route('/quotes/daily', methods=['GET'])
+@jwt_required
+async def get_daily_quote():
+    try:
+        picked = await adb.session.run_sync(lambda session: daily_quote(session))
+    except OperationalError as e:
+        await adb.session.rollback()
+        logging.error(f'Quote of the day failed, is the sample index built? {e}')
+        return jsonify({'message': 'Quote of the day is unavailable', 'code': 503}), 503
+    if picked is None:
+        return jsonify({'message': 'No quotes yet', 'code': 404}), 404
+    return jsonify({'data': picked}), 200
+
+
+async def export_chunks(after, to_chunks, gzip):
+    # its own session, the body is still streaming after the request context ends
+    encoder = ExportEncoder(to_chunks, gzip)
+    async with adb.sessionmaker() as session:
+        result = await session.stream(export_query(after))
+        async for rows in result.partitions():
+            for chunk in encoder.encode(rows):
+                yield chunk
+    for chunk in encoder.finish():
+        yield chunk
+
+
+@api.route('/quotes/export', methods=['GET'])
+@jwt_required
+async def export_quotes_stream():
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        logging.error(f'Bad request - unknown export format {export_format}')
+        return jsonify({'message': 'format must be ndjson or csv', 'code': 400}), 400
+
+    try:
+        after = key_arg(request.args, 'after')
+    except ValueError as e:
+        logging.error(f'Bad request - {e}')
+        return jsonify({'message': str(e), 'code': 400}), 400
+    mimetype, to_chunks = EXPORT_FORMATS[export_format]
+    gzip = bool(request.accept_encodings['gzip'])
+
+    logging.info(f'Quotes export ({export_format}) started for {get_jwt_identity()} after id {after}')
+    return current_app.response_class(export_chunks(after, to_chunks, gzip), mimetype=mimetype,
+                                      headers=export_headers(export_format, gzip))
+
+
+@api.route('/edit/<int:quote_id>', methods=['PUT'])
+@jwt_required
+async def edit_quote(quote_id):
+    data = await request.get_json(silent=True)
+    quote = await adb.session.get(Quote, quote_id)
+    if quote is None:
+        abort(404)
+    if not data or 'quote' not in data:
+        logging.error('Bad request - No data provided to edit')
+        return jsonify({'message': 'No data provided to edit quote', 'code': 400}), 400
+    user = await current_api_user()
+    if not user or quote.user_id != user.id:
+        logging.error(f'Forbidden to edit for user - {get_jwt_identity()}')
+        return jsonify({'message': 'Unauthorized attempt', 'code': 403}), 403
+    try:
+        quote.quote = data['quote']
+        await adb.session.commit()
+        logging.info(f'Quote successfully edited by {user.username}')
+        return jsonify({'message': 'Quote update successfully', 'code': 200}), 200
+    except Exception as e:
+        await adb.session.rollback()
+        logging.error('Error occured while editing quote.')
+        return jsonify({'message': f'Error occured while editing quotes - {e}', 'code': 500}), 500
+
+
+@api.route('/delete/<int:quote_id>', methods=['DELETE'])
+@jwt_required
+async def delete(quote_id):
+    quote = await adb.session.get(Quote, quote_id)
+    if quote is None:
+        abort(404)
+    user = await current_api_user()
+    if not user or quote.user_id != user.id:
+        logging.error(f'Forbidden to delete for user - {get_jwt_identity()}')
+        return jsonify({'message': 'Unauthorized attempt', 'code': 403}), 403
+    try:
+        await adb.session.delete(quote)
+        await adb.session.execute(quote_count_update(user.id, -1))
+        await adb.session.commit()
+        logging.info(f'Quote successfully deleted by {user.username}')
+        return jsonify({'message': 'Quote deleted successfully', 'code': 200}), 200
+    except Exception as e:
+        await adb.session.rollback()
+        logging.error('Error occured while deleting quote.')
+        return jsonify({'message': f'Error occured while deleting quote - {e}', 'code': 500}), 500
+
+
+# reads the list under ``key`` from a batch request body, returns (items, error response)
+async def batch_items(key):
+    try:
+        return batch_list(await request.get_json(silent=True), key), None
+    except BulkFormatError as e:
+        logging.error(f'Bad request - {e}')
+        return None, (jsonify({'message': str(e), 'code': 400}), 400)
+
+
+@api.route('/quotes', methods=['PATCH'])
+@jwt_required
+async def edit_quotes_batch():
+    items, error = await batch_items('quotes')
+    if error:
+        return error
+    try:
+        user = await current_api_user()
+        if not user:
+            logging.error(f'No such user found {get_jwt_identity()}')
+            return jsonify({'message': f'User {get_jwt_identity()} not found', 'code': 400}), 400
+        results = await adb.session.run_sync(lambda session: edit_quotes(items, user.id, session))
+        return jsonify(batch_result(results, user, 'updated')), 200
+    except IntegrityError:
+        # another request took one of the texts after the up-front check
+        await adb.session.rollback()
+        logging.error('Batch edit rolled back on a duplicate quote')
+        return jsonify({'message': 'A quote text is already taken, nothing was changed',
+                        'code': 409}), 409
+    except Exception as e:
+        await adb.session.rollback()
+        logging.error(f'Error occured while editing quotes in batch. {e}')
+        return jsonify({'message': f'Error occured while editing quotes - {e}', 'code': 500}), 500
+
+
+@api.route('/quotes', methods=['DELETE'])
+@jwt_required
+async def delete_quotes_batch():
+    ids, error = await batch_items('ids')
+    if error:
+        return error
+    try:
+        user = await current_api_user()
+        if not user:
+            logging.error(f'No such user found {get_jwt_identity()}')
+            return jsonify({'message': f'User {get_jwt_identity()} not found', 'code': 400}), 400
+        results = await adb.session.run_sync(lambda session: delete_quotes(ids, user.id, session))
+        return jsonify(batch_result(results, user, 'deleted')), 200
+    except Exception as e:
+        await adb.session.rollback()
+        logging.error(f'Error occured while deleting quotes in batch. {e}')
+        return jsonify({'message': f'Error occured while deleting quotes - {e}', 'code': 500}), 500
+
+
+@api.route('/authors/top', methods=['GET'])
+@jwt_required
+async def top_authors():
+    limit = request.args.get('limit', 10, type=int)
+    rows = (await adb.session.execute(top_authors_query(limit))).all()
+    return jsonify({'data': [author_to_dict(row) for row in rows]}), 200
+
+
+@api.route('/users/<username>', methods=['GET'])
+@jwt_required
+async def user_profile(username):
+    user = (await adb.session.execute(select(User.username, User.role, User.quote_count)
+                                      .filter_by(username=username))).first()
+    if user is None:
+        return jsonify({'message': f'User {username} not found', 'code': 404}), 404
+    return jsonify({'username': user.username, 'role': user.role,
+                    'quote count': user.quote_count}), 200
+
+
+@api.route('/cache/stats', methods=['GET'])
+@jwt_required
+@role_required('admin')
+async def cache_stats():
+    return jsonify(response_cache.stats()), 200
@@ -0,0 +1,44 @@
+from sqlalchemy import func, update
+from .extension import db
+from .models import User, Quote
+
+# upper bound for one leaderboard page
+MAX_TOP_AUTHORS = 100
+
+
+# statement moving a user's counter by delta, executed inside the caller's
+# transaction so the counter commits or rolls back with the quotes it counts
+def quote_count_update(user_id, delta):
+    return update(User).where(User.id == user_id)\
+        .values(quote_count=User.quote_count + delta)\
+        .execution_options(synchronize_session=False)
+
+
+def adjust_quote_count(user_id, delta, session=None):
+    if delta:
+        (session or db.session).execute(quote_count_update(user_id, delta))
+
+
+def top_authors_query(limit=10):
+    # reads ix_user_quote_count in order, no GROUP BY over quote
+    limit = max(1, min(limit, MAX_TOP_AUTHORS))
+    return db.select(User.username, User.quote_count)\
+        .order_by(User.quote_count.desc(), User.id).limit(limit)
+
+
+def author_to_dict(row):
+    return {'author': row.username, 'quote count': row.quote_count}
+
+
+def reconcile_quote_counts():
+    """Recount every user's quotes and fix the counters that drifted.
+
+    Returns the number of users whose counter was wrong.
+    """
+    actual = db.select(func.count(Quote.quote_id)).where(Quote.user_id == User.id)\
+        .scalar_subquery()
+    result = db.session.execute(update(User).where(User.quote_count != actual)
+                                .values(quote_count=actual)
+                                .execution_options(synchronize_session=False))
+    db.session.commit()
+    return result.rowcount
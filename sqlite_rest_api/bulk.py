@@ -0,0 +1,326 @@
+import codecs
+import json
+import logging
+from sqlalchemy import bindparam
+from sqlalchemy.dialects.sqlite import insert
+from .authors import adjust_quote_count
+from .extension import db
+from .models import Quote
+
+# marker yielded for items that could not be decoded
+INVALID = object()
+
+
+class BulkFormatError(ValueError):
+    pass
+
+
+class NdjsonDecoder:
+    """Incremental NDJSON decoder, one JSON value per line.
+
+    ``feed`` takes the body chunk by chunk and yields the values of the lines
+    each chunk completes, an empty chunk ends the input. A bad line only
+    rejects that line, it yields ``INVALID``.
+    """
+
+    def __init__(self, max_item_bytes=1024 * 1024):
+        self.buffer = b''
+        self.max_item_bytes = max_item_bytes
+
+    def feed(self, chunk):
+        if chunk:
+            lines = (self.buffer + chunk).split(b'\n')
+            self.buffer = lines.pop()
+            if len(self.buffer) > self.max_item_bytes:
+                raise BulkFormatError('Line too large')
+        else:
+            lines, self.buffer = [self.buffer], b''
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                yield INVALID
+
+
+class JsonArrayDecoder:
+    """Incremental decoder for the elements of a top-level JSON array.
+
+    ``feed`` takes the body chunk by chunk and yields the elements each chunk
+    completes, an empty chunk ends the input. Only the element being decoded
+    is buffered, so memory depends on the largest element rather than on the
+    size of the upload.
+    """
+
+    def __init__(self, max_item_bytes=1024 * 1024):
+        self.decoder = json.JSONDecoder()
+        self.text = codecs.getincrementaldecoder('utf-8')()
+        self.buffer, self.started, self.finished = '', False, False
+        self.max_item_bytes = max_item_bytes
+
+    def feed(self, chunk):
+        if self.finished:
+            return
+        eof = not chunk
+        buffer = self.buffer + self.text.decode(chunk or b'', final=eof)
+        pos = 0
+        while True:
+            while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                if buffer[pos] == ',' and not self.started:
+                    raise BulkFormatError('Expected a JSON array')
+                pos += 1
+            if pos == len(buffer):
+                break
+            if not self.started:
+                if buffer[pos] != '[':
+                    raise BulkFormatError('Expected a JSON array')
+                self.started, pos = True, pos + 1
+                continue
+            if buffer[pos] == ']':
+                self.finished = True
+                break
+            try:
+                item, end = self.decoder.raw_decode(buffer, pos)
+            except ValueError:
+                if eof:
+                    raise BulkFormatError('Malformed JSON array')
+                break
+            # a value touching the end of the buffer may continue in the next chunk
+            if end == len(buffer) and not eof:
+                break
+            yield item
+            pos = end
+        self.buffer = buffer[pos:]
+        if len(self.buffer) > self.max_item_bytes:
+            raise BulkFormatError('Array element too large')
+        if eof and not self.finished:
+            raise BulkFormatError('Unterminated JSON array')
+
+
+# content type of a bulk upload -> its incremental decoder
+BULK_DECODERS = {'application/x-ndjson': NdjsonDecoder, 'application/jsonl': NdjsonDecoder,
+                 'application/json': JsonArrayDecoder}
+
+
+def quote_text(item):
+    # accepts "text" or {"quote": "text"}, anything else is rejected
+    if isinstance(item, dict):
+        item = item.get('quote')
+    if not isinstance(item, str) or not item.strip():
+        return None
+    return item.strip()
+
+
+# executemany INSERT that skips rows clashing with the unique quote column,
+# including repeats inside the batch
+def insert_statement():
+    return insert(Quote.__table__).on_conflict_do_nothing(index_elements=['quote'])
+
+
+def insert_quotes(texts, user_id, session=None):
+    """Insert one batch in a single executemany transaction, returns rows inserted.
+
+    ``session`` defaults to db.session, the async app passes the sync session
+    of its AsyncSession through ``run_sync``.
+    """
+    session = session or db.session
+    result = session.execute(insert_statement(), [{'quote': text, 'user_id': user_id}
+                                                  for text in texts])
+    adjust_quote_count(user_id, result.rowcount, session)
+    session.commit()
+    return result.rowcount
+
+
+class BulkUpload:
+    """Decoding, batching and counting of one bulk upload.
+
+    ``feed`` takes the body chunk by chunk, an empty chunk ends it, and
+    yields the ``(texts, rejected)`` batches of ``batch_size`` items the
+    chunk completes. The caller inserts each batch and passes the count to
+    ``record``. A format error ends the upload: the batch collected so far is
+    still handed out and ``error`` says what was wrong. Serving modes differ
+    only in how they read the body and run the inserts.
+    """
+
+    def __init__(self, decoder, batch_size=1000):
+        self.decoder = decoder
+        self.batch_size = batch_size
+        self.batches = []
+        self.error = None
+        self.texts, self.rejected = [], 0
+
+    @property
+    def done(self):
+        return self.error is not None or getattr(self.decoder, 'finished', False)
+
+    def feed(self, chunk):
+        if self.error is not None:
+            return
+        try:
+            for item in self.decoder.feed(chunk):
+                text = quote_text(item) if item is not INVALID else None
+                if text is None:
+                    self.rejected += 1
+                else:
+                    self.texts.append(text)
+                if len(self.texts) + self.rejected >= self.batch_size:
+                    yield self._take()
+        except BulkFormatError as e:
+            self.error = str(e)
+        if (not chunk or self.done) and (self.texts or self.rejected):
+            yield self._take()
+
+    def _take(self):
+        batch = self.texts, self.rejected
+        self.texts, self.rejected = [], 0
+        return batch
+
+    def record(self, texts, rejected, inserted):
+        self.batches.append({'batch': len(self.batches) + 1, 'inserted': inserted,
+                             'duplicates': len(texts) - inserted, 'rejected': rejected})
+
+    def totals(self):
+        return {count: sum(batch[count] for batch in self.batches)
+                for count in ('inserted', 'duplicates', 'rejected')}
+
+    def result(self):
+        """The response body and status. Batches committed before an error are kept."""
+        if self.error:
+            return dict(self.totals(), batches=self.batches, message=self.error, code=400), 400
+        return dict(self.totals(), batches=self.batches, code=200), 200
+
+
+def ingest_quotes(stream, upload, user_id, chunk_size=64 * 1024):
+    """Insert the quotes of a file-like body batch by batch, read by read."""
+    while not upload.done:
+        chunk = stream.read(chunk_size)
+        for texts, rejected in upload.feed(chunk):
+            upload.record(texts, rejected, insert_quotes(texts, user_id) if texts else 0)
+        if not chunk:
+            break
+    return upload
+
+
+# most ids a single batch edit or delete may name
+MAX_BATCH_IDS = 1000
+
+
+def batch_list(data, key):
+    """The list under ``key`` of a batch request body, BulkFormatError if there is none."""
+    items = data.get(key) if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        raise BulkFormatError(f'Provide a non-empty list under {key}')
+    if len(items) > MAX_BATCH_IDS:
+        raise BulkFormatError(f'At most {MAX_BATCH_IDS} {key} per request')
+    return items
+
+
+def batch_result(results, user, action):
+    """Response body of a batch edit or delete, with the number of items per status."""
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    logging.info(f'Batch {action} by {user.username} - {counts}')
+    return {'results': results, 'counts': counts, 'code': 200}
+
+
+def as_quote_id(value):
+    # JSON integers only, booleans are ints in Python but not ids
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+def quote_owners(ids, session=None):
+    """quote_id -> user_id for the ids that exist, in one query."""
+    rows = (session or db.session).execute(db.select(Quote.quote_id, Quote.user_id)
+                              .where(Quote.quote_id.in_(ids)))
+    return dict(rows.all())
+
+
+def check_ownership(ids, user_id, session=None):
+    # per-id status for ids the user may not touch, checked with one query
+    owners = quote_owners(ids, session)
+    return {quote_id: 'not found' if quote_id not in owners else 'forbidden'
+            for quote_id in ids if owners.get(quote_id) != user_id}
+
+
+def edit_quotes(items, user_id, session=None):
+    """Apply ``[{"id": ..., "quote": ...}]`` edits in one transaction.
+
+    Ownership and clashes with the unique quote text are checked up front
+    with set-based queries, the accepted edits go out as one executemany
+    UPDATE and a single commit. Returns one ``{"id", "status"}`` per item.
+    ``session`` defaults to db.session, as for insert_quotes.
+    """
+    session = session or db.session
+    results, edits = [], {}
+    for item in items:
+        target = as_quote_id(item.get('id')) if isinstance(item, dict) else None
+        text = quote_text(item) if isinstance(item, dict) else None
+        if target is None or text is None or target in edits:
+            results.append({'id': target, 'status': 'invalid'})
+        else:
+            results.append({'id': target, 'status': 'updated'})
+            edits[target] = text
+
+    refused = check_ownership(list(edits), user_id, session) if edits else {}
+    taken = {}
+    if edits:
+        rows = session.execute(db.select(Quote.quote, Quote.quote_id)
+                                  .where(Quote.quote.in_(list(edits.values()))))
+        taken = dict(rows.all())
+    for result in results:
+        target = result['id']
+        if result['status'] != 'updated':
+            continue
+        text = edits[target]
+        if target in refused:
+            result['status'] = refused[target]
+        elif taken.setdefault(text, target) != target:
+            result['status'] = 'duplicate'
+        else:
+            continue
+        del edits[target]
+
+    if edits:
+        table = Quote.__table__
+        session.execute(table.update()
+                           .where(table.c.quote_id == bindparam('target'),
+                                  table.c.user_id == user_id)
+                           .values(quote=bindparam('text')),
+                           [{'target': target, 'text': text} for target, text in edits.items()])
+    session.commit()
+    return results
+
+
+def delete_quotes(ids, user_id, session=None):
+    """Delete the user's quotes among ``ids`` with one DELETE and one commit.
+
+    An id named again after its first occurrence is reported as ``duplicate``,
+    only the first one carries the outcome of the delete.
+    """
+    session = session or db.session
+    results, targets = [], {}
+    for value in ids:
+        target = as_quote_id(value)
+        if target is None:
+            results.append({'id': target, 'status': 'invalid'})
+        elif target in targets:
+            results.append({'id': target, 'status': 'duplicate'})
+        else:
+            results.append({'id': target, 'status': 'deleted'})
+            targets[target] = True
+
+    refused = check_ownership(list(targets), user_id, session) if targets else {}
+    for result in results:
+        if result['status'] == 'deleted' and result['id'] in refused:
+            result['status'] = refused[result['id']]
+    allowed = [target for target in targets if target not in refused]
+    if allowed:
+        table = Quote.__table__
+        result = session.execute(table.delete().where(table.c.quote_id.in_(allowed),
+                                                      table.c.user_id == user_id))
+        adjust_quote_count(user_id, -result.rowcount, session)
+    session.commit()
+    return results
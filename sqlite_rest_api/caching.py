@@ -0,0 +1,218 @@
+import hashlib
+import logging
+import threading
+from functools import wraps
+from flask import current_app, g, request, make_response
+from flask_caching.backends.simplecache import SimpleCache
+from sqlalchemy import column, select, table, text
+from flask_jwt_extended import get_jwt_identity
+from compact_responses import wants_msgpack
+from compression import encoded_etag, negotiated_encoding
+
+# moves a tag to a new generation: the time of the write in microseconds, or
+# the previous generation plus one for writes within the same millisecond
+BUMP_GENERATION = """INSERT INTO cache_generation(tag, generation)
+    VALUES ({tag}, CAST((julianday('now') - 2440587.5) * 86400000000 AS INTEGER))
+    ON CONFLICT(tag) DO UPDATE SET generation = MAX(generation + 1, excluded.generation)"""
+
+# generations live in the database, so every worker and both serving modes see
+# the same ones. The triggers bump 'quotes' inside the transaction of any write
+# to the quote table. create_all makes these objects with the quote table, see
+# models.py, and the migration a8d3f1c7e925 makes them for existing databases.
+GENERATION_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS cache_generation (
+        tag VARCHAR(40) PRIMARY KEY,
+        generation INTEGER NOT NULL)""",
+] + [f"""CREATE TRIGGER IF NOT EXISTS quote_generation_{suffix} AFTER {event} ON quote BEGIN
+        {BUMP_GENERATION.format(tag="'quotes'")};
+    END""" for suffix, event in (('ai', 'INSERT'), ('au', 'UPDATE'), ('ad', 'DELETE'))]
+
+cache_generation = table('cache_generation', column('tag'), column('generation'))
+
+
+# SimpleCache backend that counts the entries it drops when it is full,
+# selected with CACHE_TYPE = 'sqlite_rest_api.caching.CountingSimpleCache'
+class CountingSimpleCache(SimpleCache):
+    evictions = 0
+
+    def _prune(self):
+        before = len(self._cache)
+        super()._prune()
+        self.evictions += before - len(self._cache)
+
+
+# the negotiated body encoding, responses that differ by it need their own
+# cache entries and ETags
+def representation(req):
+    return 'msgpack' if wants_msgpack(req.accept_mimetypes) else 'json'
+
+
+# The helpers below take the request, so the Flask and the Quart app derive
+# keys and validators in one place.
+
+def view_key(req, generations, identity):
+    # path, tag generations, identity, sorted query string and encoding
+    args = sorted(req.args.items(multi=True))
+    raw = f'{req.path}|{generations}|{identity}|{args}|{representation(req)}'
+    return 'view:' + hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def view_etag(req, generations):
+    # the shared generations identify the data, path, query string and
+    # encoding which rendering of it
+    args = sorted(req.args.items(multi=True))
+    raw = f'{req.path}|{generations}|{args}|{representation(req)}'
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+def matched_etag(req, etag, encoding):
+    # the validator If-None-Match names, a compressed copy carries the ETag
+    # tagged with its encoding; None when the client has neither
+    candidates = [etag] + ([encoded_etag(etag, encoding)] if encoding else [])
+    return next((tag for tag in candidates if req.if_none_match.contains_weak(tag)), None)
+
+
+def revalidated(response, etag):
+    response.set_etag(etag)
+    response.vary.add('Accept')
+    # clients may keep a copy but have to revalidate it every time
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+class VersionedCache:
+    """Response cache on top of flask_caching where entries belong to tags.
+
+    Every tag has a generation in the cache_generation table and the
+    generations of a view's tags are part of its cache keys. A write moves the
+    tag to a new generation in its own transaction, so the next read in any
+    process misses and sees fresh data while the old entries simply age out.
+    The entries themselves stay in the per-process flask_caching backend.
+    """
+
+    def __init__(self, cache, db):
+        self.cache = cache
+        self.db = db
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def generations(self, tags):
+        # read once per request, cached and conditional share it. A tag that
+        # was never written has generation 0
+        known = g.setdefault('cache_generations', {})
+        missing = [tag for tag in tags if tag not in known]
+        if missing:
+            rows = self.db.session.execute(select(cache_generation.c.tag, cache_generation.c.generation)
+                                           .where(cache_generation.c.tag.in_(missing)))
+            found = dict(rows.all())
+            known.update((tag, found.get(tag, 0)) for tag in missing)
+        return [known[tag] for tag in tags]
+
+    def invalidate(self, *tags):
+        # for changes the triggers do not see, commits on its own connection
+        try:
+            with self.db.engine.begin() as connection:
+                for tag in tags:
+                    connection.execute(text(BUMP_GENERATION.format(tag=':tag')), {'tag': tag})
+            self._count('invalidations')
+        except Exception as e:
+            logging.error(f'Cache invalidation failed for {tags}. {e}')
+
+    def make_key(self, tags, per_identity):
+        identity = get_jwt_identity() if per_identity else None
+        return view_key(request, self.generations(tags), identity)
+
+    def cached(self, *tags, timeout=None, per_identity=True, response_filter=None):
+        """Cache a view under ``tags``.
+
+        Keys cover the path, the sorted query string, the tag generations and,
+        unless ``per_identity`` is off, the JWT identity, so it has to sit
+        below ``jwt_required``. Responses rejected by ``response_filter`` are
+        returned but not stored. With Compress installed the compressed
+        variants are stored in the same entry, hits reuse them as they are.
+        """
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                try:
+                    key = self.make_key(tags, per_identity)
+                    entry = self.cache.get(key)
+                except Exception as e:
+                    logging.error(f'Cache lookup failed, serving uncached. {e}')
+                    return f(*args, **kwargs)
+
+                compress = current_app.extensions.get('compress')
+                if entry is not None:
+                    self._count('hits')
+                    body, status, headers, variants = entry
+                    response = make_response((body, status, headers))
+                    return compress.use_variant(response, variants) if compress else response
+
+                self._count('misses')
+                rv = f(*args, **kwargs)
+                if response_filter is not None and not response_filter(rv):
+                    return rv
+                response = make_response(rv)
+                if response.status_code == 200:
+                    try:
+                        variants = compress.variants(response) if compress else {}
+                        self.cache.set(key, (response.get_data(), response.status_code,
+                                             list(response.headers), variants), timeout=timeout)
+                    except Exception as e:
+                        logging.error(f'Cache store failed for {request.path}. {e}')
+                return response
+            return decorated_function
+        return decorator
+
+    def etag(self, tags):
+        return view_etag(request, self.generations(tags))
+
+    def conditional(self, *tags):
+        """Answer conditional GETs for a view from the generations of ``tags``.
+
+        200 responses get a strong ETag built from the generations alone. A
+        matching If-None-Match (compared weakly, as for any GET) returns 304
+        before the view runs. Goes above ``cached`` so a 304 skips the cache lookup too.
+        A compressed 200 carries the ETag tagged with its encoding, which
+        matches as well. No Last-Modified is sent: HTTP dates have whole
+        seconds, two writes within one would leave If-Modified-Since
+        answering 304 for the older data.
+        """
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                try:
+                    etag = self.etag(tags)
+                except Exception as e:
+                    logging.error(f'Could not build the ETag, serving unconditionally. {e}')
+                    return f(*args, **kwargs)
+
+                matched = matched_etag(request, etag, negotiated_encoding())
+                if matched is not None:
+                    return revalidated(make_response('', 304), matched)
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                return revalidated(response, etag)
+            return decorated_function
+        return decorator
+
+    def stats(self):
+        backend = self.cache.cache
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit ratio': round(self.hits / lookups, 4) if lookups else None,
+            'invalidations': self.invalidations,
+            'evictions': getattr(backend, 'evictions', None),
+            'size': len(backend._cache) if hasattr(backend, '_cache') else None,
+            'threshold': getattr(backend, '_threshold', None),
+        }
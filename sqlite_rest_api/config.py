@@ -6,4 +6,26 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY')    # a secret key
     SQLALCHEMY_DATABASE_URI = os.getenv('SQLALCHEMY_DATABASE_URI')  # path to database file
     SQLALCHEMY_TRACK_MODIFICATIONS = False  # not to track any changes or updation in database
-    JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
\ No newline at end of file
+    JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY')
+    CACHE_THRESHOLD = int(os.getenv('CACHE_THRESHOLD', 500))   # max entries kept by the response cache
+    IDENTITY_CACHE_SIZE = int(os.getenv('IDENTITY_CACHE_SIZE', 1024))   # users kept by the identity resolver
+    IDENTITY_CACHE_TTL = int(os.getenv('IDENTITY_CACHE_TTL', 60))       # seconds before a cached user is reloaded
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))   # work factor for newly hashed passwords
+    BCRYPT_MAX_WORKERS = int(os.getenv('BCRYPT_MAX_WORKERS', 4))  # threads verifying passwords
+    BCRYPT_TIMEOUT = float(os.getenv('BCRYPT_TIMEOUT', 5))        # seconds to wait for a verification
+    CREDENTIAL_CACHE_SIZE = int(os.getenv('CREDENTIAL_CACHE_SIZE', 4096))
+    CREDENTIAL_CACHE_TTL = int(os.getenv('CREDENTIAL_CACHE_TTL', 60))  # seconds a verified login is trusted
+    LOG_FILE = os.getenv('LOG_FILE', 'api.log')
+    LOG_QUEUE_SIZE = 10000          # records waiting for the writer thread before new ones are dropped
+    LOG_PAYLOAD_MAX_BYTES = 2048    # larger request bodies are logged as a size only
+    LOG_FIELD_MAX_CHARS = 200       # long string values in payloads are truncated
+    LOG_REDACT_FIELDS = ('password', 'token', 'access_token')
+    LOG_SAMPLE_RATES = {'api.get_quotes': 0.1}   # endpoint -> share of successful requests logged
+    # counters shared by every worker on the host, sliding windows avoid the burst at window edges
+    RATELIMIT_STORAGE_URI = os.getenv('RATELIMIT_STORAGE_URI', 'sqlite-limits:///ratelimit.db')
+    RATELIMIT_STRATEGY = 'sliding-window-counter'
+    RATELIMIT_STORAGE_OPTIONS = {'compact_interval': 60}   # seconds between sweeps of expired counters
+    BULK_BATCH_SIZE = int(os.getenv('BULK_BATCH_SIZE', 1000))   # rows per transaction in /quotes/bulk
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))         # gzip level, brotli uses COMPRESS_BR_LEVEL
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 500))  # bytes, smaller bodies go out uncompressed
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')    # bearer token for /metrics from outside localhost
@@ -4,9 +4,23 @@ from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_jwt_extended import JWTManager
 from flask_caching import Cache
+from request_metrics import RequestMetrics
+from query_debug import QueryDebugger
+from compression import Compress
+from .caching import VersionedCache
+from . import limiter_storage   # registers the sqlite-limits:// storage scheme
 
 db = SQLAlchemy()
 migrate = Migrate()
 limiter = Limiter(key_func=get_remote_address)
 jwtmanager = JWTManager()
-cache = Cache(config={'CACHE_TYPE':'SimpleCache'})
\ No newline at end of file
+cache = Cache(config={'CACHE_TYPE':'sqlite_rest_api.caching.CountingSimpleCache'})
+response_cache = VersionedCache(cache, db)
+metrics = RequestMetrics()
+query_debugger = QueryDebugger()
+compress = Compress()
+
+
+# body of the 429 answer in both serving modes, ``limit`` as limits prints it
+def rate_limit_payload(limit):
+    return {'message': f'Too many requests, limit is {limit}', 'code': 429}
@@ -0,0 +1,49 @@
+from collections import namedtuple
+from flask import g
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from ttl_cache import TTLCache
+from .models import User
+
+# plain snapshot of the fields routes need, safe to share between requests
+ApiUser = namedtuple('ApiUser', ['id', 'username', 'email', 'role'])
+
+# cross-request cache of email -> ApiUser, sized by IDENTITY_CACHE_SIZE and
+# IDENTITY_CACHE_TTL in create_app
+identity_cache = TTLCache()
+
+
+def identity_claims(user):
+    # embedded in the access token so protected routes can skip the user lookup,
+    # a role change therefore only applies to tokens issued after it
+    return {'uid': user.id, 'username': user.username, 'role': user.role}
+
+
+def _load_user(email):
+    user = identity_cache.get(email)
+    if user is None:
+        row = User.query.filter_by(email=email).first()
+        if row is None:
+            return None
+        user = ApiUser(row.id, row.username, row.email, row.role)
+        identity_cache.set(email, user)
+    return user
+
+
+def current_api_user():
+    """Resolve the JWT identity to an ``ApiUser`` once per request.
+
+    Uses the token's claims when it carries them, otherwise the identity
+    cache and only then the database. Returns ``None`` for unknown users.
+    """
+    if 'api_user' in g:
+        return g.api_user
+
+    email = get_jwt_identity()
+    claims = get_jwt()
+    if all(claim in claims for claim in ('uid', 'username', 'role')):
+        user = ApiUser(claims['uid'], claims['username'], email, claims['role'])
+    else:
+        user = _load_user(email)
+
+    g.api_user = user
+    return user
@@ -0,0 +1,151 @@
+import os
+import sqlite3
+import threading
+import time
+from limits.storage import Storage, SlidingWindowCounterSupport
+from limits.storage.base import TimestampedSlidingWindow
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS rate_limit (
+        key TEXT PRIMARY KEY,
+        count INTEGER NOT NULL,
+        expires REAL NOT NULL
+    ) WITHOUT ROWID
+"""
+
+# adds to a live counter, or starts over when the stored one has expired
+UPSERT = """
+    INSERT INTO rate_limit (key, count, expires) VALUES (:key, :amount, :expires)
+    ON CONFLICT (key) DO UPDATE SET
+        count = CASE WHEN expires > :now THEN count + excluded.count ELSE excluded.count END,
+        expires = CASE WHEN expires > :now THEN expires ELSE excluded.expires END
+    RETURNING count
+"""
+
+# takes a sliding window entry in one statement, so the check and the
+# increment cannot interleave with another worker. No row back means refused.
+ACQUIRE = """
+    INSERT INTO rate_limit (key, count, expires)
+    SELECT :key, :amount, :expires
+    WHERE CAST(
+        coalesce((SELECT count FROM rate_limit WHERE key = :previous AND expires > :now), 0) * :weight
+        + coalesce((SELECT count FROM rate_limit WHERE key = :key AND expires > :now), 0)
+        AS INTEGER) + :amount <= :limit
+    ON CONFLICT (key) DO UPDATE SET
+        count = CASE WHEN expires > :now THEN count + excluded.count ELSE excluded.count END,
+        expires = CASE WHEN expires > :now THEN expires ELSE excluded.expires END
+    RETURNING count
+"""
+
+
+class SQLiteLimiterStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """Rate limit counters in a SQLite file shared by every worker on the host.
+
+    Configured with ``RATELIMIT_STORAGE_URI = 'sqlite-limits:///ratelimit.db'``
+    (three slashes for a relative path, four for an absolute one, as with
+    SQLAlchemy). Supports the fixed window and sliding window counter
+    strategies. Expired counters are deleted every ``compact_interval``
+    seconds by whichever worker notices first.
+    """
+
+    STORAGE_SCHEME = ['sqlite-limits']
+
+    def __init__(self, uri, wrap_exceptions=False, compact_interval=60, **options):
+        self.path = uri.split('://', 1)[1][1:] or 'ratelimit.db'
+        self.compact_interval = float(compact_interval)
+        self._next_compaction = time.time() + self.compact_interval
+        self._local = threading.local()
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self._connection().execute(SCHEMA)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    # one connection per thread, opened again in a forked worker
+    def _connection(self):
+        local = self._local
+        if getattr(local, 'pid', None) != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # counters are disposable, losing the last writes on power loss is fine
+            connection.execute('PRAGMA synchronous=OFF')
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def _count(self, connection, key, now):
+        row = connection.execute('SELECT count FROM rate_limit WHERE key = ? AND expires > ?',
+                                 (key, now)).fetchone()
+        return row[0] if row else 0
+
+    def _compact(self, connection, now):
+        if now < self._next_compaction:
+            return
+        self._next_compaction = now + self.compact_interval
+        connection.execute('DELETE FROM rate_limit WHERE expires <= ?', (now,))
+
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        connection = self._connection()
+        [(count,)] = connection.execute(UPSERT, {'key': key, 'amount': amount,
+                                                 'expires': now + expiry, 'now': now}).fetchall()
+        self._compact(connection, now)
+        return count
+
+    def get(self, key):
+        return self._count(self._connection(), key, time.time())
+
+    def get_expiry(self, key):
+        now = time.time()
+        row = self._connection().execute(
+            'SELECT expires FROM rate_limit WHERE key = ? AND expires > ?', (key, now)).fetchone()
+        return row[0] if row else now
+
+    def check(self):
+        try:
+            self._connection().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        return self._connection().execute('DELETE FROM rate_limit').rowcount
+
+    def clear(self, key):
+        self._connection().execute('DELETE FROM rate_limit WHERE key = ?', (key,))
+
+    def _window(self, connection, key, expiry, now):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        counts = dict(connection.execute(
+            'SELECT key, count FROM rate_limit WHERE key IN (?, ?) AND expires > ?',
+            (previous_key, current_key, now)).fetchall())
+        previous_count = counts.get(previous_key, 0)
+        current_count = counts.get(current_key, 0)
+        previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry if previous_count else 0.0
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return current_key, previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        connection = self._connection()
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        # share of the previous window still inside the sliding window
+        weight = 1 - (((now - expiry) / expiry) % 1)
+        # the current window is read as the previous one until it is two windows old
+        rows = connection.execute(ACQUIRE, {
+            'key': current_key, 'previous': previous_key, 'amount': amount, 'limit': limit,
+            'weight': weight, 'expires': now + 2 * expiry, 'now': now}).fetchall()
+        self._compact(connection, now)
+        return bool(rows)
+
+    def get_sliding_window(self, key, expiry):
+        _, *window = self._window(self._connection(), key, expiry, time.time())
+        return tuple(window)
+
+    def clear_sliding_window(self, key, expiry):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, time.time())
+        self._connection().execute('DELETE FROM rate_limit WHERE key IN (?, ?)',
+                                   (previous_key, current_key))
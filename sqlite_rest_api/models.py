@@ -1,4 +1,7 @@
+from sqlalchemy import DDL, event
 from .extension import db
+from .caching import GENERATION_SCHEMA
+from .search import SEARCH_SCHEMA
 from flask_bcrypt import Bcrypt
 
 # bcrypt class for hashing passwords of registering users
@@ -11,8 +14,14 @@ class User(db.Model):
     email = db.Column(db.String(100), nullable=False, unique=True)
     password = db.Column(db.String(100), nullable=False)
     role = db.Column(db.String(20), nullable=True)
+    # denormalized COUNT of the user's quotes, every write path adjusts it in
+    # its own transaction, see authors.py
+    quote_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     quotes = db.relationship('Quote', backref='author')
 
+    # the leaderboard walks this index from the top, ties in id order
+    __table_args__ = (db.Index('ix_user_quote_count', quote_count.desc(), id),)
+
     def __repr__(self):
         return f"User('{self.username}','{self.email}','{self.role}')"
     
@@ -29,4 +38,11 @@ class Quote(db.Model):
 
     def __repr__(self):
         return f"Post('{self.author}','{self.quote}')"
-    
\ No newline at end of file
+    
+
+
+# the response cache generations and the triggers bumping them come with the
+# quote table, so create_all databases invalidate like migrated ones. The
+# full-text index does too, an empty quote table needs no rebuild
+for statement in GENERATION_SCHEMA + SEARCH_SCHEMA:
+    event.listen(Quote.__table__, 'after_create', DDL(statement))
@@ -0,0 +1,113 @@
+import base64
+import json
+from .extension import db
+
+# upper bound for a single keyset page
+MAX_LIMIT = 1000
+
+# query string arguments that switch a listing from page numbers to cursors
+CURSOR_ARGS = ('cursor', 'after', 'before', 'limit')
+
+
+# cursors are opaque to clients, internally they only carry the direction
+# and the primary key the next page has to seek from
+def encode_cursor(direction, key):
+    raw = json.dumps({'d': direction, 'k': key}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, key_type=int):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        direction, key = data['d'], key_type(data['k'])
+    except (ValueError, TypeError, KeyError, IndexError):
+        raise ValueError('Invalid cursor')
+    if direction not in ('after', 'before'):
+        raise ValueError('Invalid cursor')
+    return direction, key
+
+
+# reads cursor/after/before from the query string, returns (direction, key),
+# raises ValueError for a cursor or key that is not valid
+def cursor_from_args(args):
+    if args.get('cursor'):
+        return decode_cursor(args['cursor'])
+    for direction in ('before', 'after'):
+        if args.get(direction) is not None:
+            try:
+                return direction, int(args[direction])
+            except ValueError:
+                raise ValueError('Invalid cursor')
+    return 'after', None
+
+
+# an optional integer key from the query string, None when it is absent,
+# raises ValueError for a value that is not an integer
+def key_arg(args, name):
+    value = args.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer')
+
+
+# page and per_page of offset pagination, at least 1 each
+def page_args(args):
+    return max(args.get('page', 1, type=int), 1), max(args.get('per_page', 10, type=int), 1)
+
+
+# counting the whole table is what makes offset pages slow, so it is opt-in for cursors
+def wants_total(args):
+    return args.get('total', 'false').lower() in ('1', 'true', 'yes')
+
+
+def keyset_paginate(query, key_column, direction='after', key=None, limit=10):
+    """Seek on an indexed key instead of OFFSET, so every page costs the same.
+
+    Fetches one extra row to know whether another page exists. Returns a dict
+    with the rows (always in ascending key order) and the opaque next/prev
+    cursors, ``None`` where there is nothing to page to.
+    """
+    statement, limit = keyset_query(query, key_column, direction, key, limit)
+    rows = db.session.execute(statement).all()
+    return keyset_page(rows, key_column, direction, key, limit)
+
+
+# the statement for one page plus the clamped limit, it asks for limit + 1 rows
+def keyset_query(query, key_column, direction='after', key=None, limit=10):
+    limit = max(1, min(limit, MAX_LIMIT))
+    if direction == 'before':
+        if key is not None:
+            query = query.where(key_column < key)
+        query = query.order_by(key_column.desc())
+    else:
+        if key is not None:
+            query = query.where(key_column > key)
+        query = query.order_by(key_column.asc())
+    return query.limit(limit + 1), limit
+
+
+def keyset_page(rows, key_column, direction, key, limit):
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if direction == 'before':
+        rows.reverse()
+
+    key_name = key_column.key
+    first = getattr(rows[0], key_name) if rows else None
+    last = getattr(rows[-1], key_name) if rows else None
+
+    if direction == 'before':
+        has_next, has_prev = key is not None, has_more
+    else:
+        has_next, has_prev = has_more, key is not None
+
+    return {
+        'items': rows,
+        'next': encode_cursor('after', last) if has_next and last is not None else None,
+        'prev': encode_cursor('before', first) if has_prev and first is not None else None,
+        'limit': limit,
+    }
@@ -0,0 +1,102 @@
+import hashlib
+import hmac
+import logging
+import os
+import secrets
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from flask import current_app
+from ttl_cache import TTLCache
+from .models import bcrypt
+
+# HMAC digests of credentials that passed bcrypt recently, never the passwords
+verified_credentials = TTLCache(maxsize=4096, ttl=60)
+
+_executor = None
+_executor_pid = None
+_slots = None
+_executor_lock = threading.Lock()
+
+
+class PasswordCheckBusy(Exception):
+    pass
+
+
+def configure_credential_cache(app):
+    """Size the credential cache and settle the key its entries are signed with.
+
+    The key is CREDENTIAL_CACHE_SECRET, else SECRET_KEY, else JWT_SECRET_KEY.
+    Entries never leave the process, so without any of them a random key is
+    generated, it only costs a bcrypt check per login after a restart.
+    """
+    verified_credentials.configure(maxsize=app.config.get('CREDENTIAL_CACHE_SIZE'),
+                                   ttl=app.config.get('CREDENTIAL_CACHE_TTL'))
+    secret = (app.config.get('CREDENTIAL_CACHE_SECRET') or app.config.get('SECRET_KEY')
+              or app.config.get('JWT_SECRET_KEY'))
+    if not secret:
+        logging.warning('No SECRET_KEY or JWT_SECRET_KEY set, credential cache uses a random key')
+        secret = secrets.token_hex(32)
+    if not isinstance(secret, (str, bytes)):
+        raise TypeError('The credential cache secret must be str or bytes')
+    app.config['CREDENTIAL_CACHE_SECRET'] = secret
+
+
+def init_password_checks(app):
+    configure_credential_cache(app)
+
+
+# started lazily and again after a fork, threads do not survive into workers
+def _pool():
+    global _executor, _executor_pid, _slots
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            workers = current_app.config.get('BCRYPT_MAX_WORKERS', 4)
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+            # running plus queued checks, anything beyond this is turned away
+            _slots = threading.BoundedSemaphore(workers * 4)
+            _executor_pid = os.getpid()
+        return _executor, _slots
+
+
+def credential_key(username, password, stored_hash, secret=None):
+    # the stored hash is part of the key, so a password change drops old entries
+    message = '\0'.join((username, password, stored_hash)).encode('utf-8')
+    secret = secret or current_app.config['CREDENTIAL_CACHE_SECRET']
+    if isinstance(secret, str):
+        secret = secret.encode('utf-8')
+    return hmac.new(secret, message, hashlib.sha256).hexdigest()
+
+
+def check_password(user, password):
+    """Verify ``password`` for ``user``, skipping bcrypt for recent successes.
+
+    Cold checks run on a bounded thread pool. Raises ``PasswordCheckBusy``
+    when the pool is saturated or the check does not finish within
+    BCRYPT_TIMEOUT seconds, waiting for a slot included.
+    """
+    key = credential_key(user.username, password, user.password)
+    if verified_credentials.get(key):
+        return True
+
+    timeout = current_app.config.get('BCRYPT_TIMEOUT', 5)
+    # one deadline for the slot and the check together
+    deadline = time.monotonic() + timeout
+    executor, slots = _pool()
+    if not slots.acquire(timeout=timeout):
+        raise PasswordCheckBusy('Too many password checks in progress')
+    try:
+        future = executor.submit(bcrypt.check_password_hash, user.password, password)
+    except Exception:
+        slots.release()
+        raise
+    # the slot is held until bcrypt really finishes, even if we stop waiting
+    future.add_done_callback(lambda _: slots.release())
+    try:
+        valid = future.result(timeout=max(deadline - time.monotonic(), 0))
+    except TimeoutError:
+        raise PasswordCheckBusy('Password check timed out')
+
+    if valid:
+        verified_credentials.set(key, True)
+    return valid
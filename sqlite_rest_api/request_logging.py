@@ -0,0 +1,150 @@
+import atexit
+import json
+import logging
+import queue
+import random
+import time
+from logging.handlers import QueueHandler, QueueListener
+from flask import current_app, g, request
+
+request_logger = logging.getLogger('sqlite_rest_api.requests')
+
+# payload keys that are never written to the log, LOG_REDACT_FIELDS overrides it
+REDACT_FIELDS = ('password', 'token', 'access_token')
+
+_listener = None
+_listener_settings = None
+
+
+# one JSON object per line, request fields are passed through extra={'request': ...}
+class JsonLineFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {'time': self.formatTime(record), 'level': record.levelname,
+                 'message': record.getMessage()}
+        entry.update(getattr(record, 'request', None) or {})
+        return json.dumps(entry, default=str)
+
+
+# never waits on a full queue and never raises into the request, records that
+# do not fit are counted and dropped
+class NonBlockingQueueHandler(QueueHandler):
+    dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def init_request_logging(app):
+    """Route all logging through a queue drained by a background writer thread.
+
+    Request handlers only enqueue records, the listener thread formats them as
+    JSON lines and writes them to LOG_FILE.
+
+    The handler sits on the root logger, so the listener is process-global:
+    the first app sets LOG_FILE and LOG_QUEUE_SIZE for the whole process and
+    later apps log to the same file. A later app asking for other settings
+    gets a warning, not a second file.
+    """
+    global _listener, _listener_settings
+    settings = (app.config.get('LOG_FILE', 'api.log'), app.config.get('LOG_QUEUE_SIZE', 10000))
+    if _listener is not None:
+        if settings != _listener_settings:
+            logging.warning(f'Logging is already set up with LOG_FILE and LOG_QUEUE_SIZE '
+                            f'{_listener_settings}, ignoring {settings}')
+        return
+
+    log_file, queue_size = settings
+    log_queue = queue.Queue(maxsize=queue_size)
+    file_handler = logging.FileHandler(log_file)
+    file_handler.setFormatter(JsonLineFormatter())
+    _listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _listener.start()
+    _listener_settings = settings
+    atexit.register(_listener.stop)
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(NonBlockingQueueHandler(log_queue))
+
+
+def register_request_hooks(app):
+    # app-wide and registered before the rate limiter's own before_request, so
+    # the requests it turns away with 429 are timed and logged as well
+    app.before_request(start_request)
+    app.after_request(finish_request)
+
+
+def _redact(value, fields, max_chars):
+    if isinstance(value, dict):
+        return {key: '***' if key.lower() in fields else _redact(item, fields, max_chars)
+                for key, item in value.items()}
+    if isinstance(value, list):
+        return [_redact(item, fields, max_chars) for item in value]
+    if isinstance(value, str) and len(value) > max_chars:
+        return value[:max_chars] + f'...[{len(value) - max_chars} more chars]'
+    return value
+
+
+def payload_summary(config, req):
+    # bodies are only parsed when they are small JSON, everything else is
+    # summarised, None means the body is to be parsed and passed to redacted_payload
+    size = req.content_length
+    if not req.is_json or size is None or size > config.get('LOG_PAYLOAD_MAX_BYTES', 2048):
+        return {'omitted': True, 'bytes': size, 'content_type': req.mimetype}
+    return None
+
+
+def redacted_payload(config, data):
+    fields = {field.lower() for field in config.get('LOG_REDACT_FIELDS', REDACT_FIELDS)}
+    return _redact(data, fields, config.get('LOG_FIELD_MAX_CHARS', 200))
+
+
+def is_sampled(config, req):
+    rates = config.get('LOG_SAMPLE_RATES') or {}
+    return random.random() < rates.get(req.endpoint, 1.0)
+
+
+def is_logged(state, response):
+    # failures are always kept, successful requests follow the sampling rate
+    return state.get('log_started') is not None \
+        and bool(state.get('log_sampled') or response.status_code >= 400)
+
+
+def request_entry(req, response, state):
+    """The fields logged for a request, ``state`` is the g its hooks wrote to."""
+    entry = {
+        'method': req.method,
+        'path': req.path,
+        'endpoint': req.endpoint,
+        'status': response.status_code,
+        'duration_ms': round((time.perf_counter() - state.log_started) * 1000, 3),
+        'remote_addr': req.remote_addr,
+    }
+    if 'log_payload' in state:
+        entry['payload'] = state.log_payload
+    return entry
+
+
+def start_request():
+    try:
+        config = current_app.config
+        g.log_started = time.perf_counter()
+        g.log_sampled = is_sampled(config, request)
+        if g.log_sampled and request.method in ('POST', 'PUT', 'PATCH'):
+            summary = payload_summary(config, request)
+            g.log_payload = summary if summary is not None \
+                else redacted_payload(config, request.get_json(silent=True))
+    except Exception:
+        pass
+
+
+def finish_request(response):
+    try:
+        if is_logged(g, response):
+            request_logger.info('request', extra={'request': request_entry(request, response, g)})
+    except Exception:
+        pass
+    return response
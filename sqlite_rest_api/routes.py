@@ -1,10 +1,28 @@
-from flask import request, jsonify, url_for
-from .extension import db, limiter, cache
+from flask import request, jsonify, url_for, current_app, Response, stream_with_context
+from .extension import db, limiter, response_cache, rate_limit_payload
 from flask_jwt_extended import jwt_required, create_access_token, get_jwt_identity
-from sqlalchemy.exc import SQLAlchemyError, IntegrityError
+from sqlalchemy.exc import SQLAlchemyError, IntegrityError, OperationalError
 from .models import User, Quote
+from .identity import current_api_user, identity_claims
+from .passwords import check_password, PasswordCheckBusy
+from .bulk import (BULK_DECODERS, BulkUpload, BulkFormatError, ingest_quotes, edit_quotes,
+                   delete_quotes, batch_list, batch_result)
+from .search import (match_expression, search_quotes, search_cursor_key,
+                     search_result_to_dict, rebuild_search_index)
+from .authors import (adjust_quote_count, top_authors_query, author_to_dict,
+                      reconcile_quote_counts)
+from .sampling import random_quote, daily_quote, rebuild_sample_index
+from .pagination import (cursor_from_args, keyset_paginate, decode_cursor, page_args,
+                         key_arg, wants_total, CURSOR_ARGS)
+from .serializers import (quote_listing, quote_to_dict, quote_serializer, listing_response, is_cacheable,
+                          page_envelope, cursor_envelope, quotes_link, quote_page_query,
+                          quote_count_query,
+                          STREAM_THRESHOLD, QUOTE_FIELDS, export_quotes, export_chunks,
+                          export_headers, EXPORT_FORMATS)
+from compact_responses import requested_fields
 from functools import wraps
 from flask import Blueprint
+import io
 import logging
 from datetime import timedelta
 
@@ -12,20 +30,19 @@ from datetime import timedelta
 # setting blueprint for the routes of api
 api = Blueprint('api', __name__)
 
+# bulk uploads up to this size are read in one go, larger ones are streamed
+BULK_BUFFER_BYTES = 64 * 1024
+
 from sqlite_rest_api import limiter
 
-# configuring loggin mechanism
-logging.basicConfig(filename='api.log', level=logging.INFO,
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+# logging is configured in create_app, records go through a queue to a
+# background writer as JSON lines (see request_logging.py)
 
 
-# before each request, log request and data/payload if provided
-@api.before_request
-def log_requests_info():
-    if request.method in ['POST','PUT','PATCH']:
-        logging.info(f'Request: {request.method} {request.url} - Payload {request.json}')
-    else:
-        logging.info(f'Request: {request.method} {request.url}')
+# Flask-Limiter's 429 in the JSON shape of the other errors
+@api.errorhandler(429)
+def rate_limited(e):
+    return jsonify(rate_limit_payload(e.description)), 429
 
 
 # implementing a decorator for basic authentication method
@@ -37,8 +54,12 @@ def basic_auth_required(f):
             return jsonify({'message': 'Authentication required'}), 401
         
         user = User.query.filter_by(username=auth.username).first()
-        if not user or not user.check_password(auth.password):
-            return jsonify({'message': 'Invalid credentials'}), 401
+        try:
+            if not user or not check_password(user, auth.password):
+                return jsonify({'message': 'Invalid credentials'}), 401
+        except PasswordCheckBusy as e:
+            logging.error(f'Basic auth rejected, {e}')
+            return jsonify({'message': 'Server busy, try again', 'code': 503}), 503
         
         logging.info(f'User authorized')
         return f(*args, **kwargs)  # Proceed with the actual function
@@ -51,12 +72,14 @@ def role_required(role):
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
-            # Get user email from JWT
-            user_email = get_jwt_identity()
-            user = User.query.filter_by(email=user_email).first()
+            # resolved from the JWT, the route reuses the same user through g
+            user = current_api_user()
+            if not user:
+                logging.error(f'No such user found {get_jwt_identity()}')
+                return jsonify({'message': 'User not found', 'code': 401}), 401
 
             if user.role != role:
-                logging.error(f'Access denied for user {user_email}, role: {user.role}')
+                logging.error(f'Access denied for user {user.email}, role: {user.role}')
                 return jsonify({'message': 'Access Denied', 'code': 403}), 403
             
             return f(*args, **kwargs)
@@ -114,11 +137,17 @@ def login():
         if not username or not password:
             return jsonify({'message':'Credentials Required', 'code':400}), 400
         user = User.query.filter_by(username=username).first()
-        if user.check_password(password):
-            access_token = create_access_token(identity=user.email, expires_delta=timedelta(minutes=60))
-            return jsonify({'message':'Login successful and Token generted',
-                            'Token':access_token,
-                            'code':200}), 200
+        if not user or not check_password(user, password):
+            logging.warning(f'Login failed for user - {username}')
+            return jsonify({'message':'Invalid credentials', 'code':401}), 401
+        access_token = create_access_token(identity=user.email, expires_delta=timedelta(minutes=60),
+                                           additional_claims=identity_claims(user))
+        return jsonify({'message':'Login successful and Token generted',
+                        'Token':access_token,
+                        'code':200}), 200
+    except PasswordCheckBusy as e:
+        logging.error(f'Login rejected, {e}')
+        return jsonify({'message':'Server busy, try again', 'code':503}), 503
     except Exception as e:
         return jsonify({'message':f'Unexpected error {str(e)}',
                         'code':500}), 500
@@ -130,21 +159,21 @@ def login():
 def add_quote():
     try:
         data = request.json
-        author_mail = get_jwt_identity()
         if not data or 'quote' not in data:
             logging.error(f'Bad request - No quote to add!')
             return jsonify({'message':'No quote to add', 'code':400}), 400
         
-        user = User.query.filter_by(email=author_mail).first()
+        user = current_api_user()
         if not user:
-            logging.error(f'No such user found {author_mail}')
-            return jsonify({'message':f'User {author_mail} not found', 'code':400}), 400
+            logging.error(f'No such user found {get_jwt_identity()}')
+            return jsonify({'message':f'User {get_jwt_identity()} not found', 'code':400}), 400
         
         new_quote = Quote(quote=data['quote'], user_id=user.id)
         db.session.add(new_quote)
+        adjust_quote_count(user.id, 1)
         db.session.commit()
         
-        logging.info(f'Quote added by {user}')
+        logging.info(f'Quote added by {user.username}')
         return jsonify({'message':'Quote added successfully', 'code':201}), 201
     
     except Exception as e:
@@ -152,28 +181,68 @@ def add_quote():
         return jsonify({'error':f'Error occurred {e}', 'code':500}), 500
 
 
+@api.route('/quotes/bulk', methods=['POST'])
+@jwt_required()
+@role_required('user')
+def add_quotes_bulk():
+    if request.mimetype not in BULK_DECODERS:
+        logging.error(f'Bad request - unsupported bulk content type {request.mimetype}')
+        return jsonify({'message':'Send application/x-ndjson or a JSON array',
+                        'code':415}), 415
+    try:
+        user = current_api_user()
+        # small bodies may already have been read (e.g. by request logging),
+        # anything bigger or of unknown length is consumed as a stream
+        size = request.content_length
+        if size is not None and size <= BULK_BUFFER_BYTES:
+            stream = io.BytesIO(request.get_data())
+        else:
+            stream = request.stream
+
+        upload = BulkUpload(BULK_DECODERS[request.mimetype](),
+                            current_app.config.get('BULK_BATCH_SIZE', 1000))
+        ingest_quotes(stream, upload, user.id)
+        logging.info(f'Bulk upload by {user.username} - {upload.totals()}')
+        if upload.error:
+            logging.error(f'Bulk upload stopped early - {upload.error}')
+        payload, status = upload.result()
+        return jsonify(payload), status
+
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f'An error occured during bulk upload. {e}')
+        return jsonify({'error':f'Error occurred {e}', 'code':500}), 500
+
+
 @api.route('/quotes',methods=['GET'])
 @jwt_required()
 @limiter.limit('3 per minute')
-@cache.cached(timeout=30, query_string=True)
+@response_cache.conditional('quotes')
+@response_cache.cached('quotes', timeout=30, response_filter=is_cacheable)
 def get_quotes():
     try:
-        user_mail = get_jwt_identity()
-        user = User.query.filter_by(email=user_mail).first()
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        paginate_qoutes = Quote.query.paginate(page=page, per_page=per_page, error_out=False)
+        fields = requested_fields(QUOTE_FIELDS)
+    except ValueError as e:
+        logging.error(f'Bad request - {e}')
+        return jsonify({'message':str(e), 'code':400}), 400
+    try:
+        user = current_api_user()
+
+        # cursor mode, seeks on the primary key so deep pages cost the same as page 1
+        if any(arg in request.args for arg in CURSOR_ARGS):
+            return get_quotes_by_cursor(user, fields)
+
+        page, per_page = page_args(request.args)
+        total = db.session.scalar(quote_count_query())
+        page_query = quote_page_query(fields, page, per_page)
+        stream = per_page > STREAM_THRESHOLD
+        if stream:
+            rows = db.session.execute(page_query.execution_options(yield_per=STREAM_THRESHOLD))
+        else:
+            rows = db.session.execute(page_query).all()
         logging.info(f'Quotes Fetched for user - {user.username}')
-        return jsonify({
-            'previous page': url_for('api.get_quotes', page=paginate_qoutes.page-1, per_page=per_page)\
-            if paginate_qoutes.page>1 else None,
-            'current page': paginate_qoutes.page,
-            'next page': url_for('api.get_quotes', page=paginate_qoutes.page+1, per_page=per_page)\
-            if paginate_qoutes.page<paginate_qoutes.pages else None,
-            'total pages': paginate_qoutes.pages,
-            'total quotes': paginate_qoutes.total,
-            'data':[{'quote': quote.quote,
-            'author':quote.author.username} for quote in paginate_qoutes.items]}), 200
+        envelope = page_envelope(quotes_link(url_for, request.args), page, per_page, total)
+        return listing_response(envelope, rows, quote_serializer(fields), stream=stream), 200
     
     except Exception as e:
         logging.error(F'Error occured while fetching quotes.{e}')
@@ -182,6 +251,109 @@ def get_quotes():
             'code':500}), 500
 
 
+def get_quotes_by_cursor(user, fields=None):
+    try:
+        direction, key = cursor_from_args(request.args)
+    except ValueError:
+        logging.error('Bad request - invalid quotes cursor')
+        return jsonify({'message':'Invalid cursor', 'code':400}), 400
+
+    limit = request.args.get('limit', 10, type=int)
+    page = keyset_paginate(quote_listing(fields), Quote.quote_id,
+                           direction=direction, key=key, limit=limit)
+    logging.info(f'Quotes Fetched by cursor for user - {user.username}')
+
+    envelope = cursor_envelope(quotes_link(url_for, request.args), page)
+    if wants_total(request.args):
+        envelope['total quotes'] = db.session.scalar(quote_count_query())
+    return listing_response(envelope, page['items'], quote_serializer(fields),
+                            stream=page['limit'] > STREAM_THRESHOLD), 200
+
+
+@api.route('/quotes/search', methods=['GET'])
+@jwt_required()
+def search_quotes_by_text():
+    query = request.args.get('q', '').strip()
+    if not match_expression(query):
+        logging.error('Bad request - empty search query')
+        return jsonify({'message':'Search query q is required', 'code':400}), 400
+    try:
+        after = None
+        if request.args.get('cursor'):
+            _, after = decode_cursor(request.args['cursor'], key_type=search_cursor_key)
+    except ValueError:
+        logging.error('Bad request - invalid search cursor')
+        return jsonify({'message':'Invalid cursor', 'code':400}), 400
+
+    limit = request.args.get('limit', 10, type=int)
+    try:
+        rows, next_cursor = search_quotes(query, after=after, limit=limit)
+    except OperationalError as e:
+        db.session.rollback()
+        logging.error(f'Quote search failed, is the search index built? {e}')
+        return jsonify({'message':'Search is unavailable', 'code':503}), 503
+
+    logging.info(f'Quotes searched by {get_jwt_identity()} - {query}')
+    return listing_response({
+        'query': query,
+        'next cursor': next_cursor,
+        'next page': url_for('api.search_quotes_by_text', q=query, cursor=next_cursor, limit=limit)\
+        if next_cursor else None}, rows, serialize=search_result_to_dict), 200
+
+
+@api.route('/quotes/random', methods=['GET'])
+@jwt_required()
+def get_random_quote():
+    try:
+        row = random_quote()
+    except OperationalError as e:
+        db.session.rollback()
+        logging.error(f'Random quote failed, is the sample index built? {e}')
+        return jsonify({'message':'Random quotes are unavailable', 'code':503}), 503
+    if row is None:
+        return jsonify({'message':'No quotes yet', 'code':404}), 404
+    response = jsonify({'data':quote_to_dict(row)})
+    response.cache_control.no_store = True
+    return response, 200
+
+
+@api.route('/quotes/daily', methods=['GET'])
+@jwt_required()
+def get_daily_quote():
+    try:
+        picked = daily_quote()
+    except OperationalError as e:
+        db.session.rollback()
+        logging.error(f'Quote of the day failed, is the sample index built? {e}')
+        return jsonify({'message':'Quote of the day is unavailable', 'code':503}), 503
+    if picked is None:
+        return jsonify({'message':'No quotes yet', 'code':404}), 404
+    return jsonify({'data':picked}), 200
+
+
+@api.route('/quotes/export', methods=['GET'])
+@jwt_required()
+def export_quotes_stream():
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        logging.error(f'Bad request - unknown export format {export_format}')
+        return jsonify({'message':'format must be ndjson or csv', 'code':400}), 400
+
+    # resuming is done by passing the last id received as ?after=
+    try:
+        after = key_arg(request.args, 'after')
+    except ValueError as e:
+        logging.error(f'Bad request - {e}')
+        return jsonify({'message':str(e), 'code':400}), 400
+    mimetype, to_chunks = EXPORT_FORMATS[export_format]
+    gzip = bool(request.accept_encodings['gzip'])
+    chunks = export_chunks(export_quotes(after).partitions(), to_chunks, gzip)
+    headers = export_headers(export_format, gzip)
+
+    logging.info(f'Quotes export ({export_format}) started for {get_jwt_identity()} after id {after}')
+    return Response(stream_with_context(chunks), mimetype=mimetype, headers=headers)
+
+
 @api.route('/edit/<int:quote_id>', methods=['PUT'])
 @jwt_required()
 def edit_quote(quote_id):
@@ -192,14 +364,13 @@ def edit_quote(quote_id):
             logging.error(f'Bad request - No data provided to edit')
             return jsonify({'message':'No data provided to edit quote',
                             'code':400}), 400
-        user_mail = get_jwt_identity()
-        user = User.query.filter_by(email=user_mail).first()
-        if not quote.author or quote.author.username != user.username:
-            logging.error(f'Forbidden to edit for user - {user}')
+        user = current_api_user()
+        if not user or quote.user_id != user.id:
+            logging.error(f'Forbidden to edit for user - {get_jwt_identity()}')
             return jsonify({'message':'Unauthorized attempt', 'code':403}), 403
         quote.quote = data['quote']
         db.session.commit()
-        logging.info(f'Quote successfully edited by {user}')
+        logging.info(f'Quote successfully edited by {user.username}')
         return jsonify({'message':'Quote update successfully',
                         'code':200}), 200
     except Exception as e:
@@ -214,18 +385,120 @@ def edit_quote(quote_id):
 def delete(quote_id):
     try:
         quote = Quote.query.get_or_404(quote_id)
-        user_mail = get_jwt_identity()
-        user = User.query.filter_by(email=user_mail).first()
-        if not quote.author or quote.author.username != user.username:
-            logging.error(f'Forbidden to delete for user - {user}')
+        user = current_api_user()
+        if not user or quote.user_id != user.id:
+            logging.error(f'Forbidden to delete for user - {get_jwt_identity()}')
             return jsonify({'message':'Unauthorized attempt', 'code':403}), 403
         db.session.delete(quote)
+        adjust_quote_count(user.id, -1)
         db.session.commit()
-        logging.info(f'Quote successfully deleted by {user}')
+        logging.info(f'Quote successfully deleted by {user.username}')
         return jsonify({'message':'Quote deleted successfully',
                         'code':200}), 200
     except Exception as e:
         logging.error(f'Error occured while deleting quote.')
         return jsonify({
             'message':f'Error occured while deleting quote - {e}',
-            'code':500}), 500
\ No newline at end of file
+            'code':500}), 500
+
+
+# reads the list under ``key`` from a batch request body, returns (items, error response)
+def batch_items(key):
+    try:
+        return batch_list(request.get_json(silent=True), key), None
+    except BulkFormatError as e:
+        logging.error(f'Bad request - {e}')
+        return None, (jsonify({'message':str(e), 'code':400}), 400)
+
+
+@api.route('/quotes', methods=['PATCH'])
+@jwt_required()
+def edit_quotes_batch():
+    items, error = batch_items('quotes')
+    if error:
+        return error
+    try:
+        user = current_api_user()
+        if not user:
+            logging.error(f'No such user found {get_jwt_identity()}')
+            return jsonify({'message':f'User {get_jwt_identity()} not found', 'code':400}), 400
+        return jsonify(batch_result(edit_quotes(items, user.id), user, 'updated')), 200
+    except IntegrityError:
+        # another request took one of the texts after the up-front check
+        db.session.rollback()
+        logging.error('Batch edit rolled back on a duplicate quote')
+        return jsonify({'message':'A quote text is already taken, nothing was changed',
+                        'code':409}), 409
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f'Error occured while editing quotes in batch. {e}')
+        return jsonify({
+            'message':f'Error occured while editing quotes - {e}',
+            'code':500}), 500
+
+
+@api.route('/quotes', methods=['DELETE'])
+@jwt_required()
+def delete_quotes_batch():
+    ids, error = batch_items('ids')
+    if error:
+        return error
+    try:
+        user = current_api_user()
+        if not user:
+            logging.error(f'No such user found {get_jwt_identity()}')
+            return jsonify({'message':f'User {get_jwt_identity()} not found', 'code':400}), 400
+        return jsonify(batch_result(delete_quotes(ids, user.id), user, 'deleted')), 200
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f'Error occured while deleting quotes in batch. {e}')
+        return jsonify({
+            'message':f'Error occured while deleting quotes - {e}',
+            'code':500}), 500
+
+
+@api.route('/authors/top', methods=['GET'])
+@jwt_required()
+def top_authors():
+    limit = request.args.get('limit', 10, type=int)
+    rows = db.session.execute(top_authors_query(limit)).all()
+    return jsonify({'data':[author_to_dict(row) for row in rows]}), 200
+
+
+@api.route('/users/<username>', methods=['GET'])
+@jwt_required()
+def user_profile(username):
+    user = db.session.execute(db.select(User.username, User.role, User.quote_count)
+                              .filter_by(username=username)).first()
+    if user is None:
+        return jsonify({'message':f'User {username} not found', 'code':404}), 404
+    return jsonify({'username':user.username, 'role':user.role,
+                    'quote count':user.quote_count}), 200
+
+
+@api.route('/cache/stats', methods=['GET'])
+@jwt_required()
+@role_required('admin')
+def cache_stats():
+    return jsonify(response_cache.stats()), 200
+
+
+# flask api reconcile-quote-counts, recounts quotes per user and fixes drifted counters
+@api.cli.command('reconcile-quote-counts')
+def reconcile_quote_counts_command():
+    fixed = reconcile_quote_counts()
+    print(f'Quote counts reconciled, {fixed} users corrected')
+
+
+# flask api rebuild-sample-index, renumbers every quote into the random pick index
+@api.cli.command('rebuild-sample-index')
+def rebuild_sample_index_command():
+    rebuild_sample_index()
+    print('Quote sample index rebuilt')
+
+
+# flask api rebuild-search-index, fills the full-text index from existing quotes
+@api.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    rebuild_search_index()
+    print('Quote search index rebuilt')
\ No newline at end of file
@@ -0,0 +1,129 @@
+import hashlib
+import random
+from datetime import datetime, timezone
+from sqlalchemy import DDL, column, event, func, table, text
+from sqlalchemy.dialects.sqlite import insert
+from .extension import db
+from .models import Quote
+from .serializers import quote_listing, quote_to_dict
+
+# dense index for uniform random picks: quote_slot holds every quote id in
+# slots 1..N with no gaps, so a random slot is a random quote and N is just
+# MAX(slot). The triggers append new quotes and move the last slot into the
+# hole a deleted quote leaves. daily_quote keeps the quote of each day for
+# every worker and serving mode, deleting that quote clears the day so the next
+# read draws again. create_all makes these objects with the quote table, the
+# migrations d7e2b4a9c1f3 and b6f0e2d4a813 make them for existing databases.
+SAMPLE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS quote_slot (
+        slot INTEGER PRIMARY KEY,
+        quote_id INTEGER NOT NULL)""",
+    "CREATE INDEX IF NOT EXISTS ix_quote_slot_quote_id ON quote_slot (quote_id)",
+    """CREATE TRIGGER IF NOT EXISTS quote_slot_ai AFTER INSERT ON quote BEGIN
+        INSERT INTO quote_slot(slot, quote_id)
+        VALUES ((SELECT IFNULL(MAX(slot), 0) + 1 FROM quote_slot), new.quote_id);
+    END""",
+    # the last slot's quote fills the hole, then the last slot goes, unless the
+    # deleted quote never had a slot and nothing was copied
+    """CREATE TRIGGER IF NOT EXISTS quote_slot_ad AFTER DELETE ON quote BEGIN
+        UPDATE quote_slot SET quote_id = (SELECT quote_id FROM quote_slot ORDER BY slot DESC LIMIT 1)
+        WHERE quote_id = old.quote_id;
+        DELETE FROM quote_slot WHERE slot = (SELECT MAX(slot) FROM quote_slot)
+        AND (quote_id = old.quote_id OR quote_id IN (
+            SELECT s.quote_id FROM quote_slot s WHERE s.slot < quote_slot.slot));
+    END""",
+    """CREATE TABLE IF NOT EXISTS daily_quote (
+        day VARCHAR(10) PRIMARY KEY,
+        quote_id INTEGER NOT NULL)""",
+    """CREATE TRIGGER IF NOT EXISTS daily_quote_ad AFTER DELETE ON quote BEGIN
+        DELETE FROM daily_quote WHERE quote_id = old.quote_id;
+    END""",
+]
+
+# registered here rather than in models.py, this module needs Quote
+for statement in SAMPLE_SCHEMA:
+    event.listen(Quote.__table__, 'after_create', DDL(statement))
+
+quote_slot = table('quote_slot', column('slot'), column('quote_id'))
+daily_pick = table('daily_quote', column('day'), column('quote_id'))
+
+# a pick can only miss if the index changed between reading N and the slot
+RANDOM_RETRIES = 3
+
+
+def rebuild_sample_index():
+    # creates the index if it is missing, then renumbers every quote into it
+    with db.engine.begin() as connection:
+        for statement in SAMPLE_SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(text('DELETE FROM quote_slot'))
+        connection.execute(text("""INSERT INTO quote_slot(slot, quote_id)
+            SELECT ROW_NUMBER() OVER (ORDER BY quote_id), quote_id FROM quote"""))
+
+
+def quote_in_slot(pick, session=None):
+    """The quote in the slot ``pick(size)`` chooses, None for an empty table.
+
+    Two primary key lookups, no scan or sort whatever the table size.
+    ``session`` defaults to db.session, as for bulk.insert_quotes.
+    """
+    session = session or db.session
+    for _ in range(RANDOM_RETRIES):
+        size = session.scalar(db.select(func.max(quote_slot.c.slot)))
+        if not size:
+            return None
+        row = session.execute(
+            quote_listing().join(quote_slot, quote_slot.c.quote_id == Quote.quote_id)
+            .where(quote_slot.c.slot == pick(size))).first()
+        if row is not None:
+            return row
+    return None
+
+
+def random_quote(session=None):
+    return quote_in_slot(lambda size: random.randint(1, size), session)
+
+
+def daily_seed(day):
+    # the same slot for every worker drawing on the same day
+    key = f'daily-quote:{day.isoformat()}'
+    return int.from_bytes(hashlib.sha256(key.encode('utf-8')).digest()[:8], 'big')
+
+
+# the day's pick with its current text and author, None before the first draw
+def daily_pick_query(day):
+    return quote_listing().join(daily_pick, daily_pick.c.quote_id == Quote.quote_id)\
+        .where(daily_pick.c.day == day.isoformat())
+
+
+def claim_daily_pick(day, quote_id):
+    # the first draw of the day is kept, a worker drawing at the same time
+    # inserts nothing and reads the winner's pick back
+    return insert(daily_pick).values(day=day.isoformat(), quote_id=quote_id)\
+        .on_conflict_do_nothing(index_elements=['day'])
+
+
+def forget_past_picks(day):
+    return daily_pick.delete().where(daily_pick.c.day < day.isoformat())
+
+
+def daily_quote(session=None):
+    """The quote of the day, the same for every caller unless it is deleted.
+
+    The slot comes from a hash of the date and the drawn quote id is stored in
+    daily_quote, so edits show up in the pick and only a delete (through the
+    table's trigger) makes the next call draw again.
+    """
+    session = session or db.session
+    day = datetime.now(timezone.utc).date()
+    row = session.execute(daily_pick_query(day)).first()
+    if row is None:
+        seed = daily_seed(day)
+        drawn = quote_in_slot(lambda size: seed % size + 1, session)
+        if drawn is None:
+            return None
+        session.execute(forget_past_picks(day))
+        session.execute(claim_daily_pick(day, drawn.quote_id))
+        session.commit()
+        row = session.execute(daily_pick_query(day)).first() or drawn
+    return quote_to_dict(row)
@@ -0,0 +1,105 @@
+import re
+from markupsafe import escape
+from sqlalchemy import text
+from .extension import db
+from .pagination import encode_cursor, MAX_LIMIT
+
+# external content FTS5 index over quote.quote, the triggers keep it in step
+# with every insert, update and delete on the quote table. create_all makes
+# them with the quote table (models.py), the migration c3a91f5e27d4 for
+# existing databases.
+SEARCH_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS quote_fts USING fts5(
+        quote, content='quote', content_rowid='quote_id',
+        tokenize='unicode61 remove_diacritics 2')""",
+    """CREATE TRIGGER IF NOT EXISTS quote_fts_ai AFTER INSERT ON quote BEGIN
+        INSERT INTO quote_fts(rowid, quote) VALUES (new.quote_id, new.quote);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS quote_fts_ad AFTER DELETE ON quote BEGIN
+        INSERT INTO quote_fts(quote_fts, rowid, quote) VALUES ('delete', old.quote_id, old.quote);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS quote_fts_au AFTER UPDATE OF quote ON quote BEGIN
+        INSERT INTO quote_fts(quote_fts, rowid, quote) VALUES ('delete', old.quote_id, old.quote);
+        INSERT INTO quote_fts(rowid, quote) VALUES (new.quote_id, new.quote);
+    END""",
+]
+
+# snippet markers, private use characters so the quote text can be escaped
+# before they become <b> tags
+MARK_OPEN, MARK_CLOSE = '\ue000', '\ue001'
+
+# rank and id of the last row seen are the cursor, ties on rank break on id
+SEARCH_QUERY = text(f"""
+    SELECT quote_id, quote, author, rank, snippet FROM (
+        SELECT q.quote_id AS quote_id, q.quote AS quote, u.username AS author,
+               bm25(quote_fts) AS rank,
+               snippet(quote_fts, 0, '{MARK_OPEN}', '{MARK_CLOSE}', '...', 12) AS snippet
+        FROM quote_fts
+        JOIN quote q ON q.quote_id = quote_fts.rowid
+        LEFT JOIN user u ON u.id = q.user_id
+        WHERE quote_fts MATCH :match
+    )
+    WHERE :after_rank IS NULL OR rank > :after_rank
+          OR (rank = :after_rank AND quote_id > :after_id)
+    ORDER BY rank, quote_id
+    LIMIT :limit
+""")
+
+
+def match_expression(query):
+    """Turn user input into a safe FTS5 query.
+
+    Every word becomes a quoted phrase so FTS5 operators in the input are
+    treated as text. Words are ANDed and a trailing ``*`` keeps prefix search.
+    """
+    terms = []
+    for word, star in re.findall(r'(\w+)(\*?)', query):
+        terms.append(f'"{word}"' + ('*' if star else ''))
+    return ' '.join(terms)
+
+
+def search_cursor_key(key):
+    return float(key[0]), int(key[1])
+
+
+def search_params(query, after=None, limit=10):
+    # bind parameters for SEARCH_QUERY and the clamped limit
+    limit = max(1, min(limit, MAX_LIMIT))
+    after_rank, after_id = after if after else (None, None)
+    return {'match': match_expression(query), 'after_rank': after_rank,
+            'after_id': after_id, 'limit': limit + 1}, limit
+
+
+def search_quotes(query, after=None, limit=10):
+    params, limit = search_params(query, after, limit)
+    return search_page(db.session.execute(SEARCH_QUERY, params).all(), limit)
+
+
+def search_page(rows, limit):
+    has_next = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor('after', [rows[-1].rank, rows[-1].quote_id]) if has_next else None
+    return rows, next_cursor
+
+
+def highlighted(fragment):
+    # escapes the quote text, then turns the snippet markers into <b> tags
+    return str(escape(fragment)).replace(MARK_OPEN, '<b>').replace(MARK_CLOSE, '</b>')
+
+
+def search_result_to_dict(row):
+    """A search hit, ``quote`` is plain text and ``snippet`` is HTML.
+
+    The quote text in the snippet is escaped and the matches are wrapped in
+    ``<b>``, so the snippet can be rendered as it is.
+    """
+    return {'id': row.quote_id, 'quote': row.quote, 'author': row.author,
+            'snippet': highlighted(row.snippet), 'rank': row.rank}
+
+
+def rebuild_search_index():
+    # creates the index if it is missing, then re-reads every quote into it
+    with db.engine.begin() as connection:
+        for statement in SEARCH_SCHEMA:
+            connection.execute(text(statement))
+        connection.execute(text("INSERT INTO quote_fts(quote_fts) VALUES ('rebuild')"))
@@ -0,0 +1,210 @@
+import csv
+import io
+import json
+import math
+import zlib
+from flask import current_app, stream_with_context
+from compact_responses import encoded_response, wants_msgpack
+from .extension import db
+from .models import User, Quote
+
+# pages larger than this are encoded row by row instead of through jsonify
+STREAM_THRESHOLD = 200
+
+# rows fetched per round trip and bytes per chunk written during exports
+EXPORT_FETCH_SIZE = 1000
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+
+# fields a quote listing can be narrowed to with ?fields=
+QUOTE_FIELDS = ('id', 'quote', 'author')
+
+
+# projection for quote listings, the author's username comes from the same
+# joined statement so rendering a page never lazy-loads User rows. With
+# ``fields`` only those columns are selected and the join is skipped unless
+# the author is asked for, quote_id is always there for the cursors.
+def quote_listing(fields=None):
+    query = db.select(Quote.quote_id)
+    if fields is None or 'quote' in fields:
+        query = query.add_columns(Quote.quote)
+    if fields is None or 'author' in fields:
+        query = query.add_columns(User.username.label('author'))\
+            .outerjoin(User, Quote.user_id == User.id)
+    return query
+
+
+# one offset page of quote_listing(fields) in primary key order
+def quote_page_query(fields, page, per_page):
+    return quote_listing(fields).order_by(Quote.quote_id)\
+        .limit(per_page).offset((page - 1) * per_page)
+
+
+def quote_count_query():
+    return db.select(db.func.count()).select_from(Quote)
+
+
+def quote_to_dict(row):
+    return {'id': row.quote_id, 'quote': row.quote, 'author': row.author}
+
+
+# serializer for rows of quote_listing(fields)
+def quote_serializer(fields=None):
+    if fields is None:
+        return quote_to_dict
+    columns = [('id', 'quote_id') if field == 'id' else (field, field) for field in fields]
+    return lambda row: {name: getattr(row, column) for name, column in columns}
+
+
+def envelope_chunks(envelope, rows, serialize):
+    # data goes out first, the remaining envelope keys are appended at the end
+    yield '{"data":['
+    for index, row in enumerate(rows):
+        yield (',' if index else '') + json.dumps(serialize(row))
+    yield ']'
+    for key, value in envelope.items():
+        yield f',{json.dumps(key)}:{json.dumps(value)}'
+    yield '}'
+
+
+# page links of the quote listing keep its ?fields=, ``url_for`` is the
+# framework's, Flask or Quart
+def quotes_link(url_for, args):
+    return lambda **page: url_for('api.get_quotes', fields=args.get('fields'), **page)
+
+
+# envelope of an offset page, ``link(**args)`` builds the URL of another page
+def page_envelope(link, page, per_page, total):
+    pages = math.ceil(total / per_page)
+    return {
+        'previous page': link(page=page-1, per_page=per_page) if page > 1 else None,
+        'current page': page,
+        'next page': link(page=page+1, per_page=per_page) if page < pages else None,
+        'total pages': pages,
+        'total quotes': total}
+
+
+# envelope of a keyset page from pagination.keyset_page
+def cursor_envelope(link, page):
+    return {
+        'previous page': link(cursor=page['prev'], limit=page['limit']) if page['prev'] else None,
+        'next page': link(cursor=page['next'], limit=page['limit']) if page['next'] else None,
+        'previous cursor': page['prev'],
+        'next cursor': page['next']}
+
+
+def listing_response(envelope, rows, serialize=quote_to_dict, stream=False, app=None,
+                     accept_mimetypes=None):
+    """Render a listing envelope with its rows under ``data``.
+
+    Small pages go through jsonify as before. With ``stream`` set the JSON
+    array is written out one row at a time, so no list of dicts is built.
+    Clients that accept MessagePack get the whole page packed instead.
+    ``app`` and ``accept_mimetypes`` default to the current Flask app and
+    request, the async app passes its own.
+    """
+    if not stream or wants_msgpack(accept_mimetypes):
+        return encoded_response(dict(envelope, data=[serialize(row) for row in rows]),
+                                app, accept_mimetypes)
+    chunks = envelope_chunks(envelope, rows, serialize)
+    if app is None:
+        # the rows may still come from an open cursor while the body is sent
+        app, chunks = current_app, stream_with_context(chunks)
+    response = app.response_class(chunks, mimetype='application/json')
+    response.vary.add('Accept')
+    return response
+
+
+# streamed bodies are generators and cannot be stored by the response cache
+def is_cacheable(rv):
+    response = rv[0] if isinstance(rv, tuple) else rv
+    return not getattr(response, 'is_streamed', False)
+
+
+# whole corpus in primary key order, for fetching in batches from an open cursor
+def export_query(after=None):
+    query = quote_listing().order_by(Quote.quote_id)
+    if after is not None:
+        query = query.where(Quote.quote_id > after)
+    return query.execution_options(yield_per=EXPORT_FETCH_SIZE)
+
+
+def export_quotes(after=None):
+    return db.session.execute(export_query(after))
+
+
+def ndjson_chunks(rows):
+    chunk = []
+    size = 0
+    for row in rows:
+        line = json.dumps(quote_to_dict(row)) + '\n'
+        chunk.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_BYTES:
+            yield ''.join(chunk)
+            chunk, size = [], 0
+    if chunk:
+        yield ''.join(chunk)
+
+
+def csv_chunks(rows, header=True):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(['id', 'quote', 'author'])
+    for row in rows:
+        writer.writerow([row.quote_id, row.quote, row.author])
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+# export format -> (mimetype, encoder)
+EXPORT_FORMATS = {'ndjson': ('application/x-ndjson', ndjson_chunks),
+                  'csv': ('text/csv', csv_chunks)}
+
+
+def export_headers(export_format, gzip):
+    headers = {'Content-Disposition': f'attachment; filename=quotes.{export_format}',
+               'Vary': 'Accept-Encoding'}
+    if gzip:
+        headers['Content-Encoding'] = 'gzip'
+    return headers
+
+
+class ExportEncoder:
+    """Encodes an export partition by partition, optionally gzipped.
+
+    ``encode`` takes the next batch of rows and returns its chunks, ``finish``
+    the chunks that end the body. Only the first batch of a CSV export gets
+    the header row.
+    """
+
+    def __init__(self, to_chunks, gzip=False, level=6):
+        self.to_chunks = to_chunks
+        self.first = True
+        # wbits=31 writes a gzip header and trailer around the deflate stream
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31) if gzip else None
+
+    def encode(self, rows):
+        if self.to_chunks is csv_chunks and not self.first:
+            chunks = csv_chunks(rows, header=False)
+        else:
+            chunks = self.to_chunks(rows)
+        self.first = False
+        if self.compressor is None:
+            return list(chunks)
+        return [data for data in map(self.compressor.compress,
+                                     (chunk.encode('utf-8') for chunk in chunks)) if data]
+
+    def finish(self):
+        return [self.compressor.flush()] if self.compressor is not None else []
+
+
+def export_chunks(partitions, to_chunks, gzip=False):
+    encoder = ExportEncoder(to_chunks, gzip)
+    for rows in partitions:
+        yield from encoder.encode(rows)
+    yield from encoder.finish()
@@ -0,0 +1,5 @@
+from sqlite_rest_api.aio import create_async_app
+
+# async serving mode, run with an ASGI server:
+#   hypercorn sqlite_rest_api_asgi:app
+app = create_async_app()
@@ -0,0 +1,59 @@
+import os
+import sys
+
+import pytest
+
+# the apps and the shared modules are imported from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlite_rest_api import create_app
+from sqlite_rest_api.extension import db
+
+
+class ApiConfig:
+    SECRET_KEY = 'test-secret-key-of-at-least-32-bytes'
+    JWT_SECRET_KEY = 'test-jwt-secret-of-at-least-32-bytes'
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    RATELIMIT_ENABLED = False
+    BCRYPT_LOG_ROUNDS = 4
+    CACHE_TYPE = 'SimpleCache'
+    LOG_SAMPLE_RATES = {}
+
+
+# logging is set up once per process (see request_logging.py), every app of
+# the session writes to this one file
+@pytest.fixture(scope='session', autouse=True)
+def log_file(tmp_path_factory):
+    ApiConfig.LOG_FILE = str(tmp_path_factory.mktemp('logs') / 'api.log')
+    return ApiConfig.LOG_FILE
+
+
+# test modules override this fixture to run the app with another config
+@pytest.fixture
+def config():
+    return ApiConfig
+
+
+@pytest.fixture
+def app(config):
+    app = create_app(config)
+    with app.app_context():
+        db.create_all()
+    # requests push their own app context, as they do when served
+    yield app
+    with app.app_context():
+        db.drop_all()
+
+
+# registers a user and returns the headers of its JWT
+@pytest.fixture
+def login(app):
+    client = app.test_client()
+
+    def login(username):
+        client.post('/api/register', json={'username': username, 'email': f'{username}@example.com',
+                                           'password': 'secret'})
+        token = client.post('/api/login', json={'username': username,
+                                                'password': 'secret'}).json['Token']
+        return {'Authorization': f'Bearer {token}'}
+    return login
@@ -0,0 +1,22 @@
+# BCRYPT_TIMEOUT bounds the whole password check, the wait for a pool slot
+# included, not each of the two waits separately.
+import time
+from types import SimpleNamespace
+
+import pytest
+from sqlite_rest_api import passwords
+from sqlite_rest_api.models import bcrypt
+
+
+def test_slot_wait_counts_against_the_timeout(app, monkeypatch):
+    app.config['BCRYPT_TIMEOUT'] = 0.5
+    monkeypatch.setattr(bcrypt, 'check_password_hash', lambda *args: time.sleep(1) or True)
+    user = SimpleNamespace(username='slow', password='stored-hash')
+    with app.app_context():
+        _, slots = passwords._pool()
+        acquire = slots.acquire
+        monkeypatch.setattr(slots, 'acquire', lambda timeout: time.sleep(0.4) or acquire(timeout=timeout))
+        started = time.monotonic()
+        with pytest.raises(passwords.PasswordCheckBusy):
+            passwords.check_password(user, 'secret')
+    assert time.monotonic() - started < 0.7
@@ -0,0 +1,87 @@
+# PATCH and DELETE /api/quotes report one status per item. The whole batch
+# commits at once, and cached listings must not outlive it.
+import pytest
+from sqlite_rest_api.authors import adjust_quote_count
+from sqlite_rest_api.extension import db
+from sqlite_rest_api.models import Quote, User
+
+
+@pytest.fixture
+def quotes(app, login):
+    """Headers of two authors and the ids of their quotes, by text."""
+    headers = login('writer'), login('other')
+    with app.app_context():
+        users = dict(db.session.execute(db.select(User.username, User.id)).all())
+        for text, author in (('a', 'writer'), ('b', 'writer'), ('c', 'writer'), ('x', 'other')):
+            db.session.add(Quote(quote=text, user_id=users[author]))
+            adjust_quote_count(users[author], 1)
+        db.session.commit()
+        ids = dict(db.session.execute(db.select(Quote.quote, Quote.quote_id)).all())
+    return headers, ids
+
+
+def stored_quotes(app):
+    with app.app_context():
+        return dict(db.session.execute(db.select(Quote.quote_id, Quote.quote)).all())
+
+
+def statuses(response):
+    assert response.status_code == 200, response.data
+    return [(result['id'], result['status']) for result in response.json['results']]
+
+
+def test_batch_edit_statuses(app, quotes):
+    (headers, _), ids = quotes
+    response = app.test_client().patch('/api/quotes', headers=headers, json={'quotes': [
+        {'id': ids['a'], 'quote': 'a2'},
+        {'id': ids['b'], 'quote': 'c'},       # taken by another quote
+        {'id': ids['x'], 'quote': 'x2'},      # someone else's
+        {'id': 9999, 'quote': 'gone'},
+        {'id': ids['c']},                     # no text
+        {'id': 'c', 'quote': 'c2'},
+        {'id': ids['a'], 'quote': 'a3'},      # same id twice
+    ]})
+    assert statuses(response) == [(ids['a'], 'updated'), (ids['b'], 'duplicate'),
+                                  (ids['x'], 'forbidden'), (9999, 'not found'),
+                                  (ids['c'], 'invalid'), (None, 'invalid'), (ids['a'], 'invalid')]
+    assert response.json['counts'] == {'updated': 1, 'duplicate': 1, 'forbidden': 1,
+                                       'not found': 1, 'invalid': 3}
+    assert stored_quotes(app) == {ids['a']: 'a2', ids['b']: 'b', ids['c']: 'c', ids['x']: 'x'}
+
+
+def test_batch_delete_statuses(app, quotes):
+    (headers, _), ids = quotes
+    response = app.test_client().delete('/api/quotes', headers=headers, json={
+        'ids': [ids['a'], ids['x'], 9999, 'b', True, ids['a'], ids['a']]})
+    assert statuses(response) == [(ids['a'], 'deleted'), (ids['x'], 'forbidden'),
+                                  (9999, 'not found'), (None, 'invalid'), (None, 'invalid'),
+                                  (ids['a'], 'duplicate'), (ids['a'], 'duplicate')]
+    assert stored_quotes(app) == {ids['b']: 'b', ids['c']: 'c', ids['x']: 'x'}
+    profile = app.test_client().get('/api/users/writer', headers=headers)
+    assert profile.json['quote count'] == 2
+
+
+@pytest.mark.parametrize('method, body', [('patch', {'quotes': []}), ('patch', {'ids': [1]}),
+                                          ('delete', {'ids': 1}), ('delete', None)])
+def test_batch_without_a_list_is_rejected(app, quotes, method, body):
+    (headers, _), _ = quotes
+    response = getattr(app.test_client(), method)('/api/quotes', headers=headers, json=body)
+    assert response.status_code == 400
+
+
+def listed(client, headers):
+    response = client.get('/api/quotes?per_page=50', headers=headers)
+    assert response.status_code == 200, response.data
+    return sorted(row['quote'] for row in response.json['data'])
+
+
+def test_batch_invalidates_cached_listings(app, quotes):
+    (headers, _), ids = quotes
+    client = app.test_client()
+    assert listed(client, headers) == ['a', 'b', 'c', 'x']
+
+    client.patch('/api/quotes', headers=headers, json={'quotes': [{'id': ids['a'], 'quote': 'a2'}]})
+    assert listed(client, headers) == ['a2', 'b', 'c', 'x']
+
+    client.delete('/api/quotes', headers=headers, json={'ids': [ids['b'], ids['c']]})
+    assert listed(client, headers) == ['a2', 'x']
@@ -0,0 +1,90 @@
+# POST /api/quotes/bulk with NDJSON and JSON array bodies. Every batch is its
+# own transaction, so the per-batch counts and the author's quote count have
+# to agree with what actually reached the table.
+import json
+
+import pytest
+from conftest import ApiConfig
+from sqlite_rest_api.extension import db
+from sqlite_rest_api.models import Quote
+
+
+class BulkConfig(ApiConfig):
+    BULK_BATCH_SIZE = 3
+
+
+@pytest.fixture
+def config():
+    return BulkConfig
+
+
+@pytest.fixture
+def headers(login):
+    return login('writer')
+
+
+def upload(app, headers, body, content_type):
+    return app.test_client().post('/api/quotes/bulk', data=body, headers=headers,
+                                  content_type=content_type)
+
+
+def stored_quotes(app):
+    with app.app_context():
+        return db.session.scalars(db.select(Quote.quote).order_by(Quote.quote_id)).all()
+
+
+def quote_count(app, headers, username='writer'):
+    return app.test_client().get(f'/api/users/{username}', headers=headers).json['quote count']
+
+
+NDJSON = b'"one"\n{"quote": "two"}\n\nnot json\n{"quote": ""}\n"three"\n42\n"four"'
+ARRAY = json.dumps(['one', {'quote': 'two'}, {'text': 'wrong key'}, {'quote': ''},
+                    'three', 42, 'four']).encode()
+
+
+@pytest.mark.parametrize('body, content_type', [(NDJSON, 'application/x-ndjson'),
+                                                (NDJSON, 'application/jsonl'),
+                                                (ARRAY, 'application/json')])
+def test_upload_inserts_valid_items_and_rejects_the_rest(app, headers, body, content_type):
+    response = upload(app, headers, body, content_type)
+    assert response.status_code == 200, response.data
+    assert (response.json['inserted'], response.json['duplicates'],
+            response.json['rejected']) == (4, 0, 3)
+    assert [batch['inserted'] + batch['rejected'] for batch in response.json['batches']] == [3, 3, 1]
+    assert stored_quotes(app) == ['one', 'two', 'three', 'four']
+
+
+def test_duplicates_in_the_body_and_in_the_table_are_skipped(app, headers):
+    upload(app, headers, b'"old"\n', 'application/x-ndjson')
+    response = upload(app, headers, b'"new"\n"old"\n"new"\n"other"\n', 'application/x-ndjson')
+    assert response.status_code == 200, response.data
+    assert (response.json['inserted'], response.json['duplicates']) == (2, 2)
+    assert response.json['batches'][0] == {'batch': 1, 'inserted': 1, 'duplicates': 2,
+                                           'rejected': 0}
+    assert stored_quotes(app) == ['old', 'new', 'other']
+
+
+def test_unterminated_array_keeps_the_committed_batches(app, headers):
+    response = upload(app, headers, b'["a", "b", "c", "d", "e"', 'application/json')
+    assert response.status_code == 400
+    assert response.json['message'] == 'Unterminated JSON array'
+    assert [batch['inserted'] for batch in response.json['batches']] == [3, 2]
+    assert response.json['inserted'] == 5
+    assert stored_quotes(app) == ['a', 'b', 'c', 'd', 'e']
+
+
+def test_body_that_is_not_an_array_is_rejected(app, headers):
+    response = upload(app, headers, b'{"quote": "a"}', 'application/json')
+    assert response.status_code == 400
+    assert response.json['batches'] == []
+    assert stored_quotes(app) == []
+
+
+def test_unsupported_content_type_is_rejected(app, headers):
+    assert upload(app, headers, b'a\nb', 'text/plain').status_code == 415
+
+
+def test_quote_count_follows_bulk_inserts(app, headers):
+    upload(app, headers, b'"a"\n"b"\n"c"\n"d"\n', 'application/x-ndjson')
+    upload(app, headers, json.dumps(['c', 'd', 'e']).encode(), 'application/json')
+    assert quote_count(app, headers) == 5 == len(stored_quotes(app))
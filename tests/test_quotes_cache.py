@@ -0,0 +1,62 @@
+# Every write path has to move the 'quotes' tag to a new generation, or
+# cached listings and their ETags keep serving the data from before it.
+import json
+
+import pytest
+from sqlalchemy import select
+from sqlite_rest_api.caching import cache_generation
+from sqlite_rest_api.extension import db
+
+
+@pytest.fixture
+def headers(app, login):
+    headers = login('writer')
+    client = app.test_client()
+    for text in ('first', 'second'):
+        client.post('/api/add', headers=headers, json={'quote': text})
+    return headers
+
+
+def generation(app):
+    with app.app_context():
+        return db.session.scalar(select(cache_generation.c.generation)
+                                 .where(cache_generation.c.tag == 'quotes')) or 0
+
+
+def first_id(client, headers):
+    return client.get('/api/quotes', headers=headers).json['data'][0]['id']
+
+
+WRITES = {
+    'add': lambda client, headers: client.post('/api/add', headers=headers,
+                                               json={'quote': 'added'}),
+    'edit': lambda client, headers: client.put(f'/api/edit/{first_id(client, headers)}',
+                                               headers=headers, json={'quote': 'edited'}),
+    'delete': lambda client, headers: client.delete(f'/api/delete/{first_id(client, headers)}',
+                                                    headers=headers),
+    'bulk': lambda client, headers: client.post('/api/quotes/bulk', headers=headers,
+                                                data=json.dumps(['bulk']),
+                                                content_type='application/json'),
+    'batch edit': lambda client, headers: client.patch('/api/quotes', headers=headers, json={
+        'quotes': [{'id': first_id(client, headers), 'quote': 'batch edited'}]}),
+    'batch delete': lambda client, headers: client.delete('/api/quotes', headers=headers, json={
+        'ids': [first_id(client, headers)]}),
+}
+
+
+@pytest.mark.parametrize('write', WRITES)
+def test_write_invalidates_listing_and_etag(app, headers, write):
+    client = app.test_client()
+    before = client.get('/api/quotes', headers=headers)
+    etag = before.headers['ETag']
+    assert client.get('/api/quotes', headers=dict(headers, **{'If-None-Match': etag})).status_code == 304
+    generation_before = generation(app)
+
+    response = WRITES[write](client, headers)
+    assert response.status_code in (200, 201), response.data
+
+    assert generation(app) > generation_before
+    after = client.get('/api/quotes', headers=dict(headers, **{'If-None-Match': etag}))
+    assert after.status_code == 200
+    assert after.headers['ETag'] != etag
+    assert after.json['data'] != before.json['data']
@@ -0,0 +1,92 @@
+# Statement counts of GET /api/quotes in page mode and cursor mode, against an
+# in-memory database. Every page has to cost the same few statements whatever
+# its position or size, a lazy load per row or an OFFSET walk would show here.
+import pytest
+from sqlalchemy import event, insert
+from conftest import ApiConfig
+from sqlite_rest_api.extension import db
+from sqlite_rest_api.models import Quote, User
+
+QUOTES = 95
+
+
+class ListingConfig(ApiConfig):
+    CACHE_TYPE = 'NullCache'    # every request runs the view
+
+
+@pytest.fixture
+def config():
+    return ListingConfig
+
+
+@pytest.fixture
+def headers(app, login):
+    headers = login('reader')
+    with app.app_context():
+        user_id = db.session.scalar(db.select(User.id))
+        db.session.execute(insert(Quote), [{'quote': f'quote {i}', 'user_id': user_id}
+                                           for i in range(QUOTES)])
+        db.session.commit()
+    return headers
+
+
+@pytest.fixture
+def statements(app):
+    executed = []
+    listener = lambda conn, cursor, statement, *args: executed.append(statement)
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', listener)
+    yield executed
+    event.remove(engine, 'before_cursor_execute', listener)
+
+
+def fetch(client, url, headers, statements):
+    statements.clear()
+    response = client.get(url, headers=headers)
+    assert response.status_code == 200, response.data
+    return response.json, len(statements)
+
+
+def test_page_mode_costs_the_same_on_every_page(app, headers, statements):
+    client = app.test_client()
+    counts = {}
+    for page, per_page in ((1, 10), (5, 10), (10, 10), (1, 50), (2, 50)):
+        body, counts[page, per_page] = fetch(
+            client, f'/api/quotes?page={page}&per_page={per_page}', headers, statements)
+        assert body['total quotes'] == QUOTES
+        assert len(body['data']) == min(per_page, QUOTES - (page - 1) * per_page)
+        assert all(row['author'] == 'reader' for row in body['data'])
+    # cache generation, COUNT and the page itself
+    assert set(counts.values()) == {3}
+
+
+def test_cursor_mode_costs_the_same_on_every_page(app, headers, statements):
+    client = app.test_client()
+    url, seen, counts = '/api/quotes?limit=20', [], []
+    while url:
+        body, count = fetch(client, url, headers, statements)
+        seen += [row['id'] for row in body['data']]
+        counts.append(count)
+        url = body['next page']
+    assert seen == sorted(seen) and len(seen) == QUOTES
+    # cache generation and the page itself, no COUNT
+    assert set(counts) == {2}
+
+    body, count = fetch(client, f'/api/quotes?before={seen[-1]}&limit=20', headers, statements)
+    assert [row['id'] for row in body['data']] == seen[-21:-1]
+    assert count == 2
+
+
+@pytest.mark.parametrize('args', ['before=abc', 'after=abc', 'cursor=not-a-cursor'])
+def test_invalid_cursor_is_rejected(app, headers, args):
+    response = app.test_client().get(f'/api/quotes?{args}', headers=headers)
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('after, status', [('abc', 400), ('1.5', 400), ('', 400), ('90', 200)])
+def test_export_checks_after(app, headers, after, status):
+    response = app.test_client().get(f'/api/quotes/export?after={after}', headers=headers)
+    assert response.status_code == status
+    if status == 200:
+        assert len(response.data.splitlines()) == QUOTES - 90
@@ -0,0 +1,33 @@
+# Each ecommerce service ships its own copy of the shared helper modules, so a
+# service deploys from its own directory. The copies must not drift from the
+# modules at the repository root, fix the root module and copy it over.
+import os
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICES = os.path.join(ROOT, 'ecommerce_microservices')
+
+VENDORED = [
+    ('auth_services', 'sqlite_profile.py'),
+    ('auth_services', 'request_metrics.py'),
+    ('order_services', 'sqlite_profile.py'),
+    ('order_services', 'request_metrics.py'),
+    ('order_services', 'compact_responses.py'),
+    ('order_services', 'compression.py'),
+    ('product_services', 'sqlite_profile.py'),
+    ('product_services', 'request_metrics.py'),
+    ('product_services', 'compact_responses.py'),
+    ('product_services', 'compression.py'),
+]
+
+
+def read(path):
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+@pytest.mark.parametrize('service, module', VENDORED)
+def test_copy_matches_root_module(service, module):
+    copy = os.path.join(SERVICES, service, 'app', module)
+    assert read(copy) == read(os.path.join(ROOT, module)), f'{service}/app/{module} has drifted'
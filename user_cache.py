@@ -0,0 +1,60 @@
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+from ttl_cache import TTLCache
+
+USER_CACHE_DEFAULTS = {
+    'USER_CACHE_SIZE': 1024,    # users kept per process
+    'USER_CACHE_TTL': 30,       # seconds before a cached user is read again, 0 turns the cache off
+}
+
+
+class UserCache:
+    """Per-process cache behind a Flask-Login ``user_loader``.
+
+    Keeps the column values of recently loaded users. A hit rebuilds the
+    user as a detached instance and merges it into the request's session
+    without loading, so ``current_user`` stays session-bound (relationships
+    lazy-load, changes flush) without a SELECT. Routes that change a user
+    call ``invalidate``, other processes see the change after at most
+    USER_CACHE_TTL seconds.
+    """
+
+    def __init__(self, app=None, db=None):
+        self.entries = TTLCache()
+        self.db = db
+        if app is not None:
+            self.init_app(app, db)
+
+    def init_app(self, app, db):
+        for key, value in USER_CACHE_DEFAULTS.items():
+            app.config.setdefault(key, value)
+        self.db = db
+        self.entries.configure(maxsize=app.config['USER_CACHE_SIZE'],
+                               ttl=app.config['USER_CACHE_TTL'])
+
+    def load(self, model, user_id):
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return None
+        values = self.entries.get(user_id)
+        if values is None:
+            user = self.db.session.get(model, user_id)
+            if user is not None and self.entries.ttl > 0:
+                mapper = inspect(model)
+                self.entries.set(user_id, {attr.key: getattr(user, attr.key)
+                                           for attr in mapper.column_attrs})
+            return user
+
+        user = inspect(model).class_manager.new_instance()
+        for key, value in values.items():
+            setattr(user, key, value)
+        # looks freshly loaded to the session, merge then attaches it with no SQL
+        make_transient_to_detached(user)
+        return self.db.session.merge(user, load=False)
+
+    def invalidate(self, user_id):
+        self.entries.invalidate(user_id)
+
+    def clear(self):
+        self.entries.clear()